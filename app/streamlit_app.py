@@ -1,10 +1,26 @@
 # app/streamlit_app.py
+import os
+import sys
 from pathlib import Path
-import numpy as np
-import pandas as pd
 import streamlit as st
-import plotly.express as px
-import duckdb
+
+# The page shell goes out before the data stack is imported, so a cold start shows it at once
+st.set_page_config(page_title="Motorcycle Sales EDA", layout="wide")
+st.title("🏍️ Motorcycle Sales — EDA Dashboard")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))  # repo root, for `src`
+from src.dashboard.queries import (  # noqa: E402
+    EXPORT_FORMATS,
+    Filters,
+    open_source,
+    source_fingerprint,
+)
+from src.dashboard.bitmap_index import indexed  # noqa: E402
+from src.dashboard.refresh import RefreshJob  # noqa: E402
+from src.etl.cube import CUBE_PATH  # noqa: E402
 
 # ---- Color palette (consistent across charts)
 COLOR_GROSS = "#F39C12"  # orange
@@ -37,97 +53,117 @@ def money_tickformat(fig):
     fig.update_xaxes(tickprefix="$", separatethousands=True, matches=None)
 
 
-def month_coverage_text(df):
-    if "_MonthDT" not in df.columns or df["_MonthDT"].dropna().empty:
+def month_coverage_text(mmin, mmax):
+    if pd.isna(mmin) or pd.isna(mmax):
         return "No month coverage (missing Month/Date)"
-    mmin = pd.to_datetime(df["_MonthDT"].min()).strftime("%Y-%m")
-    mmax = pd.to_datetime(df["_MonthDT"].max()).strftime("%Y-%m")
-    return f"{mmin} → {mmax}"
+    return f"{pd.Timestamp(mmin).strftime('%Y-%m')} → {pd.Timestamp(mmax).strftime('%Y-%m')}"
 
 
 DB_PATH = Path("data/processed/sales.duckdb")
 
-DATA_FULL = Path("data/processed/bike_sales_100k_enriched.parquet")
+DATA_FULL = Path("data/processed/bike_sales_100k_enriched")  # Hive-partitioned dataset
 DATA_SAMPLE = Path("data/sample/bike_sales_sample.csv")
 
 
-@st.cache_data(show_spinner=False)
-def load_data():
-    if DB_PATH.exists():
-        con = duckdb.connect(DB_PATH.as_posix())
-        df = con.execute("SELECT * FROM sales").df()
-        con.close()
-        src = "duckdb (sales table)"
-    elif DATA_FULL.exists():
-        df = pd.read_parquet(DATA_FULL)
-        src = "full (parquet)"
-    elif DATA_SAMPLE.exists():
-        df = pd.read_csv(DATA_SAMPLE)
-        src = "sample (csv)"
-    else:
+# Every file a store is read from; their size/mtime key the caches below
+SOURCE_FILES = [
+    DB_PATH,
+    DB_PATH.with_name(DB_PATH.name + ".wal"),
+    DATA_FULL,
+    CUBE_PATH,
+    DATA_SAMPLE,
+]
+CACHE_TTL = "1h"
+CACHE_ENTRIES = 4
+
+# Threads and memory of the DuckDB database all sessions share (DuckDB's defaults if unset)
+DUCKDB_THREADS = int(os.environ.get("DASHBOARD_DUCKDB_THREADS", "0")) or None
+DUCKDB_MEMORY_LIMIT = os.environ.get("DASHBOARD_DUCKDB_MEMORY_LIMIT") or None
+
+
+# Shared by all sessions (no pickling); a new fingerprint opens a new source
+@st.cache_resource(show_spinner=False, ttl=CACHE_TTL, max_entries=CACHE_ENTRIES)
+def get_queries(fingerprint):
+    # Filters and aggregations run on a bitmap index of the cube rows, built once per data
+    # version for all sessions (DuckDB when they don't fit); export reads the store. The
+    # store is opened read-only; a replaced entry closes once no running session uses it.
+    return indexed(
+        open_source(
+            DB_PATH,
+            DATA_FULL,
+            DATA_SAMPLE,
+            threads=DUCKDB_THREADS,
+            memory_limit=DUCKDB_MEMORY_LIMIT,
+        )
+    )
+
+
+@st.cache_resource(show_spinner=False, ttl=CACHE_TTL, max_entries=CACHE_ENTRIES)
+def load_dimensions(fingerprint):
+    return get_queries(fingerprint).dimensions()
+
+
+@st.cache_resource(show_spinner=False)
+def seen_fingerprints():
+    return set()
+
+
+def current_queries():
+    """Queries and sidebar dimensions for the stores as they are on disk right now."""
+    fp = source_fingerprint(SOURCE_FILES)
+    seen = seen_fingerprints()
+    for old in seen - {fp}:
+        # the files changed under these entries: drop them, keep everything else cached
+        get_queries.clear(old)
+        load_dimensions.clear(old)
+        seen.discard(old)
+    seen.add(fp)
+    q = get_queries(fp)
+    if q is None:
         st.error(
             "No data store found. Run enrichment to create DuckDB and/or Parquet: `python -m src.etl.enrich`"
         )
         st.stop()
+    return q, load_dimensions(fp)
 
-    # types
-    if "Date" in df.columns:
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-
-    # Month normalization: build a robust month index from Month and/or Date
-    month_from_col = None
-    if "Month" in df.columns:
-        # first try from existing Month string
-        month_from_col = pd.to_datetime(df["Month"].astype(str) + "-01", errors="coerce")
-
-    month_from_date = None
-    if "Date" in df.columns:
-        # fallback from Date column
-        month_from_date = (
-            pd.to_datetime(df["Date"], errors="coerce").dt.to_period("M").dt.to_timestamp()
-        )
 
-    # combine: prefer Month, else Date; if both NaT, stays NaT
-    if month_from_col is not None and month_from_date is not None:
-        df["_MonthDT"] = month_from_col.fillna(month_from_date)
-    elif month_from_col is not None:
-        df["_MonthDT"] = month_from_col
-    elif month_from_date is not None:
-        df["_MonthDT"] = month_from_date
-    else:
-        df["_MonthDT"] = pd.NaT
+# Refresh re-runs enrichment with the CLI defaults, in the background
+REFRESH_ARGS = {
+    "in_path": "data/raw/bike_sales_100k.csv",
+    "out_csv": "data/processed/bike_sales_100k_enriched.csv",
+    "out_parquet": DATA_FULL.as_posix(),
+    "partition_by": ["Year", "Month"],
+    "out_cube": CUBE_PATH.as_posix(),
+}
 
-    # Create/standardize Month string from _MonthDT when available
-    if "_MonthDT" in df.columns:
-        month_str = df["_MonthDT"].dt.strftime("%Y-%m")
-        if "Month" in df.columns:
-            df.loc[month_str.notna(), "Month"] = month_str[month_str.notna()]
-        else:
-            df["Month"] = month_str
 
-    # Do NOT drop rows aggressively; only later filters will handle NaT
+@st.cache_resource(show_spinner=False)
+def refresh_job():
+    # one per server: every session sees the same run, and a second click can't start another
+    return RefreshJob()
 
-    # Safe numeric
-    for c in ["Gross_Revenue", "Net_Revenue", "Payment_Fee", "Quantity"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
 
-    return df, src
+@st.fragment(run_every="2s")
+def refresh_progress(job):
+    if job.running:
+        st.info(f"Refreshing data… {job.status} ({job.elapsed:.0f}s)")
+    else:
+        st.rerun()  # new files, new fingerprint: the whole page switches to them
 
 
-def compute_kpis(df):
-    total_orders = len(df)
-    total_gross = df["Gross_Revenue"].sum() if "Gross_Revenue" in df else np.nan
-    total_net = df["Net_Revenue"].sum() if "Net_Revenue" in df else np.nan
-    total_fees = df["Payment_Fee"].sum() if "Payment_Fee" in df else np.nan
+def compute_kpis(k):
+    total_orders = int(k["orders"])
+    total_gross = k["Gross_Revenue"] if pd.notna(k["Gross_Revenue"]) else np.nan
+    total_net = k["Net_Revenue"] if pd.notna(k["Net_Revenue"]) else np.nan
+    total_fees = k["Payment_Fee"] if pd.notna(k["Payment_Fee"]) else np.nan
     fee_pct = (
         (total_fees / total_gross * 100.0) if (total_gross and np.isfinite(total_gross)) else np.nan
     )
     return total_gross, total_net, total_orders, fee_pct
 
 
-def kpi_strip(df):
-    tg, tn, n, fee_pct = compute_kpis(df)
+def kpi_strip(q, k, filters):
+    tg, tn, n, fee_pct = compute_kpis(k)
     c1, c2, c3, c4 = st.columns([1, 1, 1, 1], gap="large")
     c1.metric("Total Gross Revenue", human_currency(tg))
     c2.metric("Total Net Revenue", human_currency(tn))
@@ -135,14 +171,10 @@ def kpi_strip(df):
     c4.metric("Payment Fees % of Gross", "—" if pd.isna(fee_pct) else f"{fee_pct:.2f}%")
 
     # Second row: Top model & its revenue
-    if {"Bike_Model", "Net_Revenue"}.issubset(df.columns) and len(df):
-        t = (
-            df.groupby("Bike_Model", as_index=False)["Net_Revenue"]
-            .sum()
-            .sort_values("Net_Revenue", ascending=False)
-        )
+    if {"Bike_Model", "Net_Revenue"}.issubset(q.columns) and n:
+        t = q.top_model(filters)
         if len(t):
-            top_model = str(t.iloc[0]["Bike_Model"]) if pd.notna(t.iloc[0]["Bike_Model"]) else "—"
+            top_model = str(t.iloc[0]["Bike_Model"])
             top_rev = (
                 float(t.iloc[0]["Net_Revenue"])
                 if pd.notna(t.iloc[0]["Net_Revenue"])
@@ -153,17 +185,15 @@ def kpi_strip(df):
             r2.metric("Top Model Revenue", human_currency(top_rev))
 
 
-st.set_page_config(page_title="Motorcycle Sales EDA", layout="wide")
-st.title("🏍️ Motorcycle Sales — EDA Dashboard")
-
-df, src = load_data()
-if len(df) < 90000:
+q, dims = current_queries()
+src, n_rows = q.label, dims["rows"]
+if n_rows < 90000:
     st.warning(
-        f"Loaded {len(df):,} rows from {src}. If you expected ~100k+, ensure enrichment has run on the full raw data."
+        f"Loaded {n_rows:,} rows from {src}. If you expected ~100k+, ensure enrichment has run on the full raw data."
     )
 else:
-    st.success(f"Using FULL dataset from {src} (rows: {len(df):,})")
-st.caption(f"Data source: **{src}** | Rows: {len(df):,}")
+    st.success(f"Using FULL dataset from {src} (rows: {n_rows:,})")
+st.caption(f"Data source: **{src}** | Rows: {n_rows:,}")
 
 if str(src).startswith("sample"):
     st.info(
@@ -173,47 +203,33 @@ if str(src).startswith("sample"):
 
 # ---------------- Sidebar filters ----------------
 with st.sidebar:
-    import subprocess
-
-    if st.button("🔄 Refresh data (ingest from raw)"):
-        with st.spinner("Re-ingesting raw CSV via enrichment..."):
-            subprocess.run(
-                [
-                    "python",
-                    "-m",
-                    "src.etl.enrich",
-                    "--in",
-                    "data/raw/bike_sales_100k.csv",
-                    "--out_csv",
-                    "data/processed/bike_sales_100k_enriched.csv",
-                    "--out_parquet",
-                    "data/processed/bike_sales_100k_enriched.parquet",
-                ],
-                check=False,
-            )
-        st.cache_data.clear()
-        st.rerun()
+    job = refresh_job()
+    if st.button("🔄 Refresh data (ingest from raw)", disabled=job.running):
+        if not job.start(**REFRESH_ARGS):
+            st.info("A refresh is already running.")
+    if job.running:
+        refresh_progress(job)
+    elif job.error:
+        st.error(f"Refresh failed: {job.error}")
+    elif job.finished_at:
+        st.caption(f"Data refreshed in {job.elapsed:.0f}s.")
 
     st.header("Filters")
 
     # Date range on Month
-    mind, maxd = df["_MonthDT"].min(), df["_MonthDT"].max()
+    mind, maxd = dims["month_min"], dims["month_max"]
     d1, d2 = st.slider(
         "Date range (by month)",
-        min_value=mind.to_pydatetime() if pd.notna(mind) else None,
-        max_value=maxd.to_pydatetime() if pd.notna(maxd) else None,
-        value=(
-            (mind.to_pydatetime(), maxd.to_pydatetime())
-            if pd.notna(mind) and pd.notna(maxd)
-            else (None, None)
-        ),
+        min_value=mind,
+        max_value=maxd,
+        value=(mind, maxd) if mind is not None and maxd is not None else (None, None),
         format="YYYY-MM",
     )
 
-    warehouses = sorted(df["Warehouse"].dropna().unique()) if "Warehouse" in df else []
-    clients = sorted(df["Client_Type"].dropna().unique()) if "Client_Type" in df else []
-    stores = sorted(df["Store_Location"].dropna().unique()) if "Store_Location" in df else []
-    models = sorted(df["Bike_Model"].dropna().unique()) if "Bike_Model" in df else []
+    warehouses = dims["values"].get("Warehouse", [])
+    clients = dims["values"].get("Client_Type", [])
+    stores = dims["values"].get("Store_Location", [])
+    models = dims["values"].get("Bike_Model", [])
 
     sel_wh = st.multiselect("Warehouse", warehouses, default=warehouses)
     sel_ct = st.multiselect("Client Type", clients, default=clients)
@@ -222,50 +238,57 @@ with st.sidebar:
 
     lock_axis = st.checkbox("🔒 Lock axis range for Product & City charts (42–45M)", value=True)
 
-# Apply filters
-f = df.copy()
-if pd.notna(d1) and pd.notna(d2):
-    f = f[(f["_MonthDT"] >= pd.to_datetime(d1)) & (f["_MonthDT"] <= pd.to_datetime(d2))]
-if "Warehouse" in f.columns and sel_wh:
-    f = f[f["Warehouse"].isin(sel_wh)]
-if "Client_Type" in f.columns and sel_ct:
-    f = f[f["Client_Type"].isin(sel_ct)]
-if "Store_Location" in f.columns and sel_st:
-    f = f[f["Store_Location"].isin(sel_st)]
-if "Bike_Model" in f.columns and sel_mod:
-    f = f[f["Bike_Model"].isin(sel_mod)]
+# Apply filters (pushed down into the DuckDB WHERE clause)
+filters = Filters(
+    month_from=d1 if pd.notna(d1) and pd.notna(d2) else None,
+    month_to=d2 if pd.notna(d1) and pd.notna(d2) else None,
+    warehouses=tuple(sel_wh),
+    client_types=tuple(sel_ct),
+    stores=tuple(sel_st),
+    models=tuple(sel_mod),
+)
+kpis = q.kpis(filters)
 
 # ---------------- Export filtered data ----------------
 with st.expander("Export"):
-    csv_bytes = f.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        "⬇️ Download filtered data (CSV)",
-        data=csv_bytes,
-        file_name="filtered_sales.csv",
-        mime="text/csv",
-    )
+    fmt = st.radio("Format", list(EXPORT_FORMATS), horizontal=True)
+    ext, _, mime = EXPORT_FORMATS[fmt]
+    # built by DuckDB COPY, with the filters pushed down, only when asked for; the bytes are
+    # kept for this store, selection and format so reruns don't rebuild them
+    export_key = (id(q), filters, fmt)
+    if st.button("Prepare export"):
+        st.session_state["export"] = (export_key, q.export_bytes(filters, fmt))
+    prepared = st.session_state.get("export")
+    if prepared is not None and prepared[0] == export_key:
+        st.download_button(
+            "⬇️ Download filtered data",
+            data=prepared[1],
+            file_name=f"filtered_sales.{ext}",
+            mime=mime,
+        )
+    else:
+        st.session_state.pop("export", None)
 
 # ---------------- KPIs ----------------
 st.subheader("Key Metrics")
-kpi_strip(f)
+kpi_strip(q, kpis, filters)
 
 st.subheader("About this view")
 st.markdown(
     f"""
-- **Rows (after filters):** {len(f):,}
-- **Month coverage:** {month_coverage_text(f)}
+- **Rows (after filters):** {int(kpis["orders"]):,}
+- **Month coverage:** {month_coverage_text(kpis["month_min"], kpis["month_max"])}
 - **Filters applied:** Warehouse={', '.join(sel_wh) if sel_wh else 'All'}, Client_Type={', '.join(sel_ct) if sel_ct else 'All'}, Stores={', '.join(sel_st) if sel_st else 'All'}, Models={', '.join(sel_mod) if sel_mod else 'All'}
 """
 )
 
+# Plotly is only needed from here on: the KPIs above render before it is imported
+import plotly.express as px  # noqa: E402
+
 # ---------------- Monthly Sales Trends ----------------
 st.subheader("Monthly Sales Trends (Gross vs Net)")
-if {"Gross_Revenue", "Net_Revenue", "_MonthDT", "Month"}.issubset(f.columns):
-    m = (
-        f.groupby(["Month", "_MonthDT"], as_index=False)[["Gross_Revenue", "Net_Revenue"]]
-        .sum()
-        .sort_values("_MonthDT")
-    )
+if {"Gross_Revenue", "Net_Revenue"}.issubset(q.columns):
+    m = q.monthly(filters)
     if len(m):
         fig = px.line(
             m,
@@ -288,12 +311,8 @@ else:
 
 # ---------------- Product Analysis ----------------
 st.subheader("Product Analysis — Bike Models by Net Revenue (Quantity labels)")
-if {"Bike_Model", "Net_Revenue", "Quantity"}.issubset(f.columns):
-    prod = (
-        f.groupby("Bike_Model", as_index=False)
-        .agg(Net_Revenue=("Net_Revenue", "sum"), Quantity=("Quantity", "sum"))
-        .sort_values("Net_Revenue", ascending=False)
-    )
+if {"Bike_Model", "Net_Revenue", "Quantity"}.issubset(q.columns):
+    prod = q.by_model(filters)
     if len(prod):
         fig = px.bar(
             prod,
@@ -321,12 +340,8 @@ col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("Revenue by City")
-    if {"Store_Location", "Net_Revenue"}.issubset(f.columns):
-        geo = (
-            f.groupby("Store_Location", as_index=False)["Net_Revenue"]
-            .sum()
-            .sort_values("Net_Revenue", ascending=False)
-        )
+    if {"Store_Location", "Net_Revenue"}.issubset(q.columns):
+        geo = q.net_revenue_by("Store_Location", filters)
         if len(geo):
             fig = px.bar(
                 geo,
@@ -348,12 +363,8 @@ with col1:
 
 with col2:
     st.subheader("Revenue by Warehouse")
-    if {"Warehouse", "Net_Revenue"}.issubset(f.columns):
-        wh = (
-            f.groupby("Warehouse", as_index=False)["Net_Revenue"]
-            .sum()
-            .sort_values("Net_Revenue", ascending=False)
-        )
+    if {"Warehouse", "Net_Revenue"}.issubset(q.columns):
+        wh = q.net_revenue_by("Warehouse", filters)
         if len(wh):
             fig = px.bar(
                 wh,
@@ -372,10 +383,8 @@ with col2:
 
 # ---------------- Retail vs Wholesale by Payment Method ----------------
 st.subheader("Retail vs Wholesale by Payment Method (Net Revenue)")
-if {"Payment_Method", "Client_Type", "Net_Revenue"}.issubset(f.columns):
-    pm = f.groupby(["Payment_Method", "Client_Type"], as_index=False, observed=False)[
-        "Net_Revenue"
-    ].sum()
+if {"Payment_Method", "Client_Type", "Net_Revenue"}.issubset(q.columns):
+    pm = q.by_payment_and_client(filters)
     if len(pm):
         fig = px.bar(
             pm,
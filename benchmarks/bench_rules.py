@@ -0,0 +1,59 @@
+# benchmarks/bench_rules.py
+"""
+Rows/sec of the per-row rule maps vs the vectorized rules in src.etl.rules.
+
+    python -m benchmarks.bench_rules --rows 1000000
+"""
+
+from __future__ import annotations
+import argparse
+import time
+from pathlib import Path
+import pandas as pd
+
+from src.etl.rules import (
+    categorize_product,
+    categorize_products,
+    fee_rate_for,
+    fee_rates,
+    warehouse_region,
+    warehouse_regions,
+)
+
+SAMPLE_CSV = Path("data/sample/bike_sales_sample.csv")
+
+CASES = [
+    ("Bike_Model", categorize_product, categorize_products),
+    ("Store_Location", warehouse_region, warehouse_regions),
+    ("Payment_Method", fee_rate_for, fee_rates),
+]
+
+
+def _rows_per_sec(fn, s: pd.Series, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(s)
+        best = min(best, time.perf_counter() - t0)
+    return len(s) / best
+
+
+def main(rows: int, repeat: int = 3) -> None:
+    sample = pd.read_csv(SAMPLE_CSV)
+    reps = -(-rows // len(sample))
+    df = pd.concat([sample] * reps, ignore_index=True).iloc[:rows]
+
+    print(f"{'rule':<20}{'scalar rows/s':>16}{'vectorized rows/s':>20}{'speedup':>10}")
+    for col, scalar, vectorized in CASES:
+        s = df[col]
+        before = _rows_per_sec(lambda x: x.astype(str).map(scalar), s, repeat)
+        after = _rows_per_sec(vectorized, s, repeat)
+        print(f"{scalar.__name__:<20}{before:>16,.0f}{after:>20,.0f}{after / before:>9.1f}x")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    main(args.rows, args.repeat)
@@ -0,0 +1,42 @@
+# benchmarks/bench_schema.py
+"""
+Per-column in-memory footprint of the enriched dataset before/after the declared schema.
+
+"Before" is the enriched CSV read back with pandas defaults and text as object dtype
+(the pandas 2 layout the dashboard used to hold); "after" is `apply_schema` of it.
+
+    python -m benchmarks.bench_schema --rows 1000000
+"""
+from __future__ import annotations
+import argparse
+import io
+import pandas as pd
+
+from src.etl.enrich import enrich_dataframe
+from src.etl.schema import apply_schema, memory_report
+
+SAMPLE_CSV = "data/sample/bike_sales_sample.csv"
+
+
+def main(rows: int) -> pd.DataFrame:
+    raw = pd.read_csv(SAMPLE_CSV).iloc[:, :11]
+    raw = pd.concat([raw] * -(-rows // len(raw)), ignore_index=True).iloc[:rows]
+    buf = io.StringIO()
+    enrich_dataframe(raw).to_csv(buf, index=False)
+    buf.seek(0)
+
+    before = pd.read_csv(buf, low_memory=False)
+    text = before.select_dtypes(exclude="number").columns
+    before = before.astype({c: object for c in text})
+    after = apply_schema(before.copy())
+    report = memory_report(before, after)
+    with pd.option_context("display.width", 120, "display.float_format", "{:,.1f}".format):
+        print(report)
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    args = ap.parse_args()
+    main(args.rows)
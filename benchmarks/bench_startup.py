@@ -0,0 +1,95 @@
+# benchmarks/bench_startup.py
+"""
+Import time of the ETL entry points and the dashboard's data layer, from `-X importtime`.
+
+Each module is imported in a fresh interpreter that has already imported pandas, which
+every entry point needs, so the figure is what the repo adds on top of it. The median of
+--repeat runs is checked against the module's budget, and modules that must stay lazy
+(loaded only on the code path that uses them) must not be loaded by the import at all.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --repeat 9 --scale 1.5
+
+Over budget or with a lazy module loaded, the case is listed and the exit status is 1.
+"""
+
+from __future__ import annotations
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Heavy modules the ETL entry points only import where they are used
+ETL_LAZY = ["duckdb", "pyarrow.parquet", "pyarrow.dataset", "plotly", "streamlit", "cProfile"]
+
+# Entry point -> (import budget in ms on top of pandas, modules its import must not load)
+ENTRIES = {
+    "src.etl.enrich": (80, ETL_LAZY + ["concurrent.futures.process"]),
+    "src.etl.sampling": (40, ETL_LAZY),
+    "src.etl.kpis": (40, ETL_LAZY),
+    "src.etl.audit": (100, ETL_LAZY),
+    "src.etl.synth": (100, ETL_LAZY),
+    "src.etl.ingest": (200, ["pyarrow.dataset", "plotly", "streamlit", "cProfile"]),
+    "src.etl.reports": (200, ["pyarrow.dataset", "plotly", "streamlit", "cProfile"]),
+    "src.dashboard.queries": (50, ["duckdb", "pyarrow.dataset", "plotly", "streamlit"]),
+    "src.dashboard.bitmap_index": (150, ["duckdb", "pyarrow.dataset", "plotly", "streamlit"]),
+}
+
+
+def import_once(module: str, lazy: list[str]) -> tuple[float, list[str]]:
+    """Cumulative import time of `module` in ms, and the `lazy` modules it loaded."""
+    code = f"import pandas, sys; import {module}; print(*(m for m in {lazy!r} if m in sys.modules))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # "import time: self [us] | cumulative | imported package", one line per module
+    for line in proc.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1000, proc.stdout.split()
+    raise RuntimeError(f"{module} not in the -X importtime output")
+
+
+def run(repeat: int) -> list[dict]:
+    results = []
+    for module, (budget, lazy) in ENTRIES.items():
+        runs = [import_once(module, lazy) for _ in range(repeat)]
+        results.append(
+            {
+                "module": module,
+                "ms": statistics.median(ms for ms, _ in runs),
+                "budget_ms": budget,
+                "loaded": sorted({m for _, loaded in runs for m in loaded}),
+            }
+        )
+    return results
+
+
+def main(repeat: int = 5, scale: float = 1.0) -> int:
+    results = run(repeat)
+    print(f"{'module':<30}{'import ms':>10}{'budget ms':>10}  lazy modules loaded")
+    breaches = 0
+    for r in results:
+        over = r["ms"] > r["budget_ms"] * scale
+        breaches += over or bool(r["loaded"])
+        print(
+            f"{r['module']:<30}{r['ms']:>10.1f}{r['budget_ms'] * scale:>10.0f}  "
+            f"{', '.join(r['loaded']) or '-'}{'  OVER BUDGET' if over else ''}"
+        )
+    print(f"{breaches} startup regression(s)")
+    return 1 if breaches else 0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--scale", type=float, default=1.0, help="budget multiplier for slow hosts")
+    args = ap.parse_args()
+    sys.exit(main(args.repeat, args.scale))
@@ -0,0 +1,339 @@
+# benchmarks/bench_suite.py
+"""
+Timings of the ETL and dashboard hot paths at several data sizes, as JSON.
+
+Raw input is the sample tiled to each row count. Covered: `src.etl.enrich.main` end to
+end and stage by stage, the dashboard's source open and each of its queries (against
+row-level data, against the cube and through the cube's bitmap index), every `sql/*.sql`
+report, and `src.etl.ingest.main` on a store of that size (no-op run, small appends
+swapped in or written in place, and the store copy a swapped append pays for).
+
+    python -m benchmarks.bench_suite --rows 100000 1000000 10000000 --out bench.json
+    python -m benchmarks.bench_suite --rows 100000 --compare bench.json
+
+With --compare, cases slower than the baseline by more than --threshold are listed and
+the exit status is 1.
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import duckdb
+import pandas as pd
+
+from src.dashboard.bitmap_index import indexed
+from src.dashboard.queries import Filters, SalesQueries, open_source
+from src.etl.cube import CUBE_PATH, relation_for
+from src.etl.enrich import (
+    compute_client_type,
+    enrich_frame,
+    guess_date_format,
+    guess_revenue_columns,
+    main as enrich,
+)
+from src.etl.ingest import main as ingest
+from src.etl.rules import categorize_products, fee_rates, warehouse_regions
+from src.etl.schema import apply_schema
+from src.utils.instrument import rss_mb
+from src.utils.io import copy_file, read_csv, write_csv, write_parquet
+
+SAMPLE_CSV = Path("data/sample/bike_sales_sample.csv")
+SQL_DIR = Path("sql")
+
+
+class PeakRSS:
+    """
+    Peak resident set size (MiB) while the block runs, sampled from /proc on Linux; None
+    where the RSS can't be read.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak: float | None = None
+
+    def _sample(self) -> None:
+        while not self._done.wait(self.interval):
+            self._update()
+
+    def _update(self) -> None:
+        rss = rss_mb()
+        if rss is not None:
+            self.peak = rss if self.peak is None else max(self.peak, rss)
+
+    def __enter__(self) -> PeakRSS:
+        self.peak = rss_mb()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._done.set()
+        self._thread.join()
+        self._update()
+
+
+def measure(group: str, case: str, rows: int, fn, repeat: int) -> dict:
+    """Best-of-`repeat` wall time of `fn()` and the peak RSS over all runs."""
+    best = float("inf")
+    with PeakRSS() as rss:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+    result = {
+        "group": group,
+        "case": case,
+        "rows": rows,
+        "seconds": round(best, 6),
+        "rows_per_sec": round(rows / best, 1) if best else None,
+        "peak_rss_mb": None if rss.peak is None else round(rss.peak, 1),
+    }
+    print(f"{group:<18}{case:<36}{rows:>12,}{best:>10.3f}s{rows / best:>16,.0f} rows/s")
+    return result
+
+
+def make_raw(rows: int, path: Path) -> None:
+    """The raw sample columns tiled to `rows`, with Sale_IDs kept unique."""
+    sample = pd.read_csv(SAMPLE_CSV).iloc[:, :11]
+    step = int(sample["Sale_ID"].max()) + 1
+    copies = -(-rows // len(sample))
+    block = max(1, 1_000_000 // len(sample))  # tiles per write, to keep memory flat
+    for first in range(0, copies, block):
+        n = min(block, copies - first)
+        df = pd.concat([sample] * n, ignore_index=True)
+        df["Sale_ID"] += (df.index // len(sample) + first) * step
+        df = df.iloc[: rows - first * len(sample)]
+        write_csv(df, path, append=first > 0)
+
+
+def etl_cases(raw: Path, out: Path, rows: int, repeat: int) -> list[dict]:
+    results = [
+        measure(
+            "etl",
+            "enrich.main",
+            rows,
+            lambda: enrich(
+                str(raw),
+                str(out / "enriched.csv"),
+                str(out / "enriched"),
+                partition_by=["Year", "Month"],
+                out_cube=str(out / "cube.parquet"),
+            ),
+            repeat,
+        )
+    ]
+
+    df = read_csv(raw)
+    gross_col, unit_col = guess_revenue_columns(df)
+    enriched = enrich_frame(df.copy())
+    undeclared = enriched.astype({c: object for c in enriched.select_dtypes("category")})
+
+    def revenue():
+        gross = df[gross_col] if gross_col else df[unit_col] * df["Quantity"]
+        fee = gross * fee_rates(df["Payment_Method"])
+        return gross - fee
+
+    def dates():
+        d = pd.to_datetime(df["Date"], format=guess_date_format(df["Date"]), errors="coerce")
+        return d.dt.year, d.dt.to_period("M").astype(str)
+
+    stages = {
+        "read_csv": lambda: read_csv(raw),
+        "rule:categorize_products": lambda: categorize_products(df["Bike_Model"]),
+        "rule:warehouse_regions": lambda: warehouse_regions(df["Store_Location"]),
+        "rule:fee_rates": lambda: fee_rates(df["Payment_Method"]),
+        "client_type": lambda: compute_client_type(df),
+        "revenue_math": revenue,
+        "date_parse": dates,
+        "apply_schema": lambda: apply_schema(undeclared.copy()),
+        "write_csv": lambda: write_csv(enriched, out / "stage.csv"),
+        "write_parquet": lambda: write_parquet(
+            enriched, out / "stage", partition_cols=["Year", "Month"]
+        ),
+    }
+    results += [measure("etl_stage", name, rows, fn, repeat) for name, fn in stages.items()]
+    return results
+
+
+def dashboard_cases(out: Path, rows: int, repeat: int) -> list[dict]:
+    results = []
+    dataset, cube = out / "enriched", out / "cube.parquet"
+    sources = {
+        "dashboard_rows": lambda: SalesQueries(duckdb.connect(), relation_for(dataset), "rows"),
+        "dashboard_cube": lambda: open_source(out / "none.duckdb", dataset, SAMPLE_CSV, cube),
+        "dashboard_indexed": lambda: indexed(
+            open_source(out / "none.duckdb", dataset, SAMPLE_CSV, cube)
+        ),
+    }
+    for group, open_queries in sources.items():
+
+        def open_and_list():
+            q = open_queries()
+            try:
+                q.dimensions()
+            finally:
+                q.con.close()
+
+        results.append(measure(group, "open+dimensions", rows, open_and_list, repeat))
+        q = open_queries()
+        dims = q.dimensions()
+        # a typical selection: full month range, one warehouse, two client types
+        f = Filters(
+            dims["month_min"],
+            dims["month_max"],
+            warehouses=tuple(dims["values"]["Warehouse"][:1]),
+            client_types=tuple(dims["values"]["Client_Type"]),
+        )
+        queries = {
+            "kpis": lambda: q.kpis(f),
+            "top_model": lambda: q.top_model(f),
+            "monthly": lambda: q.monthly(f),
+            "by_model": lambda: q.by_model(f),
+            "by_store": lambda: q.net_revenue_by("Store_Location", f),
+            "by_warehouse": lambda: q.net_revenue_by("Warehouse", f),
+            "by_payment_and_client": lambda: q.by_payment_and_client(f),
+        }
+        if group == "dashboard_rows":
+            queries["export:CSV (gzip)"] = lambda: q.export_bytes(f, "CSV (gzip)")
+        try:
+            results += [measure(group, name, rows, fn, repeat) for name, fn in queries.items()]
+        finally:
+            q.con.close()
+    return results
+
+
+def sql_cases(out: Path, rows: int, repeat: int) -> list[dict]:
+    results = []
+    for path in sorted(SQL_DIR.glob("*.sql")):
+        sql = path.read_text()
+        sql = sql.replace(CUBE_PATH.as_posix(), (out / "cube.parquet").as_posix())
+        with duckdb.connect() as con:
+            results.append(
+                measure("sql", path.name, rows, lambda: con.execute(sql).fetchall(), repeat)
+            )
+    return results
+
+
+def ingest_cases(raw: Path, out: Path, rows: int, repeat: int) -> list[dict]:
+    db = out / "sales.duckdb"
+    ingest([str(raw)], db)
+    sample = pd.read_csv(SAMPLE_CSV).iloc[:, :11]
+    delta, step = out / "delta.csv", int(sample["Sale_ID"].max()) + 1
+    first = -(-rows // len(sample)) * step  # past every Sale_ID of `raw`
+    batches = []
+
+    def append(in_place: bool):
+        # a new sample-sized block of unseen Sale_IDs at the end of the delta file
+        def fn():
+            block = sample.copy()
+            block["Sale_ID"] += first + len(batches) * step
+            batches.append(len(block))
+            write_csv(block, delta, append=delta.exists())
+            ingest([str(delta)], db, in_place=in_place)
+
+        return fn
+
+    cases = {
+        "main (nothing new)": lambda: ingest([str(raw), str(delta)], db),
+        "main (append, swap)": append(False),
+        "main (append, in place)": append(True),
+        "store copy": lambda: copy_file(db, out / "sales.copy.duckdb"),
+    }
+    append(True)()  # the delta file exists before the no-op case reads it
+    return [measure("ingest", name, rows, fn, repeat) for name, fn in cases.items()]
+
+
+def _meta() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "duckdb": duckdb.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def run(rows_list: list[int], repeat: int) -> dict:
+    results = []
+    for rows in rows_list:
+        with tempfile.TemporaryDirectory() as d:
+            out = Path(d)
+            raw = out / "raw.csv"
+            make_raw(rows, raw)
+            results += etl_cases(raw, out, rows, repeat)
+            results += dashboard_cases(out, rows, repeat)
+            results += sql_cases(out, rows, repeat)
+            results += ingest_cases(raw, out, rows, repeat)
+    return {"meta": _meta(), "results": results}
+
+
+# Slowdowns smaller than this are timer noise, whatever the ratio
+MIN_DELTA_SECONDS = 0.01
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[dict]:
+    """Cases (matched on group, case and rows) slower than baseline by more than `threshold`."""
+    base = {(r["group"], r["case"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        b = base.get((r["group"], r["case"], r["rows"]))
+        if (
+            b
+            and r["seconds"] > b["seconds"] * (1 + threshold)
+            and r["seconds"] - b["seconds"] > MIN_DELTA_SECONDS
+        ):
+            regressions.append({**r, "baseline_seconds": b["seconds"]})
+    return regressions
+
+
+def main(
+    rows_list: list[int],
+    out: str | None,
+    repeat: int = 3,
+    baseline: str | None = None,
+    threshold: float = 0.2,
+) -> int:
+    current = run(rows_list, repeat)
+    if out:
+        Path(out).write_text(json.dumps(current, indent=2) + "\n")
+        print(f"Saved results → {out}")
+    if not baseline:
+        return 0
+
+    regressions = compare(current, json.loads(Path(baseline).read_text()), threshold)
+    for r in regressions:
+        ratio = r["seconds"] / r["baseline_seconds"]
+        print(
+            f"REGRESSION {r['group']}/{r['case']} @ {r['rows']:,} rows: "
+            f"{r['baseline_seconds']:.3f}s → {r['seconds']:.3f}s ({ratio:.2f}x)"
+        )
+    print(f"{len(regressions)} regression(s) over {threshold:.0%} vs {baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--compare", dest="baseline", default=None, help="baseline results JSON")
+    ap.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    args = ap.parse_args()
+    sys.exit(main(args.rows, args.out, args.repeat, args.baseline, args.threshold))
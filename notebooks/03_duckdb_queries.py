@@ -1,14 +1,16 @@
-import duckdb
-
-con = duckdb.connect()
-for path in [
-    "sql/monthly_net_revenue.sql",
-    "sql/warehouse_performance.sql",
-    "sql/client_type.sql",
-    "sql/payment_method_profitability.sql",
-    "sql/product_line_profitability.sql",
-]:
-    print(f"\n--- {path} ---")
-    with open(path, "r") as f:
-        q = f.read()
-    print(con.sql(q).df().head(20).to_string(index=False))
+# notebooks/03_duckdb_queries.py
+# Run the sql/ reports against the cube in one pass and print them (see src/etl/reports.py;
+# `python -m src.etl.reports --help` for other sources and output formats).
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.etl.reports import OUT_DIR, run_reports  # noqa: E402
+
+if __name__ == "__main__":
+    for name in run_reports():
+        print(f"\n--- sql/{name}.sql ---")
+        print(pd.read_parquet(OUT_DIR / f"{name}.parquet").head(20).to_string(index=False))
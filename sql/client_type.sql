@@ -1,7 +1,7 @@
 SELECT
   Client_Type,
   SUM(Net_Revenue) AS net_revenue,
-  COUNT(*) AS orders
-FROM 'data/processed/bike_sales_100k_enriched.parquet'
+  CAST(SUM(Orders) AS BIGINT) AS orders
+FROM read_parquet('data/processed/bike_sales_cube.parquet')
 GROUP BY 1
 ORDER BY net_revenue DESC;
@@ -4,7 +4,7 @@ WITH m AS (
     Month,
     Product_Category,
     SUM(Net_Revenue) AS net_revenue
-  FROM 'data/processed/bike_sales_100k_enriched.parquet'
+  FROM read_parquet('data/processed/bike_sales_cube.parquet')
   GROUP BY 1,2
 )
 SELECT * FROM m ORDER BY Month, Product_Category;
@@ -0,0 +1,194 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+from src.dashboard.queries import FILTER_COLUMNS, Filters, SalesQueries
+
+# Aggregate rows (cube rows, or sales rows when there is no cube) held in memory at most
+INDEX_MAX_ROWS = 5_000_000
+
+# Columns the charts group by besides the filter columns, and the measures they sum
+GROUP_COLUMNS = ["Payment_Method"]
+MEASURES = ["Gross_Revenue", "Net_Revenue", "Payment_Fee", "Quantity"]
+
+
+def _q(col: str) -> str:
+    return '"' + col.replace('"', '""') + '"'
+
+
+class FilterIndex:
+    """
+    The aggregate rows behind the dashboard, loaded once, with a packed row bitmap for every
+    value of every filter column. Rows are sorted by month, so a month range is a row range.
+    A filter combination resolves to an OR of bitmaps within a column and an AND across
+    columns, cut to the month range; aggregates then only read the selected rows.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        frame = frame.sort_values("_MonthDT", kind="stable", na_position="last")
+        self.rows = len(frame)
+        self.months = frame["_MonthDT"].to_numpy(dtype="datetime64[ns]")
+        # NaT sorts last: the month range search only looks at the rows that have one
+        self.dated = int(np.count_nonzero(~np.isnat(self.months)))
+        self.month_codes, self.month_labels = pd.factorize(frame["_MonthDT"], sort=True)
+        self.orders = frame["_orders"].to_numpy(dtype=np.int64)
+        self.measures = {c: frame[c].to_numpy(dtype=np.float64) for c in MEASURES if c in frame}
+        self.codes: dict[str, np.ndarray] = {}
+        self.labels: dict[str, np.ndarray] = {}
+        self.bitmaps: dict[str, dict[str, np.ndarray]] = {}
+        for col in [*FILTER_COLUMNS, *GROUP_COLUMNS]:
+            if col not in frame:
+                continue
+            codes, labels = pd.factorize(frame[col], sort=True)
+            self.codes[col] = codes
+            self.labels[col] = np.array([str(v) for v in labels], dtype=object)
+            if col in FILTER_COLUMNS:
+                self.bitmaps[col] = {
+                    label: np.packbits(codes == i) for i, label in enumerate(self.labels[col])
+                }
+
+    @classmethod
+    def load(cls, q: SalesQueries) -> FilterIndex | None:
+        """Index of `q`'s aggregate rows; None if there are more than INDEX_MAX_ROWS."""
+        if q.query(f"SELECT count(*) AS n FROM {q.agg}")["n"].iloc[0] > INDEX_MAX_ROWS:
+            return None
+        cols = [
+            f"CAST({_q(c)} AS VARCHAR) AS {_q(c)}"
+            for c in [*FILTER_COLUMNS, *GROUP_COLUMNS]
+            if c in q.columns
+        ]
+        cols += [_q(c) for c in MEASURES if c in q.columns]
+        orders = '"Orders"' if q.orders != "count(*)" else "1"
+        return cls(q.query(f"SELECT {', '.join(cols)}, _MonthDT, {orders} AS _orders FROM {q.agg}"))
+
+    def select(self, f: Filters) -> np.ndarray:
+        """Positions of the rows `f` keeps, with `SalesQueries.where` semantics."""
+        bits = None
+        selected = zip(FILTER_COLUMNS, [f.warehouses, f.client_types, f.stores, f.models])
+        for col, values in selected:
+            if col not in self.bitmaps or not values:
+                continue
+            union = np.zeros((self.rows + 7) // 8, dtype=np.uint8)
+            for v in values:
+                if v in self.bitmaps[col]:
+                    np.bitwise_or(union, self.bitmaps[col][v], out=union)
+            bits = union if bits is None else np.bitwise_and(bits, union, out=bits)
+        lo, hi = 0, self.rows
+        if f.month_from is not None and f.month_to is not None:
+            bounds = np.array([f.month_from, f.month_to], dtype="datetime64[ns]")
+            lo = int(np.searchsorted(self.months[: self.dated], bounds[0], side="left"))
+            hi = int(np.searchsorted(self.months[: self.dated], bounds[1], side="right"))
+        if bits is None:
+            return np.arange(lo, max(lo, hi))
+        return np.flatnonzero(np.unpackbits(bits, count=self.rows)[lo:hi]) + lo
+
+    def _sum(self, col: str, ids: np.ndarray) -> float | None:
+        return float(np.nansum(self.measures[col][ids])) if col in self.measures else None
+
+    def _grouped(self, cols: list[str], ids: np.ndarray, measures: list[str]) -> pd.DataFrame:
+        # one output row per combination of non-null `cols` values among the selected rows;
+        # codes are dense, so the sums are bincounts over the combined code space
+        sizes = [len(self.labels[col]) for col in cols]
+        keys = np.zeros(len(ids), dtype=np.int64)
+        keep = np.ones(len(ids), dtype=bool)
+        for col, n in zip(cols, sizes):
+            codes = self.codes[col][ids]
+            keep &= codes >= 0
+            keys = keys * n + codes
+        keys, ids = keys[keep], ids[keep]
+        space = int(np.prod(sizes))
+        groups = np.flatnonzero(np.bincount(keys, minlength=space))
+        codes = np.unravel_index(groups, sizes)
+        frame = pd.DataFrame({col: self.labels[col][c] for col, c in zip(cols, codes)})
+        for m in measures:
+            weights = np.nan_to_num(self.measures[m][ids])
+            frame[m] = np.bincount(keys, weights=weights, minlength=space)[groups]
+        return frame
+
+    def kpis(self, f: Filters) -> dict:
+        ids = self.select(f)
+        dated = ids[ids < self.dated]
+        out = {"orders": int(self.orders[ids].sum())}
+        for col in ["Gross_Revenue", "Net_Revenue", "Payment_Fee"]:
+            out[col] = self._sum(col, ids)
+        out["month_min"] = pd.Timestamp(self.months[dated[0]]) if len(dated) else pd.NaT
+        out["month_max"] = pd.Timestamp(self.months[dated[-1]]) if len(dated) else pd.NaT
+        return out
+
+    def top_model(self, f: Filters) -> pd.DataFrame:
+        return self.by_model(f)[["Bike_Model", "Net_Revenue"]].head(1).reset_index(drop=True)
+
+    def monthly(self, f: Filters) -> pd.DataFrame:
+        ids = self.select(f)
+        ids = ids[ids < self.dated]
+        keys, space = self.month_codes[ids], len(self.month_labels)
+        groups = np.flatnonzero(np.bincount(keys, minlength=space))
+        frame = pd.DataFrame({"_MonthDT": self.month_labels[groups]})
+        frame.insert(0, "Month", frame["_MonthDT"].dt.strftime("%Y-%m"))
+        for m in ["Gross_Revenue", "Net_Revenue"]:
+            weights = np.nan_to_num(self.measures[m][ids])
+            frame[m] = np.bincount(keys, weights=weights, minlength=space)[groups]
+        return frame
+
+    def by_model(self, f: Filters) -> pd.DataFrame:
+        frame = self._grouped(["Bike_Model"], self.select(f), ["Net_Revenue", "Quantity"])
+        frame["Quantity"] = frame["Quantity"].round().astype(np.int64)
+        return frame.sort_values("Net_Revenue", ascending=False, kind="stable").reset_index(
+            drop=True
+        )
+
+    def net_revenue_by(self, col: str, f: Filters) -> pd.DataFrame:
+        frame = self._grouped([col], self.select(f), ["Net_Revenue"])
+        return frame.sort_values("Net_Revenue", ascending=False, kind="stable").reset_index(
+            drop=True
+        )
+
+    def by_payment_and_client(self, f: Filters) -> pd.DataFrame:
+        return self._grouped(["Payment_Method", "Client_Type"], self.select(f), ["Net_Revenue"])
+
+
+class IndexedQueries:
+    """
+    `SalesQueries` with the chart and KPI aggregates answered from a `FilterIndex`; the
+    KPI store still answers the views it covers, and everything else (dimensions, export)
+    goes to DuckDB.
+    """
+
+    def __init__(self, q: SalesQueries, index: FilterIndex):
+        self.q = q
+        self.index = index
+
+    def __getattr__(self, name: str):
+        return getattr(self.q, name)
+
+    def kpis(self, f: Filters) -> dict:
+        if self.q._store_view(f) is not None:
+            return self.q.kpis(f)
+        return self.index.kpis(f)
+
+    def top_model(self, f: Filters) -> pd.DataFrame:
+        if self.q._store_view(f) is not None:
+            return self.q.top_model(f)
+        return self.index.top_model(f)
+
+    def monthly(self, f: Filters) -> pd.DataFrame:
+        if self.q._store_view(f) is not None:
+            return self.q.monthly(f)
+        return self.index.monthly(f)
+
+    def by_model(self, f: Filters) -> pd.DataFrame:
+        return self.index.by_model(f)
+
+    def net_revenue_by(self, col: str, f: Filters) -> pd.DataFrame:
+        return self.index.net_revenue_by(col, f)
+
+    def by_payment_and_client(self, f: Filters) -> pd.DataFrame:
+        return self.index.by_payment_and_client(f)
+
+
+def indexed(q: SalesQueries | None) -> SalesQueries | IndexedQueries | None:
+    """`q` with an in-memory filter index when its aggregate rows fit one."""
+    if q is None:
+        return None
+    index = FilterIndex.load(q)
+    return q if index is None else IndexedQueries(q, index)
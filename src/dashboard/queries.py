@@ -0,0 +1,341 @@
+from __future__ import annotations
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+import pandas as pd
+
+from src.etl.cube import CUBE_PATH, CUBE_TABLE, FILTER_COLUMNS, relation_for, with_month
+from src.etl.kpis import KPI_TABLE, read_kpis, read_monthly, read_top_model
+from src.utils.io import resolve_output
+
+if TYPE_CHECKING:
+    import duckdb
+
+# Export format -> (file extension, COPY options, MIME type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "(FORMAT csv, HEADER)", "text/csv"),
+    "CSV (gzip)": ("csv.gz", "(FORMAT csv, HEADER, COMPRESSION gzip)", "application/gzip"),
+    "Parquet": ("parquet", "(FORMAT parquet, COMPRESSION zstd)", "application/vnd.apache.parquet"),
+}
+
+
+@dataclass(frozen=True)
+class Filters:
+    """Sidebar selections. An empty selection means "no filter" on that column."""
+
+    month_from: datetime | None = None
+    month_to: datetime | None = None
+    warehouses: tuple[str, ...] = ()
+    client_types: tuple[str, ...] = ()
+    stores: tuple[str, ...] = ()
+    models: tuple[str, ...] = ()
+
+
+def _q(col: str) -> str:
+    return '"' + col.replace('"', '""') + '"'
+
+
+class SalesQueries:
+    """
+    Parameterized DuckDB queries behind the dashboard. Filters are pushed into the
+    WHERE clause and every method returns only the small aggregate a chart or KPI
+    needs, so a rerun costs one scan of the store instead of a copy of it in pandas.
+    """
+
+    def __init__(
+        self,
+        con: duckdb.DuckDBPyConnection,
+        relation: str,
+        label: str,
+        cube: str | None = None,
+        kpi_table: str | None = None,
+    ):
+        self.con = con
+        self.label = label
+        self.columns = self._columns(relation)
+        self.relation = with_month(relation, self.columns)
+        self.columns.add("_MonthDT")
+
+        # Charts and KPIs read the pre-aggregated cube when there is one that still adds up
+        # to the row data; its Orders column stands in for COUNT(*). Row-level data is then
+        # only read for export.
+        if cube is not None and self._rollup_matches(relation, cube):
+            self.agg = with_month(cube, self._columns(cube))
+            self.orders = 'COALESCE(SUM("Orders"), 0)'
+        else:
+            self.agg, self.orders = self.relation, "count(*)"
+
+        # The incrementally maintained KPI store answers the headline KPIs, top model and
+        # monthly trend of the unfiltered and the everything-selected views, if it is in sync
+        self.kpi_table = kpi_table
+        if kpi_table is not None and not self._store_matches(relation, kpi_table):
+            self.kpi_table = None
+        self._dims: dict | None = None
+
+    def _columns(self, relation: str) -> set[str]:
+        cur = self._cursor().execute(f"SELECT * FROM {relation} LIMIT 0")
+        return {d[0] for d in cur.description}
+
+    def _rollup_matches(self, relation: str, cube: str) -> bool:
+        sql = f'SELECT (SELECT count(*) FROM {relation}) = (SELECT SUM("Orders") FROM {cube})'
+        return bool(self._cursor().execute(sql).fetchone()[0])
+
+    def _store_matches(self, relation: str, kpi_table: str) -> bool:
+        sql = (
+            f"SELECT (SELECT count(*) FROM {relation}) = "
+            f"(SELECT SUM(orders) FROM {kpi_table} WHERE grain = 'total')"
+        )
+        return bool(self._cursor().execute(sql).fetchone()[0])
+
+    def _store_view(self, f: Filters) -> bool | None:
+        """
+        How the KPI store answers `f`: False for no filters (all rows), True for every
+        month and filter value selected (rows with a month and every filter column), None
+        for any narrower selection or when there is no store.
+        """
+        if self.kpi_table is None:
+            return None
+        if f == Filters():
+            return False
+        dims = self._dims or self.dimensions()
+        bounds = (dims["month_min"], dims["month_max"])
+        if f.month_from is None or (f.month_from, f.month_to) != bounds:
+            return None
+        # an empty selection is no filter at all, which also keeps rows without a value
+        selected = zip(FILTER_COLUMNS, [f.warehouses, f.client_types, f.stores, f.models])
+        for col, values in selected:
+            if col in self.columns and (not values or set(values) != set(dims["values"][col])):
+                return None
+        return True
+
+    def _cursor(self) -> duckdb.DuckDBPyConnection:
+        # one cursor per query: Streamlit runs sessions on separate threads
+        return self.con.cursor()
+
+    def query(self, sql: str, params: list | None = None) -> pd.DataFrame:
+        return self._cursor().execute(sql, params or []).df()
+
+    def where(self, f: Filters) -> tuple[str, list]:
+        clauses, params = [], []
+        if f.month_from is not None and f.month_to is not None:
+            clauses.append("_MonthDT BETWEEN ? AND ?")
+            params += [f.month_from, f.month_to]
+        for col, values in zip(FILTER_COLUMNS, [f.warehouses, f.client_types, f.stores, f.models]):
+            if col in self.columns and values:
+                clauses.append(f"list_contains(?, CAST({_q(col)} AS VARCHAR))")
+                params.append(list(values))
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def dimensions(self) -> dict:
+        """Row count, month bounds and the distinct values of each filter column."""
+        rows, mmin, mmax = (
+            self._cursor()
+            .execute(f"SELECT {self.orders}, min(_MonthDT), max(_MonthDT) FROM {self.agg}")
+            .fetchone()
+        )
+        values = {}
+        for col in FILTER_COLUMNS:
+            if col in self.columns:
+                values[col] = [
+                    r[0]
+                    for r in self._cursor()
+                    .execute(
+                        f"SELECT DISTINCT CAST({_q(col)} AS VARCHAR) AS v FROM {self.agg} "
+                        "WHERE v IS NOT NULL ORDER BY v"
+                    )
+                    .fetchall()
+                ]
+        self._dims = {"rows": rows, "month_min": mmin, "month_max": mmax, "values": values}
+        return self._dims
+
+    def kpis(self, f: Filters) -> dict:
+        view = self._store_view(f)
+        if view is not None:
+            return read_kpis(self.con, complete_only=view, table=self.kpi_table)
+        where, params = self.where(f)
+        sums = ", ".join(
+            f"COALESCE(SUM({_q(c)}), 0) AS {c}" if c in self.columns else f"NULL AS {c}"
+            for c in ["Gross_Revenue", "Net_Revenue", "Payment_Fee"]
+        )
+        row = self.query(
+            f"SELECT {self.orders} AS orders, {sums}, min(_MonthDT) AS month_min, "
+            f"max(_MonthDT) AS month_max FROM {self.agg} {where}",
+            params,
+        ).iloc[0]
+        return row.to_dict()
+
+    def top_model(self, f: Filters) -> pd.DataFrame:
+        view = self._store_view(f)
+        if view is not None:
+            return read_top_model(self.con, complete_only=view, table=self.kpi_table)
+        where, params = self.where(f)
+        cond = f"{where} AND" if where else "WHERE"
+        return self.query(
+            f"""
+            SELECT CAST(Bike_Model AS VARCHAR) AS Bike_Model, SUM(Net_Revenue) AS Net_Revenue
+            FROM {self.agg} {cond} Bike_Model IS NOT NULL
+            GROUP BY 1 ORDER BY 2 DESC NULLS LAST LIMIT 1
+            """,
+            params,
+        )
+
+    def monthly(self, f: Filters) -> pd.DataFrame:
+        view = self._store_view(f)
+        if view is not None:
+            return read_monthly(self.con, complete_only=view, table=self.kpi_table)
+        where, params = self.where(f)
+        cond = f"{where} AND" if where else "WHERE"
+        return self.query(
+            f"""
+            SELECT strftime(_MonthDT, '%Y-%m') AS Month, _MonthDT,
+                   SUM(Gross_Revenue) AS Gross_Revenue, SUM(Net_Revenue) AS Net_Revenue
+            FROM {self.agg} {cond} _MonthDT IS NOT NULL
+            GROUP BY 1, 2 ORDER BY 2
+            """,
+            params,
+        )
+
+    def by_model(self, f: Filters) -> pd.DataFrame:
+        where, params = self.where(f)
+        cond = f"{where} AND" if where else "WHERE"
+        return self.query(
+            f"""
+            SELECT CAST(Bike_Model AS VARCHAR) AS Bike_Model, SUM(Net_Revenue) AS Net_Revenue,
+                   CAST(SUM(Quantity) AS BIGINT) AS Quantity
+            FROM {self.agg} {cond} Bike_Model IS NOT NULL
+            GROUP BY 1 ORDER BY 2 DESC
+            """,
+            params,
+        )
+
+    def net_revenue_by(self, col: str, f: Filters) -> pd.DataFrame:
+        where, params = self.where(f)
+        cond = f"{where} AND" if where else "WHERE"
+        return self.query(
+            f"""
+            SELECT CAST({_q(col)} AS VARCHAR) AS {_q(col)}, SUM(Net_Revenue) AS Net_Revenue
+            FROM {self.agg} {cond} {_q(col)} IS NOT NULL
+            GROUP BY 1 ORDER BY 2 DESC
+            """,
+            params,
+        )
+
+    def by_payment_and_client(self, f: Filters) -> pd.DataFrame:
+        where, params = self.where(f)
+        cond = f"{where} AND" if where else "WHERE"
+        return self.query(
+            f"""
+            SELECT CAST(Payment_Method AS VARCHAR) AS Payment_Method,
+                   CAST(Client_Type AS VARCHAR) AS Client_Type,
+                   SUM(Net_Revenue) AS Net_Revenue
+            FROM {self.agg}
+            {cond} Payment_Method IS NOT NULL AND Client_Type IS NOT NULL
+            GROUP BY 1, 2 ORDER BY 1, 2
+            """,
+            params,
+        )
+
+    def export(self, f: Filters, path: Path, fmt: str = "CSV") -> Path:
+        """
+        Write the filtered row-level data to `path` with DuckDB COPY: streamed from the
+        store to disk, without building the rows as a frame or a string first.
+        """
+        where, params = self.where(f)
+        options = EXPORT_FORMATS[fmt][1]
+        self._cursor().execute(
+            f"COPY (SELECT * EXCLUDE (_MonthDT) FROM {self.relation} {where}) "
+            f"TO '{path.as_posix()}' {options}",
+            params,
+        )
+        return path
+
+    def export_bytes(self, f: Filters, fmt: str = "CSV") -> bytes:
+        """The export file's contents, built in a temporary directory."""
+        with tempfile.TemporaryDirectory() as d:
+            return self.export(f, Path(d) / f"export.{EXPORT_FORMATS[fmt][0]}", fmt).read_bytes()
+
+
+def source_fingerprint(paths: list[Path]) -> tuple:
+    """
+    Cheap identity of the files behind the dashboard: size and mtime of each path (for a
+    dataset directory: file count, total size and newest mtime). Changes whenever enrichment
+    or ingest rewrites a store, so caches keyed on it never serve stale data.
+    """
+    out = []
+    for path in paths:
+        if path.is_dir():
+            stats = [p.stat() for p in resolve_output(path).rglob("*") if p.is_file()]
+            ident = (
+                len(stats),
+                sum(st.st_size for st in stats),
+                max((st.st_mtime_ns for st in stats), default=0),
+            )
+        elif path.exists():
+            st = path.stat()
+            ident = (st.st_size, st.st_mtime_ns)
+        else:
+            ident = None
+        out.append((path.as_posix(), ident))
+    return tuple(out)
+
+
+def connect_store(
+    db_path: Path | None = None, threads: int | None = None, memory_limit: str | None = None
+) -> duckdb.DuckDBPyConnection:
+    """
+    In-memory DuckDB database the dashboard shares across sessions and reruns (a cursor
+    per query), limited to `threads` and `memory_limit` (DuckDB's defaults when None).
+    The store at `db_path` is attached read-only and its tables are exposed as views of
+    the same name. Unlike `duckdb.connect(db_path)`, which returns the database already
+    open on that path in this process, attaching reads the file on disk now: after ingest
+    swaps in a new store, a new connection sees it while sessions still holding the old
+    one finish on the previous file.
+    """
+    import duckdb
+
+    config = {}
+    if threads:
+        config["threads"] = threads
+    if memory_limit:
+        config["memory_limit"] = memory_limit
+    con = duckdb.connect(config=config)
+    if db_path is not None:
+        con.execute(f"ATTACH '{db_path.as_posix()}' AS store (READ_ONLY)")
+        tables = con.execute(
+            "SELECT table_name FROM duckdb_tables() WHERE database_name = 'store'"
+        ).fetchall()
+        for (table,) in tables:
+            con.execute(f"CREATE VIEW {_q(table)} AS SELECT * FROM store.{_q(table)}")
+    return con
+
+
+def open_source(
+    db_path: Path,
+    parquet_dir: Path,
+    sample_csv: Path,
+    cube_path: Path = CUBE_PATH,
+    threads: int | None = None,
+    memory_limit: str | None = None,
+) -> SalesQueries | None:
+    """
+    Queries over the best available store: DuckDB table, Parquet dataset, or sample. The
+    matching cube (the sales_cube table, or `cube_path` next to the dataset) is used for
+    aggregates when it exists. `threads` and `memory_limit` cap the DuckDB database
+    behind them (see `connect_store`).
+    """
+    if db_path.exists():
+        con = connect_store(db_path, threads, memory_limit)
+        tables = {r[0] for r in con.execute("SHOW TABLES").fetchall()}
+        cube = CUBE_TABLE if CUBE_TABLE in tables else None
+        kpi_table = KPI_TABLE if KPI_TABLE in tables else None
+        return SalesQueries(con, "sales", "duckdb (sales table)", cube=cube, kpi_table=kpi_table)
+    con = connect_store(threads=threads, memory_limit=memory_limit)
+    if parquet_dir.exists():
+        cube = relation_for(cube_path) if cube_path.exists() else None
+        return SalesQueries(con, relation_for(parquet_dir), "full (parquet)", cube)
+    if sample_csv.exists():
+        return SalesQueries(con, relation_for(sample_csv), "sample (csv)")
+    con.close()
+    return None
@@ -0,0 +1,126 @@
+from __future__ import annotations
+import contextlib
+import multiprocessing as mp
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from src.utils.instrument import StageRecord
+
+_progress: mp.Queue | None = None
+
+
+class _QueueWriter:
+    """stdout replacement in the worker: forwards each printed line to the app."""
+
+    def write(self, text: str) -> int:
+        for line in text.splitlines():
+            if line.strip():
+                _progress.put(line)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+def _init_worker(progress: mp.Queue) -> None:
+    global _progress
+    _progress = progress
+
+
+def _enrich_in_worker(kwargs: dict) -> None:
+    from src.etl.enrich import main
+    from src.utils.instrument import Instrument
+
+    # finished stages go to the app as StageRecords, printed lines as strings
+    with contextlib.redirect_stdout(_QueueWriter()):
+        main(**kwargs, instrument=Instrument(on_record=_progress.put))
+
+
+class RefreshJob:
+    """
+    Re-enrichment off the Streamlit script thread. The ETL runs in a long-lived worker
+    process (imports are paid once, the server's GIL stays free) and its outputs are
+    swapped in by rename, so sessions keep serving the old data until the new data is
+    complete. At most one run is in flight; `start` while running is a no-op.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._progress = mp.get_context("spawn").Queue()
+        self._pool: ProcessPoolExecutor | None = None
+        self._runner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="refresh")
+        self.running = False
+        self.messages: list[str] = []
+        self.stage: str | None = None
+        self.stage_rows: dict[str, int] = {}
+        self.error: str | None = None
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+
+    def start(self, **enrich_kwargs) -> bool:
+        """Start a refresh with `src.etl.enrich.main` arguments; False if one is running."""
+        with self._lock:
+            if self.running:
+                return False
+            self.running = True
+            self.messages, self.error = ["Starting enrichment…"], None
+            self.stage, self.stage_rows = None, {}
+            self.started_at, self.finished_at = time.time(), None
+        self._runner.submit(self._run, enrich_kwargs)
+        return True
+
+    def _run(self, enrich_kwargs: dict) -> None:
+        try:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=mp.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self._progress,),
+                )
+            future = self._pool.submit(_enrich_in_worker, enrich_kwargs)
+            while not future.done():
+                self._drain(timeout=0.2)
+            future.result()
+            self._drain()
+            self.messages.append("Done.")
+        except Exception as e:  # surfaced in the sidebar
+            if isinstance(e, BrokenProcessPool):
+                self._pool = None  # the worker died; start a fresh one next time
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            with self._lock:
+                self.finished_at = time.time()
+                self.running = False
+
+    def _drain(self, timeout: float = 0.0) -> None:
+        try:
+            self._record(self._progress.get(timeout=timeout))
+            while True:
+                self._record(self._progress.get_nowait())
+        except queue.Empty:
+            pass
+
+    def _record(self, item: str | StageRecord) -> None:
+        if isinstance(item, StageRecord):
+            # chunked and partitioned runs repeat a stage: its rows add up as it goes
+            self.stage = item.stage
+            self.stage_rows[item.stage] = self.stage_rows.get(item.stage, 0) + (item.rows_out or 0)
+        else:
+            self.messages.append(item)
+
+    @property
+    def status(self) -> str:
+        """The last finished stage and the rows it has done so far, else the last message."""
+        if self.stage is None:
+            return self.messages[-1]
+        return f"{self.stage}: {self.stage_rows[self.stage]:,} rows done"
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
@@ -0,0 +1,309 @@
+from __future__ import annotations
+import argparse
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import reduce
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from pandas.util import hash_array
+
+from src.etl.enrich import PARTITION_BYTES, file_date_format, parse_dates
+from src.utils.io import csv_byte_ranges, merge_dtypes, read_csv_range
+
+RAW = Path("data/raw/bike_sales_100k.csv")
+REPORTS = Path("reports")
+
+# Distinct values are counted exactly up to this many, then estimated by HyperLogLog
+EXACT_DISTINCT = 10_000
+# HyperLogLog precision: 2**14 registers, about 0.8% standard error
+HLL_BITS = 14
+SAMPLE_VALUES = 5  # first distinct values listed in the data dictionary
+RESERVOIR = 100  # random values kept per column
+PREVIEW_ROWS = 200
+
+
+class HyperLogLog:
+    """Mergeable distinct-count estimate over 64-bit hashes."""
+
+    def __init__(self, bits: int = HLL_BITS):
+        self.bits = bits
+        self.registers = np.zeros(2**bits, dtype=np.uint8)
+
+    def add(self, hashes: np.ndarray) -> None:
+        idx = (hashes >> np.uint64(64 - self.bits)).astype(np.int64)
+        rest = hashes & np.uint64(2 ** (64 - self.bits) - 1)
+        # rank = position of the leftmost 1 in the remaining bits; the values fit a float exactly
+        nonzero = rest > 0
+        rank = np.full(len(rest), 64 - self.bits + 1, dtype=np.uint8)
+        rank[nonzero] = 64 - self.bits - np.floor(np.log2(rest[nonzero].astype(np.float64)))
+        np.maximum.at(self.registers, idx, rank)
+
+    def merge(self, other: HyperLogLog) -> HyperLogLog:
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(2.0 ** -self.registers.astype(float))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:  # small range: linear counting
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+
+@dataclass
+class ColumnSketch:
+    """
+    One column's summary over any number of chunks, mergeable in input order: counts,
+    distinct values (exact while few, then HyperLogLog), the first distinct values,
+    a uniform reservoir sample and min/max.
+    """
+
+    dtypes: list = field(default_factory=list)
+    count: int = 0
+    nulls: int = 0
+    distinct: set | None = field(default_factory=set)
+    hll: HyperLogLog = field(default_factory=HyperLogLog)
+    first: list[str] = field(default_factory=list)
+    sample: list = field(default_factory=list)
+    seen: int = 0  # non-null values the reservoir was drawn from
+    min: object = None
+    max: object = None
+
+    @classmethod
+    def of(cls, s: pd.Series, rng: np.random.Generator) -> ColumnSketch:
+        values = s.dropna()
+        numeric = pd.api.types.is_numeric_dtype(values.dtype)
+        # 5 and 5.0 hash alike, so a column read as int in one chunk and float in another
+        # counts each value once
+        if numeric:
+            keys = values.to_numpy(dtype=np.float64)
+        elif pd.api.types.is_string_dtype(values.dtype) and values.dtype != object:
+            keys = values.to_numpy()
+        else:
+            keys = values.astype(str).to_numpy()
+        uniques = pd.unique(keys)
+        sketch = cls(dtypes=[s.dtype], count=len(s), nulls=len(s) - len(values))
+        sketch.hll.add(hash_array(uniques))
+        sketch.distinct = set(uniques.tolist()) if len(uniques) <= EXACT_DISTINCT else None
+        # in order of first appearance, as `astype(str).unique()` lists them
+        first = pd.unique(values.to_numpy()) if numeric else uniques
+        sketch.first = [str(v) for v in first[:SAMPLE_VALUES]]
+        sketch.seen = len(values)
+        take = rng.choice(len(values), size=min(RESERVOIR, len(values)), replace=False)
+        sketch.sample = values.iloc[np.sort(take)].tolist()
+        if len(values):
+            low, high = (values.min(), values.max()) if numeric else (min(uniques), max(uniques))
+            sketch.min, sketch.max = low, high
+        return sketch
+
+    def merge(self, other: ColumnSketch, rng: np.random.Generator) -> ColumnSketch:
+        self.dtypes += other.dtypes
+        self.count += other.count
+        self.nulls += other.nulls
+        self.hll.merge(other.hll)
+        if self.distinct is not None and other.distinct is not None:
+            self.distinct |= other.distinct
+            if len(self.distinct) > EXACT_DISTINCT:
+                self.distinct = None
+        else:
+            self.distinct = None
+        self.first += [v for v in other.first if v not in self.first]
+        self.first = self.first[:SAMPLE_VALUES]
+        # each side's reservoir is uniform over its values: draw from them in proportion
+        total = self.seen + other.seen
+        if total:
+            n = min(RESERVOIR, len(self.sample) + len(other.sample))
+            mine = rng.hypergeometric(self.seen, other.seen, n) if other.seen else n
+            mine = min(mine, len(self.sample))
+            self.sample = _subsample(self.sample, mine, rng) + _subsample(
+                other.sample, n - mine, rng
+            )
+        self.seen = total
+        for bound, pick in (("min", min), ("max", max)):
+            ours, theirs = getattr(self, bound), getattr(other, bound)
+            if ours is None or theirs is None:
+                setattr(self, bound, theirs if ours is None else ours)
+            else:
+                setattr(self, bound, pick(ours, theirs, key=_comparable))
+        return self
+
+    @property
+    def unique(self) -> int:
+        return len(self.distinct) if self.distinct is not None else self.hll.estimate()
+
+    @property
+    def dtype(self) -> str:
+        if not self.dtypes:
+            return "object"
+        dtype = merge_dtypes(self.dtypes)
+        return "str" if dtype is str else str(dtype)
+
+
+def _subsample(values: list, n: int, rng: np.random.Generator) -> list:
+    if n >= len(values):
+        return list(values)
+    return [values[i] for i in np.sort(rng.choice(len(values), size=n, replace=False))]
+
+
+def _comparable(v):
+    # a column that drifts between numbers and text orders as text
+    return (isinstance(v, str), v if isinstance(v, str) else float(v))
+
+
+@dataclass
+class Audit:
+    """Sketches of every column plus the parsed-date range of the date column."""
+
+    columns: dict[str, ColumnSketch]
+    rows: int
+    date_min: pd.Timestamp | None = None
+    date_max: pd.Timestamp | None = None
+    date_non_null: int = 0
+    head: pd.DataFrame | None = None
+
+    def merge(self, other: Audit, rng: np.random.Generator) -> Audit:
+        for col, sketch in other.columns.items():
+            if col in self.columns:
+                self.columns[col].merge(sketch, rng)
+            else:
+                self.columns[col] = sketch
+        self.rows += other.rows
+        self.date_non_null += other.date_non_null
+        lows = [d for d in (self.date_min, other.date_min) if d is not None]
+        highs = [d for d in (self.date_max, other.date_max) if d is not None]
+        self.date_min = min(lows) if lows else None
+        self.date_max = max(highs) if highs else None
+        if self.head is None or len(self.head) < PREVIEW_ROWS:
+            self.head = pd.concat([h for h in (self.head, other.head) if h is not None])
+            self.head = self.head.head(PREVIEW_ROWS)
+        return self
+
+
+def _audit_range(
+    path: Path, start: int, end: int, date_col: str | None, date_format: str | None, seed: int
+) -> Audit:
+    df = read_csv_range(path, start, end)
+    rng = np.random.default_rng([seed, start])
+    audit = Audit(
+        columns={col: ColumnSketch.of(df[col], rng) for col in df.columns},
+        rows=len(df),
+        head=df.head(PREVIEW_ROWS),
+    )
+    if date_col:
+        dates = parse_dates(df[date_col], date_format)["Date"].dropna()
+        if len(dates):
+            audit.date_min, audit.date_max = dates.min(), dates.max()
+        audit.date_non_null = len(dates)
+    return audit
+
+
+def audit_csv(path: str | Path, workers: int | None = None, seed: int = 0) -> Audit:
+    """
+    Profile `path` in one streaming pass: line-aligned byte ranges of the file are
+    sketched (in `workers` processes) and the sketches merged in input order, so memory
+    is bounded by the range size whatever the file size.
+    """
+    path = Path(path)
+    header = pd.read_csv(path, nrows=0)
+    date_col = next((c for c in header.columns if "date" in c.lower()), None)
+    date_format = file_date_format(path, date_col) if date_col else None
+    ranges = csv_byte_ranges(
+        path, max(workers or 1, math.ceil(path.stat().st_size / PARTITION_BYTES))
+    )
+    args = [(path, a, b, date_col, date_format, seed) for a, b in ranges]
+    rng = np.random.default_rng(seed)
+    empty = Audit({col: ColumnSketch() for col in header.columns}, rows=0)
+    if (workers or 1) > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return reduce(lambda a, b: a.merge(b, rng), pool.map(_audit_range, *zip(*args)), empty)
+    return reduce(lambda a, b: a.merge(b, rng), (_audit_range(*a) for a in args), empty)
+
+
+def data_dictionary(audit: Audit) -> pd.DataFrame:
+    rows = []
+    for col, s in audit.columns.items():
+        non_null = s.count - s.nulls
+        rows.append(
+            {
+                "column": col,
+                "dtype": s.dtype,
+                "non_null": non_null,
+                "null_%": round(100 * (1 - non_null / s.count), 2) if s.count else 0.0,
+                "unique": s.unique,
+                "sample_values": "; ".join(s.first),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def quick_profile(audit: Audit, date_col: str | None) -> str:
+    lines = ["# Quick Profile", "", f"- Rows: {audit.rows}", f"- Cols: {len(audit.columns)}"]
+    if date_col and audit.date_non_null:
+        lines.append(
+            f"- Date column: {date_col} ({audit.date_min} → {audit.date_max}; "
+            f"non-null: {audit.date_non_null})"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def column_profile(audit: Audit) -> dict:
+    """Every sketch as JSON: the dictionary fields plus min/max and the reservoir sample."""
+    out = {}
+    for col, s in audit.columns.items():
+        out[col] = {
+            "dtype": s.dtype,
+            "count": s.count,
+            "nulls": s.nulls,
+            "unique": s.unique,
+            "unique_exact": s.distinct is not None,
+            "min": _jsonable(s.min),
+            "max": _jsonable(s.max),
+            "sample": [_jsonable(v) for v in s.sample],
+        }
+    return out
+
+
+def _jsonable(v):
+    return v.item() if isinstance(v, np.generic) else v
+
+
+def main(
+    in_path: str | Path = RAW,
+    reports: str | Path = REPORTS,
+    workers: int | None = None,
+    seed: int = 0,
+) -> None:
+    reports = Path(reports)
+    reports.mkdir(parents=True, exist_ok=True)
+    audit = audit_csv(in_path, workers=workers, seed=seed)
+    date_col = next((c for c in audit.columns if "date" in c.lower()), None)
+
+    paths = {
+        "dictionary": reports / "data_dictionary.csv",
+        "preview": reports / "preview_head.csv",
+        "profile": reports / "quick_profile.md",
+        "columns": reports / "column_profile.json",
+    }
+    data_dictionary(audit).to_csv(paths["dictionary"], index=False)
+    audit.head.to_csv(paths["preview"], index=False)
+    paths["profile"].write_text(quick_profile(audit, date_col))
+    paths["columns"].write_text(json.dumps(column_profile(audit), indent=2, default=str) + "\n")
+
+    print("Saved:")
+    for path in paths.values():
+        print(f" - {path}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="in_path", default=str(RAW))
+    ap.add_argument("--reports", default=str(REPORTS))
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--seed", type=int, default=0, help="seed of the reservoir samples")
+    args = ap.parse_args()
+    main(args.in_path, args.reports, workers=args.workers, seed=args.seed)
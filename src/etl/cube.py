@@ -0,0 +1,151 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from src.utils.io import atomic_output, resolve_output
+
+if TYPE_CHECKING:
+    import duckdb
+
+CUBE_PATH = Path("data/processed/bike_sales_cube.parquet")
+CUBE_TABLE = "sales_cube"
+
+# Low-cardinality columns every dashboard chart and sql/ report groups by. Product_Category
+# is a function of Bike_Model and Month_Start of Month, so they cost no extra cells.
+CUBE_DIMENSIONS = [
+    "Month",
+    "Month_Start",
+    "Bike_Model",
+    "Product_Category",
+    "Store_Location",
+    "Warehouse",
+    "Client_Type",
+    "Payment_Method",
+]
+
+# Dashboard sidebar multiselect columns, in display order
+FILTER_COLUMNS = ["Warehouse", "Client_Type", "Store_Location", "Bike_Model"]
+
+# Dimensions kept as dates; the others are stored as plain text
+DATE_DIMENSIONS = {"Month_Start"}
+
+# Additive measures (name -> aggregate, source column): SUM over cube rows equals the same
+# aggregate over the sales rows they roll up. Orders (COUNT(*)) replaces row counts and the
+# fee-rate pair rebuilds AVG(Payment_Fee_Rate).
+CUBE_MEASURES = {
+    "Quantity": ("SUM", "Quantity"),
+    "Gross_Revenue": ("SUM", "Gross_Revenue"),
+    "Net_Revenue": ("SUM", "Net_Revenue"),
+    "Payment_Fee": ("SUM", "Payment_Fee"),
+    "Payment_Fee_Rate_Sum": ("SUM", "Payment_Fee_Rate"),
+    "Payment_Fee_Rate_Count": ("COUNT", "Payment_Fee_Rate"),
+}
+
+
+def relation_for(path: str | Path) -> str:
+    """DuckDB table function reading `path`: a Hive-partitioned dataset, Parquet file or CSV."""
+    path = Path(path)
+    if path.is_dir():
+        path = resolve_output(path)
+        return f"read_parquet('{path.as_posix()}/**/*.parquet', hive_partitioning = true)"
+    if path.suffix == ".parquet":
+        return f"read_parquet('{path.as_posix()}')"
+    return f"read_csv_auto('{path.as_posix()}')"
+
+
+def with_month(relation: str, columns: set[str]) -> str:
+    """
+    `relation` plus the _MonthDT month index: the native Month_Start written by enrichment;
+    data enriched before it existed falls back to parsing the Month string, else the month
+    of Date.
+    """
+    month = []
+    if "Month_Start" in columns:
+        return f'(SELECT *, CAST("Month_Start" AS TIMESTAMP) AS _MonthDT FROM {relation})'
+    if "Month" in columns:
+        month.append("TRY_STRPTIME(CAST(\"Month\" AS VARCHAR) || '-01', '%Y-%m-%d')")
+    if "Date" in columns:
+        month.append("DATE_TRUNC('month', TRY_CAST(\"Date\" AS TIMESTAMP))")
+    month_expr = f"COALESCE({', '.join(month)})" if month else "NULL::TIMESTAMP"
+    return f"(SELECT *, {month_expr} AS _MonthDT FROM {relation})"
+
+
+def cube_sql(con: duckdb.DuckDBPyConnection, relation: str) -> str:
+    """GROUP BY query rolling `relation` up to the dimensions and measures it has."""
+    columns = {d[0] for d in con.execute(f"SELECT * FROM {relation} LIMIT 0").description}
+    dims = [
+        f'CAST("{c}" AS {"DATE" if c in DATE_DIMENSIONS else "VARCHAR"}) AS "{c}"'
+        for c in CUBE_DIMENSIONS
+        if c in columns
+    ]
+    measures = ['COUNT(*) AS "Orders"']
+    for name, (agg, col) in CUBE_MEASURES.items():
+        if col in columns:
+            expr = f'{agg}("{col}")'
+            if name == "Quantity":
+                expr = f"CAST({expr} AS BIGINT)"
+            measures.append(f'{expr} AS "{name}"')
+    return f"""
+        SELECT {', '.join(dims + measures)}
+        FROM {relation}
+        GROUP BY ALL
+        ORDER BY ALL
+    """
+
+
+def write_cube(source: str | Path, out_path: str | Path = CUBE_PATH) -> int:
+    """Roll the enriched data at `source` up to a cube Parquet file; returns its row count."""
+    import duckdb
+
+    con = duckdb.connect()
+    try:
+        with atomic_output(out_path) as tmp:
+            con.execute(
+                f"COPY ({cube_sql(con, relation_for(source))}) TO '{tmp.as_posix()}' "
+                "(FORMAT parquet)"
+            )
+        out = Path(out_path).as_posix()
+        return con.execute(f"SELECT count(*) FROM read_parquet('{out}')").fetchone()[0]
+    finally:
+        con.close()
+
+
+def refresh_cube_table(con: duckdb.DuckDBPyConnection, table: str = "sales") -> None:
+    """Rebuild the cube table next to `table` inside a DuckDB database."""
+    con.execute(f"CREATE OR REPLACE TABLE {CUBE_TABLE} AS {cube_sql(con, table)}")
+
+
+def update_cube_table(con: duckdb.DuckDBPyConnection, relation: str, table: str = "sales") -> None:
+    """
+    Merge the rows of `relation` (new rows of `table` only) into the cube table: the
+    measures of a cell already there are added to, new cells are inserted. Rebuilt from
+    `table` when missing, or when its columns no longer match those of `relation`.
+    """
+    new = cube_sql(con, relation)
+    columns = [d[0] for d in con.execute(f"SELECT * FROM ({new}) LIMIT 0").description]
+    exists = con.execute(
+        "SELECT count(*) FROM information_schema.tables WHERE table_name = ?", [CUBE_TABLE]
+    ).fetchone()[0]
+    if not exists or columns != [
+        d[0] for d in con.execute(f"SELECT * FROM {CUBE_TABLE} LIMIT 0").description
+    ]:
+        refresh_cube_table(con, table)
+        return
+    dims = [c for c in columns if c in CUBE_DIMENSIONS]
+    match = " AND ".join(f'c."{d}" IS NOT DISTINCT FROM n."{d}"' for d in dims)
+    # a SUM over only NULLs is NULL in a rebuilt cube, so NULL + x must stay x
+    add = ", ".join(
+        f'"{m}" = COALESCE(c."{m}" + n."{m}", c."{m}", n."{m}")'
+        for m in columns
+        if m not in CUBE_DIMENSIONS
+    )
+    # UPDATE ... FROM and an anti-join INSERT rather than MERGE, which needs DuckDB 1.4
+    con.execute(f"CREATE OR REPLACE TEMP TABLE cube_delta AS {new}")
+    try:
+        con.execute(f"UPDATE {CUBE_TABLE} AS c SET {add} FROM cube_delta AS n WHERE {match}")
+        con.execute(
+            f"INSERT INTO {CUBE_TABLE} BY NAME "
+            f"SELECT n.* FROM cube_delta AS n ANTI JOIN {CUBE_TABLE} AS c ON {match}"
+        )
+    finally:
+        con.execute("DROP TABLE IF EXISTS cube_delta")
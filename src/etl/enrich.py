@@ -1,11 +1,35 @@
 from __future__ import annotations
 import argparse
+import math
+import tempfile
+import warnings
+from functools import partial
+from itertools import accumulate, count
 from pathlib import Path
 import pandas as pd
+from pandas.tseries.api import guess_datetime_format
 from pandas.util import hash_pandas_object
 
-from src.utils.io import read_csv, write_csv, write_parquet
-from src.etl.rules import fee_rate_for, categorize_product, warehouse_region
+from src.utils.io import (
+    CSV_ENGINES,
+    ParquetAppender,
+    atomic_output,
+    clear_parquet,
+    concat_files,
+    concat_parquet,
+    csv_byte_ranges,
+    iter_csv,
+    merge_dtypes,
+    read_csv,
+    read_csv_range,
+    scan_csv_dtypes,
+    write_csv,
+    write_parquet,
+)
+from src.etl.cube import CUBE_PATH, write_cube
+from src.etl.rules import fee_rates, categorize_products, warehouse_regions
+from src.etl.schema import CLIENT_TYPES, apply_schema
+from src.utils.instrument import Instrument, instrumented, stage
 
 
 def guess_revenue_columns(df: pd.DataFrame) -> tuple[str | None, str | None]:
@@ -26,86 +50,517 @@ def guess_revenue_columns(df: pd.DataFrame) -> tuple[str | None, str | None]:
     return None, None
 
 
-def compute_client_type(df: pd.DataFrame, target_wholesale_ratio: float = 0.30) -> pd.Series:
+def compute_client_type(
+    df: pd.DataFrame, target_wholesale_ratio: float = 0.30, key: str | None = None
+) -> pd.Series:
     """
     Deterministic Retail/Wholesale split using a hash so it stays stable across runs.
+
+    Hashes the row index by default; pass `key` (e.g. "Sale_ID") to hash a business key
+    instead, so a row keeps its type through re-ordering, chunking and appends.
     """
-    h = hash_pandas_object(df.index.to_series(), index=False).astype("uint64")
+    values = df[key] if key else df.index.to_series()
+    h = hash_pandas_object(values, index=False).to_numpy(dtype="uint64")
     frac = (h % 10_000) / 10_000.0
+    codes = (frac < target_wholesale_ratio).astype("int8")  # 0 = Retail, 1 = Wholesale
     return pd.Series(
-        pd.Categorical(
-            ["Wholesale" if x < target_wholesale_ratio else "Retail" for x in frac],
-            categories=["Retail", "Wholesale"],
-        ),
+        pd.Categorical.from_codes(codes, categories=CLIENT_TYPES),
         index=df.index,
         name="Client_Type",
     )
 
 
-def main(in_path: str, out_csv: str, out_parquet: str | None = None) -> None:
-    src = Path(in_path)
-    df = read_csv(src)
+# Strings pandas skips when picking the element it guesses a date format from
+SKIPPED_DATE_STRINGS = {"", "NaT", "nat", "NAT", "nan", "NaN", "NAN", "now", "today"}
+
+
+# Distinct date strings (in order of appearance) a guessed format is checked against
+DATE_CHECK_VALUES = 1000
+
+# Share of those strings a format may fail to parse (they become NaT) and still be used
+DATE_FORMAT_TOLERANCE = 0.01
+
+# Leading strings a format is guessed from, for an extract whose first dates are garbage
+DATE_GUESS_TRIES = 10
+
+# Formats that parse each value on its own, with the day order the values showed
+MIXED_FORMATS = {"mixed": False, "mixed-dayfirst": True}
+
+
+def leading_date_values(values: pd.Series, limit: int = DATE_CHECK_VALUES) -> list:
+    """The first `limit` distinct usable values of a date column, in order of appearance."""
+    distinct = values.dropna().unique()
+    return [v for v in distinct if v not in SKIPPED_DATE_STRINGS][:limit]
+
 
+def to_datetime(values: pd.Series, date_format: str | None) -> pd.Series:
+    """`pd.to_datetime` with `date_format`, unparseable values as NaT."""
+    if date_format in MIXED_FORMATS:
+        return pd.to_datetime(
+            values, format="mixed", dayfirst=MIXED_FORMATS[date_format], errors="coerce"
+        )
+    return pd.to_datetime(values, format=date_format, errors="coerce")
+
+
+def _day_first(fmt: str) -> bool:
+    return "%d" in fmt and "%m" in fmt and fmt.index("%d") < fmt.index("%m")
+
+
+def guess_date_format(values: pd.Series) -> str | None:
+    """
+    A format for the dates in `values`: guessed from the leading usable strings
+    month-first and day-first, and checked against the first DATE_CHECK_VALUES distinct
+    ones (a dd-mm-yyyy extract can start with days of 12 or less). The order that parses
+    more of them wins, and is kept if all but DATE_FORMAT_TOLERANCE of them parse; the
+    rest are bad values and become NaT. Otherwise the values are parsed one by one in the
+    day order found ("mixed" or "mixed-dayfirst"), as they are when not strings. None
+    when there is nothing to guess from yet.
+    """
+    distinct = leading_date_values(values)
+    if not distinct:
+        return None
+    if not isinstance(distinct[0], str):
+        return "mixed"
+    strings = pd.Series([v for v in distinct if isinstance(v, str)])
+    best = (-1, None)
+    for dayfirst in (False, True):
+        with warnings.catch_warnings():
+            # pandas warns when the order it finds is not the one asked for; both are tried
+            warnings.simplefilter("ignore", UserWarning)
+            guesses = (
+                guess_datetime_format(v, dayfirst=dayfirst) for v in strings[:DATE_GUESS_TRIES]
+            )
+            fmt = next((g for g in guesses if g), None)
+        if fmt:
+            parsed = int(to_datetime(strings, fmt).notna().sum())
+            if parsed > best[0]:
+                best = (parsed, fmt)
+    parsed, fmt = best
+    if fmt is None:
+        return "mixed"
+    if len(strings) - parsed <= max(1, DATE_FORMAT_TOLERANCE * len(strings)):
+        return fmt
+    return "mixed-dayfirst" if _day_first(fmt) else "mixed"
+
+
+def file_date_format(path: str | Path, date_col: str, chunksize: int = 100_000) -> str | None:
+    """
+    `guess_date_format` of the date column of the CSV at `path` as a whole-file read
+    would see it: its leading distinct values are read chunk by chunk until there are
+    DATE_CHECK_VALUES of them, so batched and parallel runs use the same format.
+    """
+    seen: dict = {}
+    for chunk in pd.read_csv(path, usecols=[date_col], chunksize=chunksize):
+        seen.update(dict.fromkeys(leading_date_values(chunk[date_col])))
+        if len(seen) >= DATE_CHECK_VALUES:
+            break
+    return guess_date_format(pd.Series(list(seen), dtype=object))
+
+
+def detect_columns(columns) -> dict[str, str | None]:
+    """The raw columns enrichment reads (date, store, model, qty, pay), matched by name."""
     # Standardize common columns if present
-    colmap = {c.lower(): c for c in df.columns}
-    date_col = colmap.get("date")
-    store_col = colmap.get("store_location") or colmap.get("store") or colmap.get("location")
-    model_col = colmap.get("bike_model") or colmap.get("product") or colmap.get("item_name")
-    qty_col = colmap.get("quantity") or colmap.get("qty")
+    colmap = {c.lower(): c for c in columns}
+    return {
+        "date": colmap.get("date"),
+        "store": colmap.get("store_location") or colmap.get("store") or colmap.get("location"),
+        "model": colmap.get("bike_model") or colmap.get("product") or colmap.get("item_name"),
+        "qty": colmap.get("quantity") or colmap.get("qty"),
+        "pay": colmap.get("payment_method") or colmap.get("payment") or colmap.get("pay_method"),
+    }
 
-    # Product category
-    df["Product_Category"] = (
-        df[model_col].astype(str).map(categorize_product) if model_col else "Bikes"
+
+def parse_dates(values: pd.Series, date_format: str | None) -> pd.DataFrame:
+    """
+    Date, Year, Month ("YYYY-MM") and Month_Start (first day of the month) for raw date
+    values, all missing where the date does not parse. Each distinct value is parsed once
+    with `date_format` and the results are mapped back by code: extracts repeat a few
+    thousand days over millions of rows, and the output matches parsing every row.
+    """
+    codes, uniques = pd.factorize(values)
+    # a trailing missing value takes code -1, so nulls map to NaT like any unparseable value
+    distinct = pd.Series([*uniques, None], dtype=object)
+    # Fixed unit whether or not a batch has NaT, so every batch has the same types
+    dates = to_datetime(distinct, date_format).dt.as_unit("us")
+    months = dates.dt.to_period("M")
+    month_codes, month_labels = pd.factorize(months.astype(str))
+    return pd.DataFrame(
+        {
+            "Date": dates.take(codes).to_numpy(),
+            "Year": dates.dt.year.take(codes).to_numpy(),
+            "Month": pd.Categorical.from_codes(month_codes[codes], month_labels),
+            "Month_Start": months.dt.to_timestamp().dt.as_unit("us").take(codes).to_numpy(),
+        },
+        index=values.index,
     )
 
+
+def enrich_frame(
+    df: pd.DataFrame, date_format: str | None = None, client_key: str | None = None
+) -> pd.DataFrame:
+    """
+    Add the derived columns to a raw sales frame (in place) and return it.
+
+    Every column is row-local, so a batch of a larger file enriches to exactly the rows
+    the whole file would, provided the batch keeps its global row positions as index and
+    `date_format` is the one guessed for the whole file.
+    """
+    cols = detect_columns(df.columns)
+    date_col, store_col, model_col = cols["date"], cols["store"], cols["model"]
+    qty_col, pay_col = cols["qty"], cols["pay"]
+
+    n = len(df)
+
+    # Product category
+    with stage("categorize_products", rows_in=n):
+        df["Product_Category"] = categorize_products(df[model_col]) if model_col else "Bikes"
+
     # Warehouse region from store location
-    df["Warehouse"] = df[store_col].astype(str).map(warehouse_region) if store_col else "East"
+    with stage("warehouse_regions", rows_in=n):
+        df["Warehouse"] = warehouse_regions(df[store_col]) if store_col else "East"
 
     # Client type (deterministic split 70/30)
-    df["Client_Type"] = compute_client_type(df, target_wholesale_ratio=0.30)
+    with stage("client_type", rows_in=n):
+        df["Client_Type"] = compute_client_type(df, target_wholesale_ratio=0.30, key=client_key)
 
     # Payment fee rate
-    pay_col = colmap.get("payment_method") or colmap.get("payment") or colmap.get("pay_method")
-    df["Payment_Fee_Rate"] = df[pay_col].astype(str).map(fee_rate_for) if pay_col else 0.0
+    with stage("fee_rates", rows_in=n):
+        df["Payment_Fee_Rate"] = fee_rates(df[pay_col]) if pay_col else 0.0
 
     # Gross / Net revenue
-    gross_col, unit_price_col = guess_revenue_columns(df)
-    if gross_col:
-        df["Gross_Revenue"] = pd.to_numeric(df[gross_col], errors="coerce")
-    elif unit_price_col and qty_col:
-        unit = pd.to_numeric(df[unit_price_col], errors="coerce")
-        qty = pd.to_numeric(df[qty_col], errors="coerce")
-        df["Gross_Revenue"] = unit * qty
-    else:
-        # Best-effort: look for any price * quantity combo; otherwise zeros
-        df["Gross_Revenue"] = 0.0
-
-    df["Payment_Fee"] = df["Gross_Revenue"] * df["Payment_Fee_Rate"]
-    df["Net_Revenue"] = df["Gross_Revenue"] - df["Payment_Fee"]
+    with stage("revenue", rows_in=n):
+        gross_col, unit_price_col = guess_revenue_columns(df)
+        if gross_col:
+            df["Gross_Revenue"] = pd.to_numeric(df[gross_col], errors="coerce")
+        elif unit_price_col and qty_col:
+            unit = pd.to_numeric(df[unit_price_col], errors="coerce")
+            qty = pd.to_numeric(df[qty_col], errors="coerce")
+            df["Gross_Revenue"] = unit * qty
+        else:
+            # Best-effort: look for any price * quantity combo; otherwise zeros
+            df["Gross_Revenue"] = 0.0
+
+        df["Payment_Fee"] = df["Gross_Revenue"] * df["Payment_Fee_Rate"]
+        df["Net_Revenue"] = df["Gross_Revenue"] - df["Payment_Fee"]
 
     # Clean dates (optional but useful)
-    if date_col:
-        df["Date"] = pd.to_datetime(df[date_col], errors="coerce")
-        df["Year"] = df["Date"].dt.year
-        df["Month"] = df["Date"].dt.to_period("M").astype(str)
-    else:
-        df["Year"] = None
-        df["Month"] = None
-
-    # Save
-    write_csv(df, out_csv)
-    if out_parquet:
-        write_parquet(df, out_parquet)
+    with stage("date_parse", rows_in=n):
+        if date_col:
+            fmt = date_format or guess_date_format(df[date_col])
+            for col, values in parse_dates(df[date_col], fmt).items():
+                df[col] = values
+        else:
+            df["Year"] = None
+            df["Month"] = None
+            df["Month_Start"] = pd.Series(pd.NaT, index=df.index, dtype="datetime64[us]")
 
-    print(f"Saved enriched CSV → {out_csv}")
+    with stage("apply_schema", rows_in=n):
+        return apply_schema(df)
+
+
+def enrich_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """In-memory enrichment of a whole raw frame."""
+    return enrich_frame(df)
+
+
+def _main_chunked(
+    src: Path,
+    out_csv: str,
+    out_parquet: str | None,
+    chunksize: int,
+    client_key: str | None,
+    parquet_options: dict,
+    columns: list[str] | None = None,
+) -> None:
+    """
+    Streaming variant of `main`: memory is bounded by `chunksize` rows. A first pass
+    pins the column dtypes to what a whole-file read would infer, and the date format is
+    guessed from the file's leading dates as the whole-file read guesses it, so the CSV
+    comes out byte-identical to the in-memory path.
+    """
+    with stage("scan_dtypes", bytes_read=src.stat().st_size):
+        dtypes = scan_csv_dtypes(src, chunksize, columns=columns)
+        date_col = {c.lower(): c for c in dtypes}.get("date")
+        date_format = file_date_format(src, date_col, chunksize) if date_col else None
+    appender = None
     if out_parquet:
-        print(f"Saved enriched Parquet → {out_parquet}")
+        clear_parquet(out_parquet)
+        appender = ParquetAppender(out_parquet, **parquet_options)
+    try:
+        chunks = iter_csv(src, chunksize, dtype=dtypes, columns=columns)
+        for i in count():
+            with stage("read_csv") as rec:
+                chunk = next(chunks, None)
+                rec.rows_out = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                break
+            chunk = enrich_frame(chunk, date_format=date_format, client_key=client_key)
+            with stage("write_csv", rows_in=len(chunk), out_path=out_csv):
+                write_csv(chunk, out_csv, append=i > 0)
+            if appender:
+                # sized by the appender: walking the growing dataset every chunk is quadratic
+                with stage("write_parquet", rows_in=len(chunk)) as rec:
+                    written = appender.bytes_written
+                    appender.write(chunk)
+                    rec.bytes_written = appender.bytes_written - written
+    finally:
+        if appender:
+            appender.close()
+
+
+# Upper bound on the raw bytes one worker parses at a time in the parallel path
+PARTITION_BYTES = 64 * 1024**2
+
+
+def _scan_partition(
+    path: Path, start: int, end: int, date_col: str | None, columns: list[str] | None
+) -> tuple:
+    df = read_csv_range(path, start, end, columns=columns)
+    return dict(df.dtypes), len(df), leading_date_values(df[date_col]) if date_col else []
+
+
+def _enrich_partition(
+    path: Path,
+    start: int,
+    end: int,
+    offset: int,
+    dtypes: dict[str, object],
+    date_format: str | None,
+    client_key: str | None,
+    part: Path,
+    header: bool,
+    parquet_out: Path | None,
+    parquet_options: dict,
+    columns: list[str] | None,
+) -> None:
+    df = read_csv_range(path, start, end, dtype=dtypes, columns=columns)
+    df.index = pd.RangeIndex(offset, offset + len(df))
+    df = enrich_frame(df, date_format=date_format, client_key=client_key)
+    # only the first part carries the header, so the parts concatenate into one CSV
+    write_csv(df, part.with_suffix(".csv"), append=not header)
+    if parquet_out:
+        with ParquetAppender(parquet_out, basename=part.name, **parquet_options) as appender:
+            appender.write(df)
+
+
+def _main_parallel(
+    src: Path,
+    out_csv: str,
+    out_parquet: str | None,
+    workers: int,
+    client_key: str | None,
+    parquet_options: dict,
+    columns: list[str] | None = None,
+) -> None:
+    """
+    Multi-process variant of `main`. The input is cut into line-aligned byte ranges;
+    a first parallel pass resolves the dtypes, row offsets and date format (from the
+    leading dates of all ranges) the whole file would get, a second one enriches each
+    range into a part file, and the parts are concatenated in input order, so the output
+    matches the serial run. Partitioned Parquet is written by the workers straight into
+    the dataset, one file per range and partition, named in input order.
+    """
+    parts = max(workers, math.ceil(src.stat().st_size / PARTITION_BYTES))
+    ranges = csv_byte_ranges(src, parts)
+    from concurrent.futures import ProcessPoolExecutor
+
+    header = pd.read_csv(src, nrows=0).columns
+    if columns is not None:
+        header = [c for c in header if c in set(columns)]
+    date_col = {c.lower(): c for c in header}.get("date")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        with stage("scan_partitions", bytes_read=src.stat().st_size):
+            scans = list(
+                pool.map(
+                    _scan_partition, *zip(*[(src, a, b, date_col, columns) for a, b in ranges])
+                )
+            )
+        dtypes = {
+            col: merge_dtypes([s[0][col] for s in scans if s[1]] or [s[0][col] for s in scans])
+            for col in scans[0][0]
+        }
+        offsets = [0, *accumulate(s[1] for s in scans)]
+        # the leading distinct dates of the whole file, as the serial run guesses from
+        leading = list(dict.fromkeys(v for s in scans for v in s[2]))[:DATE_CHECK_VALUES]
+        date_format = guess_date_format(pd.Series(leading, dtype=object)) if date_col else None
+
+        Path(out_csv).parent.mkdir(parents=True, exist_ok=True)
+        if out_parquet:
+            clear_parquet(out_parquet)
+        partitioned = bool(parquet_options.get("partition_cols"))
+        with tempfile.TemporaryDirectory(dir=Path(out_csv).parent) as tmp:
+            names = [Path(tmp) / f"part-{i:05d}" for i in range(len(ranges))]
+            # workers write Parquet parts next to their CSV parts, or into the dataset
+            if not out_parquet:
+                targets = [None] * len(names)
+            elif partitioned:
+                targets = [Path(out_parquet)] * len(names)
+            else:
+                targets = names
+            jobs = [
+                (src, a, b, off, dtypes, date_format, client_key, name, i == 0, target)
+                for i, ((a, b), off, name, target) in enumerate(
+                    zip(ranges, offsets, names, targets)
+                )
+            ]
+            enrich_part = partial(
+                _enrich_partition, parquet_options=parquet_options, columns=columns
+            )
+            # per-stage records of the workers stay in the workers; this times them as one
+            with stage("enrich_partitions", rows_in=offsets[-1], bytes_read=src.stat().st_size):
+                list(pool.map(enrich_part, *zip(*jobs)))
+            with stage("write_csv", rows_in=offsets[-1], out_path=out_csv):
+                concat_files([n.with_suffix(".csv") for n in names], out_csv)
+            if out_parquet and not partitioned:
+                with stage("write_parquet", rows_in=offsets[-1], out_path=out_parquet):
+                    concat_parquet(names, out_parquet, **parquet_options)
+
+
+def main(
+    in_path: str,
+    out_csv: str,
+    out_parquet: str | None = None,
+    chunksize: int | None = None,
+    client_key: str | None = None,
+    workers: int | None = None,
+    partition_by: list[str] | None = None,
+    row_group_size: int | None = None,
+    compression: str = "snappy",
+    out_cube: str | None = None,
+    instrument: Instrument | None = None,
+    csv_engine: str = "pandas",
+    columns: list[str] | None = None,
+    engine: str = "pandas",
+) -> None:
+    with instrumented(instrument):
+        src = Path(in_path)
+        parquet_options = {
+            "partition_cols": partition_by,
+            "row_group_size": row_group_size,
+            "compression": compression,
+        }
+        # written next to the targets and renamed into place: readers never see partial output
+        with atomic_output(out_csv) as tmp_csv, atomic_output(out_parquet) as tmp_parquet:
+            if engine == "duckdb":
+                from src.etl.enrich_sql import main_duckdb
+
+                main_duckdb(src, tmp_csv, tmp_parquet, client_key, parquet_options, columns)
+            elif workers and workers > 1 and csv_byte_ranges(src, 1):
+                _main_parallel(
+                    src, tmp_csv, tmp_parquet, workers, client_key, parquet_options, columns
+                )
+            elif chunksize:
+                _main_chunked(
+                    src, tmp_csv, tmp_parquet, chunksize, client_key, parquet_options, columns
+                )
+            else:
+                with stage("read_csv", bytes_read=src.stat().st_size) as rec:
+                    df = read_csv(src, engine=csv_engine, columns=columns)
+                    rec.rows_out = len(df)
+                df = enrich_frame(df, client_key=client_key)
+
+                # Save
+                with stage("write_csv", rows_in=len(df), out_path=tmp_csv):
+                    write_csv(df, tmp_csv)
+                if tmp_parquet:
+                    with stage("write_parquet", rows_in=len(df), out_path=tmp_parquet):
+                        write_parquet(df, tmp_parquet, **parquet_options)
+
+        print(f"Saved enriched CSV → {out_csv}")
+        if out_parquet:
+            print(f"Saved enriched Parquet → {out_parquet}")
+        if out_cube:
+            # rolled up from what was just written, so it always matches the row-level output
+            with stage("write_cube", out_path=out_cube) as rec:
+                cells = rec.rows_out = write_cube(out_parquet or out_csv, out_cube)
+            print(f"Saved sales cube ({cells:,} rows) → {out_cube}")
 
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--in", dest="in_path", default="data/raw/bike_sales_100k.csv")
     ap.add_argument("--out_csv", default="data/processed/bike_sales_100k_enriched.csv")
-    ap.add_argument("--out_parquet", default="data/processed/bike_sales_100k_enriched.parquet")
+    ap.add_argument(
+        "--out_parquet",
+        default="data/processed/bike_sales_100k_enriched",
+        help="Parquet file, or dataset directory when --partition_by is set",
+    )
+    ap.add_argument(
+        "--partition_by",
+        default="Year,Month",
+        help="comma-separated Hive partition columns; empty string for a single file",
+    )
+    ap.add_argument(
+        "--out_cube",
+        default=str(CUBE_PATH),
+        help="pre-aggregated cube for the dashboard and sql/ reports; empty string to skip",
+    )
+    ap.add_argument("--row_group_size", type=int, default=None)
+    ap.add_argument(
+        "--compression",
+        default="snappy",
+        choices=["snappy", "zstd", "gzip", "brotli", "lz4", "none"],
+    )
+    ap.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="stream the input in batches of this many rows (bounded memory)",
+    )
+    ap.add_argument(
+        "--client_key",
+        default=None,
+        help="column to hash for the Retail/Wholesale split, e.g. Sale_ID (default: row position)",
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="enrich byte-range partitions of the input in this many processes",
+    )
+    ap.add_argument(
+        "--engine",
+        default="pandas",
+        choices=["pandas", "duckdb"],
+        help="duckdb runs the whole enrichment as one SQL query, out of core on every thread",
+    )
+    ap.add_argument(
+        "--csv_engine",
+        default="pandas",
+        choices=CSV_ENGINES,
+        help="parser for whole-file reads; pyarrow and duckdb use every core",
+    )
+    ap.add_argument(
+        "--columns",
+        default="",
+        help="comma-separated raw columns to read and keep (default: all)",
+    )
+    ap.add_argument(
+        "--metrics", default=None, help="append per-stage records to this JSON lines file"
+    )
+    ap.add_argument("--timings", action="store_true", help="print a per-stage summary table")
+    ap.add_argument("--profile_stage", default=None, help="run this stage under cProfile")
+    ap.add_argument("--trace_stage", default=None, help="record tracemalloc peaks of this stage")
     args = ap.parse_args()
-    main(args.in_path, args.out_csv, args.out_parquet)
+    instrument = None
+    if args.metrics or args.timings or args.profile_stage or args.trace_stage:
+        instrument = Instrument(args.metrics, args.profile_stage, args.trace_stage)
+    main(
+        args.in_path,
+        args.out_csv,
+        args.out_parquet,
+        chunksize=args.chunksize,
+        client_key=args.client_key,
+        workers=args.workers,
+        partition_by=[c for c in args.partition_by.split(",") if c] or None,
+        row_group_size=args.row_group_size,
+        compression=args.compression,
+        out_cube=args.out_cube or None,
+        instrument=instrument,
+        csv_engine=args.csv_engine,
+        engine=args.engine,
+        columns=[c for c in args.columns.split(",") if c] or None,
+    )
+    if instrument:
+        print(instrument.summary())
+        print(instrument.profile_report())
@@ -0,0 +1,236 @@
+from __future__ import annotations
+import re
+from pathlib import Path
+import duckdb
+import pandas as pd
+
+from src.etl.enrich import (
+    MIXED_FORMATS,
+    SKIPPED_DATE_STRINGS,
+    detect_columns,
+    guess_date_format,
+    guess_revenue_columns,
+)
+from src.etl.rules import categorize_product_sql, fee_rate_sql, warehouse_region_sql
+from src.etl.schema import ENRICHED_SCHEMA
+from src.utils.instrument import stage
+from src.utils.io import duckdb_csv_source, write_dataset_schema
+
+# pandas.util.hash_pandas_object for 64-bit ints: splitmix64 over the value's bits. UBIGINT
+# arithmetic raises on overflow, so products mod 2**64 are built from 32-bit halves.
+_C1, _C2 = 0xBF58476D1CE4E5B9, 0x94D049BB133111EB
+_SPLITMIX = f"""
+CREATE OR REPLACE TEMP MACRO _lo32(a) AS a & CAST({2**32 - 1} AS UBIGINT);
+CREATE OR REPLACE TEMP MACRO _mul64(a, c_lo, c_hi) AS
+    (_lo32(((_lo32(a) * c_lo) >> 32) + _lo32((a >> 32) * c_lo) + _lo32(_lo32(a) * c_hi)) << 32)
+    | _lo32(_lo32(a) * c_lo);
+CREATE OR REPLACE TEMP MACRO _xorshift(a, n) AS xor(a, a >> n);
+CREATE OR REPLACE TEMP MACRO _pandas_hash(v) AS _xorshift(_mul64(_xorshift(_mul64(_xorshift(
+    CAST((CAST(v AS HUGEINT) + {2**64}) % {2**64} AS UBIGINT), 30),
+    CAST({_C1 & 0xFFFFFFFF} AS UBIGINT), CAST({_C1 >> 32} AS UBIGINT)), 27),
+    CAST({_C2 & 0xFFFFFFFF} AS UBIGINT), CAST({_C2 >> 32} AS UBIGINT)), 31);
+"""
+
+# strftime directives with a time of day; without them Date is written as a plain date
+_TIME_DIRECTIVES = re.compile("%[HIMSfpzZ]")
+
+_COMPRESSION = {"none": "uncompressed"}
+
+_SQL_TYPES = {"Int16": "SMALLINT", "float32": "FLOAT"}
+
+
+def _q(col: str) -> str:
+    return '"' + col.replace('"', '""') + '"'
+
+
+# Leading rows whose dates the format is guessed from; the first DATE_CHECK_VALUES
+# distinct dates of an extract show up long before this
+DATE_GUESS_ROWS = 100_000
+
+
+def _leading_date_values(con: duckdb.DuckDBPyConnection, source: str, date_col: str) -> pd.Series:
+    # the values `guess_date_format` would look at: usable strings in file order
+    skipped = ", ".join("'" + s + "'" for s in SKIPPED_DATE_STRINGS)
+    rows = con.execute(
+        f"SELECT {_q(date_col)} FROM {source} "
+        f"WHERE {_q(date_col)} IS NOT NULL AND {_q(date_col)} NOT IN ({skipped}) "
+        f"LIMIT {DATE_GUESS_ROWS}"
+    ).fetchall()
+    return pd.Series([r[0] for r in rows], dtype=object)
+
+
+def _without_gaps(con: duckdb.DuckDBPyConnection, source: str, columns: list[str]) -> set[str]:
+    if not columns:
+        return set()
+    has_null = con.execute(
+        f"SELECT {', '.join(f'bool_or({_q(c)} IS NULL)' for c in columns)} FROM {source}"
+    ).fetchone()
+    return {c for c, null in zip(columns, has_null) if not null}
+
+
+def enrich_sql(
+    con: duckdb.DuckDBPyConnection,
+    src: str | Path,
+    client_key: str | None = None,
+    columns: list[str] | None = None,
+) -> tuple[str, str | None, str | None]:
+    """
+    SELECT statement computing the enriched rows of the raw CSV `src` in file order,
+    column for column what `enrich_frame` builds; also returns the Date column and the
+    format it is parsed with. Defines the temporary hash macros on `con`.
+    """
+    header = list(pd.read_csv(src, nrows=0).columns)
+    if columns is not None:
+        header = [c for c in header if c in set(columns)]
+    cols = detect_columns(header)
+    date_col = cols["date"]
+    # dates stay text until parsed with the format guessed for the file
+    source = duckdb_csv_source(src, {date_col: str} if date_col else None)
+    con.execute(_SPLITMIX)
+
+    # pandas reads an integer column with a gap as float64; one pass finds those columns
+    types = {r[0]: r[1] for r in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()}
+    ints = [c for c in header if types[c] == "BIGINT"]
+    int64 = _without_gaps(con, source, ints)
+    raw = [
+        f"CAST({_q(c)} AS DOUBLE) AS {_q(c)}" if c in ints and c not in int64 else _q(c)
+        for c in header
+    ]
+    # row positions (the default client key) need an order-preserving, serial window
+    pos = "" if client_key else ", row_number() OVER () - 1 AS _pos"
+    base = f"SELECT {', '.join(raw)}{pos} FROM {source}"
+
+    derived = [
+        (
+            f"{categorize_product_sql(cols['model'])} AS Product_Category"
+            if cols["model"]
+            else "'Bikes' AS Product_Category"
+        ),
+        (
+            f"{warehouse_region_sql(cols['store'])} AS Warehouse"
+            if cols["store"]
+            else "'East' AS Warehouse"
+        ),
+    ]
+
+    if client_key and client_key not in int64:
+        raise ValueError(f"--engine duckdb needs an integer client key without gaps: {client_key}")
+    key = _q(client_key) if client_key else "_pos"
+    derived.append(
+        f"CASE WHEN _pandas_hash({key}) % 10000 / 10000.0 < 0.3 "
+        "THEN 'Wholesale' ELSE 'Retail' END AS Client_Type"
+    )
+    rate = fee_rate_sql(cols["pay"]) if cols["pay"] else "CAST(0.0 AS DOUBLE)"
+    derived.append(f"CAST({rate} AS FLOAT) AS Payment_Fee_Rate")
+
+    gross_col, unit_col = guess_revenue_columns(pd.DataFrame(columns=header))
+    if gross_col:
+        gross = f"TRY_CAST({_q(gross_col)} AS DOUBLE)"
+    elif unit_col and cols["qty"]:
+        gross = f"TRY_CAST({_q(unit_col)} AS DOUBLE) * TRY_CAST({_q(cols['qty'])} AS DOUBLE)"
+    else:
+        gross = "CAST(0.0 AS DOUBLE)"
+    derived += [
+        f"{gross} AS Gross_Revenue",
+        f"Gross_Revenue * {rate} AS Payment_Fee",
+        "Gross_Revenue - Payment_Fee AS Net_Revenue",
+    ]
+
+    date_format = None
+    if date_col:
+        date_format = guess_date_format(_leading_date_values(con, source, date_col))
+        if date_format in MIXED_FORMATS:
+            # pandas parses such values one by one, which no strptime format reproduces
+            raise ValueError(
+                f"--engine duckdb needs dates in one format; {date_col} has several "
+                "(use --engine pandas)"
+            )
+        if date_format is None:  # no usable date to guess from: all NULL either way
+            parsed = f"TRY_CAST({_q(date_col)} AS TIMESTAMP)"
+        else:
+            parsed = f"TRY_STRPTIME({_q(date_col)}, '{date_format}')"
+        replace = f"REPLACE ({parsed} AS {_q(date_col)})"
+        dates = [
+            f"CAST(year({_q(date_col)}) AS SMALLINT) AS Year",
+            f"strftime({_q(date_col)}, '%Y-%m') AS Month",
+            # date_trunc returns a DATE before DuckDB 1.4 and a TIMESTAMP after
+            f"CAST(date_trunc('month', {_q(date_col)}) AS TIMESTAMP) AS Month_Start",
+        ]
+    else:
+        replace = ""
+        dates = [
+            "CAST(NULL AS SMALLINT) AS Year",
+            "CAST(NULL AS VARCHAR) AS Month",
+            "CAST(NULL AS TIMESTAMP) AS Month_Start",
+        ]
+
+    # the numeric types `apply_schema` declares; categoricals are written as text anyway
+    schema = []
+    for c, t in ENRICHED_SCHEMA.items():
+        if c not in header or t not in _SQL_TYPES:
+            continue
+        if t.startswith("Int"):
+            # values that are not whole numbers in range become NULL, as in `to_int`
+            v = f"TRY_CAST({_q(c)} AS DOUBLE)"
+            v = f"TRY_CAST(CASE WHEN {v} = floor({v}) THEN {v} END AS {_SQL_TYPES[t]})"
+        else:
+            v = f"CAST({_q(c)} AS {_SQL_TYPES[t]})"
+        schema.append(f"{v} AS {_q(c)}")
+    sql = f"""
+        SELECT * {"" if client_key else "EXCLUDE (_pos)"}
+            {f"REPLACE ({', '.join(schema)})" if schema else ""}, {', '.join(dates)}
+        FROM (
+            SELECT * {replace}, {', '.join(derived)}
+            FROM ({base})
+        )
+    """
+    return sql, date_col, date_format
+
+
+def main_duckdb(
+    src: Path,
+    out_csv: str,
+    out_parquet: str | None,
+    client_key: str | None,
+    parquet_options: dict,
+    columns: list[str] | None = None,
+) -> None:
+    """
+    DuckDB variant of `main`: the raw CSV is enriched by one SQL query and copied
+    straight to the outputs, out of core and on every thread, with no pandas frame.
+    Rows and values match the pandas engine.
+    """
+    con = duckdb.connect()
+    try:
+        sql, date_col, date_format = enrich_sql(con, src, client_key, columns)
+        # pandas writes columns that only hold midnights as plain dates
+        as_dates = ["Month_Start"]
+        if date_col and not _TIME_DIRECTIVES.search(date_format or "%H"):
+            as_dates.append(date_col)
+        csv_select = ", ".join(f"CAST({_q(c)} AS DATE) AS {_q(c)}" for c in as_dates)
+        with stage("copy_csv", bytes_read=src.stat().st_size, out_path=out_csv):
+            Path(out_csv).parent.mkdir(parents=True, exist_ok=True)
+            con.execute(
+                f"COPY (SELECT * REPLACE ({csv_select}) FROM ({sql})) "
+                f"TO '{Path(out_csv).as_posix()}' (FORMAT csv, HEADER)"
+            )
+        if out_parquet:
+            compression = parquet_options.get("compression") or "snappy"
+            options = [
+                "FORMAT parquet",
+                f"COMPRESSION {_COMPRESSION.get(compression, compression)}",
+            ]
+            if parquet_options.get("row_group_size"):
+                options.append(f"ROW_GROUP_SIZE {parquet_options['row_group_size']}")
+            if parquet_options.get("partition_cols"):
+                partition = ", ".join(_q(c) for c in parquet_options["partition_cols"])
+                options.append(f"PARTITION_BY ({partition})")
+            with stage("copy_parquet", bytes_read=src.stat().st_size, out_path=out_parquet):
+                con.execute(
+                    f"COPY ({sql}) TO '{Path(out_parquet).as_posix()}' ({', '.join(options)})"
+                )
+                if parquet_options.get("partition_cols"):
+                    schema = con.sql(f"SELECT * FROM ({sql}) LIMIT 0").to_arrow_table().schema
+                    write_dataset_schema(Path(out_parquet), schema)
+    finally:
+        con.close()
@@ -0,0 +1,297 @@
+from __future__ import annotations
+import argparse
+import hashlib
+import math
+from pathlib import Path
+import duckdb
+import pandas as pd
+
+from src.etl.cube import CUBE_TABLE, refresh_cube_table, update_cube_table
+from src.etl.enrich import PARTITION_BYTES, enrich_frame, file_date_format
+from src.etl.kpis import KPI_TABLE, ensure_kpi_table, update_kpis
+from src.utils.io import (
+    atomic_output,
+    copy_file,
+    csv_byte_ranges,
+    csv_header_end,
+    ensure_parent,
+    read_csv_range,
+    remove_path,
+)
+
+DB_PATH = Path("data/processed/sales.duckdb")
+TABLE = "sales"
+LOG_TABLE = "ingest_log"
+
+# How much of the already-ingested prefix is hashed to notice a rewritten file
+DIGEST_BYTES = 64 * 1024
+
+
+def complete_lines_end(path: Path) -> int:
+    """
+    Byte offset just past the last newline of `path`, so a row that is still being
+    written is left for the next run.
+    """
+    size = path.stat().st_size
+    with path.open("rb") as f:
+        pos = size
+        while pos > 0:
+            step = min(DIGEST_BYTES, pos)
+            f.seek(pos - step)
+            nl = f.read(step).rfind(b"\n")
+            if nl != -1:
+                return pos - step + nl + 1
+            pos -= step
+    return 0
+
+
+def prefix_digest(path: Path, upto: int) -> str:
+    """Hash of the head and of the tail of the first `upto` bytes of `path`."""
+    h = hashlib.blake2b(digest_size=16)
+    with path.open("rb") as f:
+        h.update(f.read(min(DIGEST_BYTES, upto)))
+        f.seek(max(0, upto - DIGEST_BYTES))
+        h.update(f.read(upto - f.tell()))
+    return h.hexdigest()
+
+
+def _ensure_log(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {LOG_TABLE} (
+            path VARCHAR PRIMARY KEY,
+            bytes BIGINT,
+            rows BIGINT,
+            digest VARCHAR,
+            date_format VARCHAR,
+            ingested_at TIMESTAMP
+        )
+        """
+    )
+
+
+# Columns enrichment gained after a sales table may have been created, with the expression
+# that fills them in for rows stored before
+BACKFILL = {"Month_Start": "TRY_STRPTIME(\"Month\" || '-01', '%Y-%m-%d')"}
+
+
+def _add_missing_columns(con: duckdb.DuckDBPyConnection, batch: pd.DataFrame) -> None:
+    """Add the columns of `batch` the sales table lacks; stored rows get NULL or a backfill."""
+    have = {r[0] for r in con.execute(f"DESCRIBE {TABLE}").fetchall()}
+    for col in batch.columns:
+        if col in have:
+            continue
+        dtype = con.execute(f'DESCRIBE SELECT "{col}" FROM batch').fetchone()[1]
+        if isinstance(batch[col].dtype, pd.CategoricalDtype):
+            dtype = "VARCHAR"
+        con.execute(f'ALTER TABLE {TABLE} ADD COLUMN "{col}" {dtype}')
+        if col in BACKFILL:
+            con.execute(f'UPDATE {TABLE} SET "{col}" = {BACKFILL[col]}')
+
+
+def _insert_new(con: duckdb.DuckDBPyConnection, df: pd.DataFrame, key: str) -> int:
+    """
+    Append the rows of `df` whose `key` is not in the sales table yet and merge them into
+    the cube and the KPI store; returns the count.
+    """
+    batch = df.drop_duplicates(subset=key, keep="first")
+    con.register("batch", batch)
+    try:
+        if not con.execute(
+            "SELECT count(*) FROM information_schema.tables WHERE table_name = ?", [TABLE]
+        ).fetchone()[0]:
+            # categoricals arrive as ENUMs fixed to this batch's values; store plain text
+            cats = [c for c in batch.columns if isinstance(batch[c].dtype, pd.CategoricalDtype)]
+            replace = ", ".join(f'CAST("{c}" AS VARCHAR) AS "{c}"' for c in cats)
+            select = f"* REPLACE ({replace})" if cats else "*"
+            con.execute(f"CREATE TABLE {TABLE} AS SELECT {select} FROM batch LIMIT 0")
+        _add_missing_columns(con, batch)
+        ensure_kpi_table(con, TABLE)  # a store from before the KPI table: start from its rows
+        con.execute(
+            f"""
+            CREATE OR REPLACE TEMP TABLE new_rows AS
+            SELECT b.* FROM batch b ANTI JOIN {TABLE} s ON b."{key}" = s."{key}"
+            """
+        )
+        con.execute(f"INSERT INTO {TABLE} BY NAME SELECT * FROM new_rows")
+        update_cube_table(con, "new_rows", TABLE)
+        update_kpis(con, "new_rows")
+        return con.execute("SELECT count(*) FROM new_rows").fetchone()[0]
+    finally:
+        con.execute("DROP TABLE IF EXISTS new_rows")
+        con.unregister("batch")
+
+
+def _resume_point(
+    con: duckdb.DuckDBPyConnection, path: Path, log: str = LOG_TABLE
+) -> tuple[int, int, int, str | None]:
+    """
+    Where ingesting `path` picks up, from its entry in `log`: (start byte, end byte, rows
+    before start, date format). A file that only grew resumes at its logged end; a new or
+    rewritten file starts after its header.
+    """
+    end = complete_lines_end(path)
+    start, offset, date_format = csv_header_end(path), 0, None
+    logged = con.execute(
+        f"SELECT bytes, rows, digest, date_format FROM {log} WHERE path = ?", [str(path)]
+    ).fetchone()
+    if logged and logged[0] <= end and logged[2] == prefix_digest(path, logged[0]):
+        start, offset, date_format = logged[0], logged[1], logged[3]
+    return start, end, offset, date_format
+
+
+def has_pending(db_path: Path, paths: list[Path]) -> bool:
+    """
+    Whether ingesting `paths` would change the store at `db_path`: it is missing, lacks
+    its cube or KPI table, or a file has complete rows past its logged end. The store is
+    attached read-only, so the check neither waits for nor blocks the dashboard's readers.
+    """
+    if not db_path.exists():
+        return True
+    con = duckdb.connect()
+    try:
+        con.execute(f"ATTACH '{db_path.as_posix()}' AS store (READ_ONLY)")
+        tables = {
+            r[0]
+            for r in con.execute(
+                "SELECT table_name FROM duckdb_tables() WHERE database_name = 'store'"
+            ).fetchall()
+        }
+        if TABLE in tables and not {CUBE_TABLE, KPI_TABLE} <= tables:
+            return True
+        if LOG_TABLE not in tables:
+            return bool(paths)
+        for path in paths:
+            start, end, _, _ = _resume_point(con, path, f"store.{LOG_TABLE}")
+            if start < end:
+                return True
+        return False
+    finally:
+        con.close()
+
+
+def ingest_file(
+    con: duckdb.DuckDBPyConnection,
+    path: Path,
+    key: str = "Sale_ID",
+    client_key: str | None = None,
+) -> tuple[int, int]:
+    """
+    Enrich and insert the rows of `path` not ingested before; returns (rows read, rows
+    inserted). A file that only grew since the last run is read from its previous end,
+    with row positions carried over so Client_Type matches a full `src.etl.enrich` run;
+    a rewritten file is read again in full and the dedup on `key` drops what is known.
+    """
+    _ensure_log(con)
+    start, end, offset, date_format = _resume_point(con, path)
+    if start >= end:
+        return 0, 0
+
+    date_col = {c.lower(): c for c in pd.read_csv(path, nrows=0).columns}.get("date")
+    if date_col and date_format is None:
+        date_format = file_date_format(path, date_col)
+    read = inserted = 0
+    con.begin()
+    try:
+        parts = math.ceil((end - start) / PARTITION_BYTES)
+        for a, b in csv_byte_ranges(path, parts, start=start, end=end):
+            df = read_csv_range(path, a, b)
+            df.index = pd.RangeIndex(offset + read, offset + read + len(df))
+            df = enrich_frame(df, date_format=date_format, client_key=client_key)
+            inserted += _insert_new(con, df, key)
+            read += len(df)
+        con.execute(
+            f"INSERT OR REPLACE INTO {LOG_TABLE} VALUES (?, ?, ?, ?, ?, now())",
+            [str(path), end, offset + read, prefix_digest(path, end), date_format],
+        )
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    return read, inserted
+
+
+def raw_files(paths: list[str]) -> list[Path]:
+    """Expand directories to their *.csv files, in name order."""
+    out = []
+    for p in map(Path, paths):
+        out.extend(sorted(p.glob("*.csv")) if p.is_dir() else [p])
+    return out
+
+
+def main(
+    in_paths: list[str],
+    db_path: str | Path = DB_PATH,
+    key: str = "Sale_ID",
+    client_key: str | None = None,
+    in_place: bool = False,
+) -> None:
+    """
+    Ingest `in_paths` into the store at `db_path`. Unless `in_place`, a copy of the store
+    is updated and renamed over it once complete, so the dashboard's read-only connections
+    never hold up the write lock and switch to the new file when they reopen. The copy is
+    only made when the ingest log shows rows to add, but then it is the whole store file,
+    however few rows are added: its cost grows with the store, not with the new data (see
+    `benchmarks/bench_suite.py`, group "ingest").
+    """
+    db_path = Path(db_path)
+    ensure_parent(db_path)
+    files = raw_files(in_paths)
+    if not in_place and not has_pending(db_path, files):
+        print(f"Nothing new to ingest into {db_path}")
+        return
+    wal = db_path.with_name(db_path.name + ".wal")
+    with atomic_output(None if in_place else db_path) as tmp:
+        work = tmp or db_path
+        if tmp is not None:
+            tmp_wal = tmp.with_name(tmp.name + ".wal")
+            remove_path(tmp_wal)  # left over from an interrupted run
+            if db_path.exists():
+                copy_file(db_path, tmp)
+            if wal.exists():  # left by a writer that did not close cleanly
+                copy_file(wal, tmp_wal)
+        con = duckdb.connect(work.as_posix())
+        changed = False
+        try:
+            for path in files:
+                read, inserted = ingest_file(con, path, key=key, client_key=client_key)
+                changed |= read > 0
+                print(f"{path}: {read:,} new rows read, {inserted:,} inserted into {TABLE}")
+            tables = {r[0] for r in con.execute("SHOW TABLES").fetchall()}
+            if TABLE in tables and CUBE_TABLE not in tables:
+                refresh_cube_table(con, TABLE)
+                changed = True
+                print(f"Built {CUBE_TABLE}")
+            if TABLE in tables and KPI_TABLE not in tables:
+                ensure_kpi_table(con, TABLE)
+                changed = True
+                print(f"Built {KPI_TABLE}")
+        finally:
+            con.close()  # checkpoints: the copy has no WAL left
+        if tmp is not None and not changed:
+            remove_path(tmp)  # nothing new: keep the current file, and readers on it
+    if tmp is not None and changed:
+        remove_path(wal)  # its changes are in the file just swapped in
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="in_paths", nargs="+", default=["data/raw"])
+    ap.add_argument("--db", dest="db_path", default=str(DB_PATH))
+    ap.add_argument("--key", default="Sale_ID", help="column rows are deduplicated on")
+    ap.add_argument("--client_key", default=None)
+    ap.add_argument(
+        "--in_place",
+        action="store_true",
+        help="write the store directly instead of swapping in an updated copy. The swap "
+        "copies the whole store on every ingest that adds rows, so its cost grows with the "
+        "store; in place costs only the new rows but needs no dashboard to have the store open",
+    )
+    args = ap.parse_args()
+    main(
+        args.in_paths,
+        args.db_path,
+        key=args.key,
+        client_key=args.client_key,
+        in_place=args.in_place,
+    )
@@ -0,0 +1,216 @@
+from __future__ import annotations
+import argparse
+from pathlib import Path
+from typing import TYPE_CHECKING
+import pandas as pd
+
+from src.etl.cube import FILTER_COLUMNS, with_month
+
+if TYPE_CHECKING:
+    import duckdb
+
+DB_PATH = Path("data/processed/sales.duckdb")
+KPI_TABLE = "sales_kpis"
+KPIS_REPORT = Path("reports/kpis.txt")
+
+# Partials are kept for the whole table ('total'), each Bike_Model and each month, split by
+# `complete`: whether the row has a month and every dashboard filter column, i.e. whether
+# the dashboard shows it while every filter value is selected.
+KPI_GRAINS = {"total": None, "model": "CAST(Bike_Model AS VARCHAR)", "month": "_Month"}
+
+# Mergeable measures: name -> (SQL type, aggregate kind, source column)
+KPI_MEASURES = {
+    "orders": ("BIGINT", "count", None),
+    "quantity": ("DOUBLE", "sum", "Quantity"),
+    "gross_revenue": ("DOUBLE", "sum", "Gross_Revenue"),
+    "net_revenue": ("DOUBLE", "sum", "Net_Revenue"),
+    "payment_fee": ("DOUBLE", "sum", "Payment_Fee"),
+    "net_min": ("DOUBLE", "min", "Net_Revenue"),
+    "net_max": ("DOUBLE", "max", "Net_Revenue"),
+    "month_min": ("TIMESTAMP", "min", "_MonthDT"),
+    "month_max": ("TIMESTAMP", "max", "_MonthDT"),
+}
+
+# How two partials of a kind merge, and the aggregate that merges any number of them
+_MERGE = {
+    "count": "{a} + {b}",
+    "sum": "{a} + {b}",
+    "min": "least({a}, {b})",
+    "max": "greatest({a}, {b})",
+}
+_ROLLUP = {"count": "SUM", "sum": "SUM", "min": "MIN", "max": "MAX"}
+
+
+def ensure_kpi_table(con: duckdb.DuckDBPyConnection, source: str | None = None) -> None:
+    """Create the KPI table if missing, filled from `source` (the rows stored so far)."""
+    exists = con.execute(
+        "SELECT count(*) FROM information_schema.tables WHERE table_name = ?", [KPI_TABLE]
+    ).fetchone()[0]
+    if exists:
+        return
+    measures = ", ".join(f"{name} {t[0]}" for name, t in KPI_MEASURES.items())
+    con.execute(
+        f"""
+        CREATE TABLE {KPI_TABLE} (
+            grain VARCHAR, key VARCHAR, complete BOOLEAN, {measures},
+            PRIMARY KEY (grain, key, complete)
+        )
+        """
+    )
+    if source is not None:
+        update_kpis(con, source)
+
+
+def kpi_partials_sql(con: duckdb.DuckDBPyConnection, relation: str) -> str:
+    """SELECT of the partial aggregates of the rows of `relation`, one row per key."""
+    columns = {d[0] for d in con.execute(f"SELECT * FROM {relation} LIMIT 0").description}
+    rows = with_month(relation, columns)
+    present = [f'"{c}" IS NOT NULL' for c in FILTER_COLUMNS if c in columns]
+    complete = " AND ".join(["_MonthDT IS NOT NULL", *present])
+    rows = f"(SELECT *, strftime(_MonthDT, '%Y-%m') AS _Month, {complete} AS _complete FROM {rows})"
+    aggs = []
+    for name, (sql_type, kind, col) in KPI_MEASURES.items():
+        if kind == "count":
+            agg = "count(*)"
+        elif col != "_MonthDT" and col not in columns:
+            agg = "0" if kind == "sum" else "NULL"
+        else:
+            agg = f'COALESCE(SUM("{col}"), 0)' if kind == "sum" else f'{kind.upper()}("{col}")'
+        aggs.append(f"CAST({agg} AS {sql_type}) AS {name}")
+    selects = []
+    for grain, key in KPI_GRAINS.items():
+        if grain == "model" and "Bike_Model" not in columns:
+            continue
+        where = f"WHERE {key} IS NOT NULL" if key else ""
+        key = key or "''"
+        selects.append(
+            f"SELECT '{grain}' AS grain, {key} AS key, _complete AS complete, "
+            f"{', '.join(aggs)} FROM {rows} {where} GROUP BY ALL"
+        )
+    return "\nUNION ALL\n".join(selects)
+
+
+def update_kpis(con: duckdb.DuckDBPyConnection, relation: str) -> None:
+    """Merge the partials of the rows of `relation` (new rows only) into the KPI table."""
+    ensure_kpi_table(con)
+    merge = ", ".join(
+        f"{name} = {_MERGE[kind].format(a=name, b=f'EXCLUDED.{name}')}"
+        for name, (_, kind, _) in KPI_MEASURES.items()
+    )
+    con.execute(
+        f"""
+        INSERT INTO {KPI_TABLE} {kpi_partials_sql(con, relation)}
+        ON CONFLICT (grain, key, complete) DO UPDATE SET {merge}
+        """
+    )
+
+
+def rebuild_kpis(con: duckdb.DuckDBPyConnection, relation: str) -> None:
+    con.execute(f"DROP TABLE IF EXISTS {KPI_TABLE}")
+    ensure_kpi_table(con, relation)
+
+
+def _merged(table: str, grain: str, complete_only: bool) -> str:
+    # partials of one grain, the complete/incomplete halves of each key merged
+    aggs = ", ".join(
+        f"CAST({_ROLLUP[kind]}({name}) AS {sql_type}) AS {name}"
+        for name, (sql_type, kind, _) in KPI_MEASURES.items()
+    )
+    where = "AND complete" if complete_only else ""
+    return f"SELECT key, {aggs} FROM {table} WHERE grain = '{grain}' {where} GROUP BY key"
+
+
+def read_kpis(
+    con: duckdb.DuckDBPyConnection, complete_only: bool = False, table: str = KPI_TABLE
+) -> dict:
+    """Headline KPIs from the store, keyed like `SalesQueries.kpis`."""
+    row = (
+        con.cursor()
+        .execute(
+            f"""
+            SELECT CAST(COALESCE(SUM(orders), 0) AS BIGINT) AS orders,
+                   COALESCE(SUM(gross_revenue), 0) AS Gross_Revenue,
+                   COALESCE(SUM(net_revenue), 0) AS Net_Revenue,
+                   COALESCE(SUM(payment_fee), 0) AS Payment_Fee,
+                   MIN(month_min) AS month_min, MAX(month_max) AS month_max
+            FROM ({_merged(table, 'total', complete_only)})
+            """
+        )
+        .df()
+        .iloc[0]
+    )
+    return row.to_dict()
+
+
+def read_top_model(
+    con: duckdb.DuckDBPyConnection, complete_only: bool = False, table: str = KPI_TABLE
+) -> pd.DataFrame:
+    """The Bike_Model with the highest Net_Revenue, shaped like `SalesQueries.top_model`."""
+    return (
+        con.cursor()
+        .execute(
+            f"""
+            SELECT key AS Bike_Model, net_revenue AS Net_Revenue
+            FROM ({_merged(table, 'model', complete_only)})
+            ORDER BY 2 DESC NULLS LAST LIMIT 1
+            """
+        )
+        .df()
+    )
+
+
+def read_monthly(
+    con: duckdb.DuckDBPyConnection, complete_only: bool = False, table: str = KPI_TABLE
+) -> pd.DataFrame:
+    """Gross and net revenue per month, shaped like `SalesQueries.monthly`."""
+    return (
+        con.cursor()
+        .execute(
+            f"""
+            SELECT key AS Month, month_min AS _MonthDT,
+                   gross_revenue AS Gross_Revenue, net_revenue AS Net_Revenue
+            FROM ({_merged(table, 'month', complete_only)})
+            ORDER BY 2
+            """
+        )
+        .df()
+    )
+
+
+def kpis_report(k: dict) -> str:
+    orders = int(k["orders"])
+    avg = k["Net_Revenue"] / orders if orders else float("nan")
+    return (
+        f"Orders: {orders:,}\n"
+        f"Total Gross Revenue: ${k['Gross_Revenue']:,.2f}\n"
+        f"Total Net Revenue:   ${k['Net_Revenue']:,.2f}\n"
+        f"Avg Order Size (Net): ${avg:,.2f}\n"
+    )
+
+
+def main(
+    db_path: str | Path = DB_PATH, out_path: str | Path = KPIS_REPORT, rebuild: bool = False
+) -> None:
+    import duckdb
+
+    con = duckdb.connect(Path(db_path).as_posix(), read_only=not rebuild)
+    try:
+        if rebuild:
+            rebuild_kpis(con, "sales")
+        text = kpis_report(read_kpis(con))
+    finally:
+        con.close()
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(text)
+    print(text, end="")
+    print(f"Saved → {out_path}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", dest="db_path", default=str(DB_PATH))
+    ap.add_argument("--out", default=str(KPIS_REPORT))
+    ap.add_argument("--rebuild", action="store_true", help="recompute from the sales table")
+    args = ap.parse_args()
+    main(args.db_path, args.out, rebuild=args.rebuild)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import duckdb
+import pyarrow.parquet as pq
+
+from src.dashboard.queries import source_fingerprint
+from src.etl.cube import CUBE_PATH, CUBE_TABLE, cube_sql, relation_for
+from src.utils.io import atomic_output
+
+SQL_DIR = Path("sql")
+OUT_DIR = Path("reports/sql")
+FORMATS = ("parquet", "csv")
+
+# Cache manifest in the output directory: report name -> key of the run that wrote it
+CACHE_FILE = "cache.json"
+
+
+def report_sql(text: str) -> str:
+    """A report's query with its cube reads pointed at the shared, loaded cube table."""
+    return text.replace(f"read_parquet('{CUBE_PATH.as_posix()}')", CUBE_TABLE).strip().rstrip(";")
+
+
+def load_cube(con: duckdb.DuckDBPyConnection, source: str | Path) -> None:
+    """
+    Make `source` available as the `sales_cube` table of `con`, scanning it once: a cube
+    file is loaded as is, row-level data (CSV, Parquet file or dataset) is rolled up, and
+    a DuckDB database is attached read-only and its cube (or sales table) used in place.
+    """
+    source = Path(source)
+    if source.suffix == ".duckdb":
+        con.execute(f"ATTACH '{source.as_posix()}' AS src (READ_ONLY)")
+        tables = {
+            r[0]
+            for r in con.execute(
+                "SELECT table_name FROM duckdb_tables() WHERE database_name = 'src'"
+            ).fetchall()
+        }
+        if CUBE_TABLE in tables:
+            con.execute(f"CREATE VIEW {CUBE_TABLE} AS SELECT * FROM src.{CUBE_TABLE}")
+        else:
+            con.execute(f"CREATE TABLE {CUBE_TABLE} AS {cube_sql(con, 'src.sales')}")
+        return
+    relation = relation_for(source)
+    columns = {d[0] for d in con.execute(f"SELECT * FROM {relation} LIMIT 0").description}
+    query = f"SELECT * FROM {relation}" if "Orders" in columns else cube_sql(con, relation)
+    con.execute(f"CREATE TABLE {CUBE_TABLE} AS {query}")
+
+
+def cache_key(text: str, fingerprint: tuple) -> str:
+    return hashlib.sha256(f"{text}\n{fingerprint!r}".encode()).hexdigest()
+
+
+def run_reports(
+    source: str | Path = CUBE_PATH,
+    out_dir: str | Path = OUT_DIR,
+    sql_dir: str | Path = SQL_DIR,
+    workers: int | None = None,
+    formats: tuple[str, ...] = FORMATS,
+    force: bool = False,
+) -> dict[str, bool]:
+    """
+    Run every `sql_dir/*.sql` report against `source` and write each result to
+    `out_dir/<name>.<format>`. The data is scanned once and the reports run concurrently on
+    cursors of one connection. A report whose query text and input fingerprint match its
+    last run (and whose outputs exist) is skipped. Returns name -> True if it was run.
+    """
+    out_dir, source = Path(out_dir), Path(source)
+    manifest_path = out_dir / CACHE_FILE
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    fingerprint = source_fingerprint([source])
+
+    todo, status = {}, {}
+    for path in sorted(Path(sql_dir).glob("*.sql")):
+        text = path.read_text()
+        key = cache_key(text, fingerprint)
+        outputs = [out_dir / f"{path.stem}.{fmt}" for fmt in formats]
+        cached = manifest.get(path.stem) == key and all(p.exists() for p in outputs)
+        status[path.stem] = force or not cached
+        if status[path.stem]:
+            todo[path.stem] = (text, key)
+    if not todo:
+        return status
+
+    con = duckdb.connect()
+    try:
+        load_cube(con, source)
+
+        def run(name: str) -> None:
+            cur = con.cursor()
+            try:
+                table = cur.sql(report_sql(todo[name][0])).to_arrow_table()
+            finally:
+                cur.close()
+            for fmt in formats:
+                with atomic_output(out_dir / f"{name}.{fmt}") as tmp:
+                    if fmt == "parquet":
+                        pq.write_table(table, tmp)
+                    else:
+                        table.to_pandas().to_csv(tmp, index=False)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(run, todo))
+    finally:
+        con.close()
+
+    manifest.update({name: key for name, (_, key) in todo.items()})
+    with atomic_output(manifest_path) as tmp:
+        tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+    return status
+
+
+def main(
+    source: str | Path = CUBE_PATH,
+    out_dir: str | Path = OUT_DIR,
+    workers: int | None = None,
+    formats: tuple[str, ...] = FORMATS,
+    force: bool = False,
+) -> None:
+    status = run_reports(source, out_dir, workers=workers, formats=formats, force=force)
+    print(f"Reports in {out_dir}:")
+    for name, ran in status.items():
+        print(f" - {name}{'' if ran else ' (cached)'}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--source",
+        default=str(CUBE_PATH),
+        help="cube or enriched data: Parquet file or dataset, CSV, or a .duckdb database",
+    )
+    ap.add_argument("--out", default=str(OUT_DIR))
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--formats", default=",".join(FORMATS), help="comma list of parquet,csv")
+    ap.add_argument("--force", action="store_true", help="rerun cached reports")
+    args = ap.parse_args()
+    main(
+        args.source,
+        args.out,
+        workers=args.workers,
+        formats=tuple(args.formats.split(",")),
+        force=args.force,
+    )
@@ -1,6 +1,11 @@
 from __future__ import annotations
 import re
-from typing import Literal
+from typing import Callable, Literal, TypeVar
+
+import numpy as np
+import pandas as pd
+
+T = TypeVar("T")
 
 # 1) Payment fee rates
 PAYMENT_FEE_RATE = {
@@ -112,3 +117,61 @@ def warehouse_region(store_location: str | None) -> str:
             return region
     # fallback bucket
     return "East"
+
+
+# 4) Vectorized forms: each rule runs once per distinct value, not once per row
+def apply_rule(values: pd.Series, rule: Callable[[str | None], T]) -> pd.Series:
+    """
+    Same result as `values.astype(str).map(rule)`, but `rule` is evaluated only for the
+    distinct values and broadcast back through the factorized codes. Missing values
+    get `rule(None)`.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    mapped = np.asarray([rule(str(u)) for u in uniques] + [rule(None)])
+    # code -1 (missing) picks the trailing rule(None) entry
+    return pd.Series(mapped[codes], index=values.index, name=values.name)
+
+
+def fee_rates(methods: pd.Series) -> pd.Series:
+    return apply_rule(methods, fee_rate_for)
+
+
+def categorize_products(names: pd.Series) -> pd.Series:
+    return apply_rule(names, categorize_product)
+
+
+def warehouse_regions(store_locations: pd.Series) -> pd.Series:
+    return apply_rule(store_locations, warehouse_region)
+
+
+# 5) SQL forms for the DuckDB engine, built from the same tables as the Python rules
+def _sql_str(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def fee_rate_sql(col: str) -> str:
+    """DuckDB expression for `fee_rate_for` over the column `col` (DOUBLE)."""
+    m = f'lower(trim("{col}"))'
+    cases = " ".join(
+        f"WHEN contains({m}, {_sql_str(key)}) THEN CAST({rate!r} AS DOUBLE)"
+        for key, rate in PAYMENT_FEE_RATE.items()
+    )
+    return f"CASE {cases} ELSE CAST(0.0 AS DOUBLE) END"
+
+
+def categorize_product_sql(col: str) -> str:
+    """DuckDB expression for `categorize_product` over the column `col`."""
+    pattern = _sql_str(PARTS_RE.pattern)
+    return f"CASE WHEN regexp_matches(\"{col}\", {pattern}, 'i') THEN 'Parts' ELSE 'Bikes' END"
+
+
+def warehouse_region_sql(col: str) -> str:
+    """DuckDB expression for `warehouse_region` over the column `col`."""
+    s = f"(' ' || upper(\"{col}\"))"
+    # one literal alternation per region: a single regex scan instead of a chain of contains
+    cases = " ".join(
+        f"WHEN regexp_matches({s}, {_sql_str('|'.join(re.escape(t) for t in tokens))}) "
+        f"THEN {_sql_str(region)}"
+        for region, tokens in REGION_KEYWORDS.items()
+    )
+    return f"CASE {cases} ELSE 'East' END"
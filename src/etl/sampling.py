@@ -0,0 +1,180 @@
+from __future__ import annotations
+import argparse
+from pathlib import Path
+from typing import Iterator
+import numpy as np
+import pandas as pd
+from pandas.util import hash_array
+
+from src.utils.io import dataset_partitioning, iter_csv, resolve_output, write_csv
+
+FULL = Path("data/processed/bike_sales_100k_enriched.csv")
+SAMPLE = Path("data/sample/bike_sales_sample.csv")
+
+STRATA = ["Warehouse", "Product_Category"]
+PER_STRATUM = 100
+MAX_ROWS = 500
+BATCH_ROWS = 1_000_000
+
+# Spreads seeds over the 64-bit space before hashing (the golden-ratio increment of splitmix64)
+_SEED_STEP = 0x9E3779B97F4A7C15
+
+
+def iter_batches(
+    path: str | Path, batch_rows: int = BATCH_ROWS, columns: list[str] | None = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV, a Parquet file or a Hive-partitioned Parquet dataset in batches of at
+    most `batch_rows` rows, in file order.
+    """
+    path = Path(path)
+    if path.suffix == ".csv":
+        yield from iter_csv(path, batch_rows, columns=columns)
+        return
+    import pyarrow.dataset as ds
+
+    path = resolve_output(path)
+    partitioning = dataset_partitioning(path) or "hive"
+    dataset = ds.dataset(path, format="parquet", partitioning=partitioning)
+    for batch in dataset.to_batches(columns=columns, batch_size=batch_rows):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def row_keys(start: int, n: int, seed: int) -> np.ndarray:
+    """
+    Uniform 64-bit sort keys of rows `start` .. `start + n`, a function of the seed and the
+    row position only: the sample does not depend on how the input is batched.
+    """
+    positions = np.arange(start, start + n, dtype=np.uint64)
+    return hash_array(positions + np.uint64(seed * _SEED_STEP % 2**64))
+
+
+class StratifiedReservoir:
+    """
+    Uniform sample without replacement of up to `per_stratum` rows (or `quotas[key]`) of
+    every combination of `strata` values, taken in one pass over any number of batches.
+    Each row gets a random key and every stratum keeps the rows with the smallest keys
+    seen so far: the vectorised form of reservoir sampling (Algorithm R), with memory
+    bounded by the quotas plus one batch. Missing strata values form strata of their own.
+    """
+
+    def __init__(
+        self,
+        strata: list[str],
+        per_stratum: int = PER_STRATUM,
+        quotas: dict[tuple, int] | None = None,
+        seed: int = 0,
+    ):
+        self.strata = list(strata)
+        self.per_stratum = per_stratum
+        self.quotas = {_as_key(k): v for k, v in (quotas or {}).items()}
+        self.seed = seed
+        self.rows = 0
+        self.kept: pd.DataFrame | None = None
+
+    def add(self, batch: pd.DataFrame) -> None:
+        batch = batch.reset_index(drop=True)
+        batch["_pos"] = np.arange(self.rows, self.rows + len(batch), dtype=np.int64)
+        batch["_key"] = row_keys(self.rows, len(batch), self.seed)
+        self.rows += len(batch)
+        pool = batch if self.kept is None else pd.concat([self.kept, batch], ignore_index=True)
+
+        groups = pool.groupby(self.strata, dropna=False, sort=False)
+        codes = groups.ngroup().to_numpy()
+        limits = np.array(
+            [self.quotas.get(_as_key(k), self.per_stratum) for k in groups.size().index]
+        )
+        order = np.argsort(pool["_key"].to_numpy(), kind="stable")
+        rank = pd.Series(codes[order]).groupby(codes[order]).cumcount().to_numpy()
+        keep = order[rank < limits[codes[order]]]
+        self.kept = pool.iloc[np.sort(keep)].reset_index(drop=True)
+
+    def result(self, max_rows: int | None = None) -> pd.DataFrame:
+        """
+        The sample in input order; with `max_rows`, a uniform subset of that many rows of it
+        (the rows with the smallest keys across all strata).
+        """
+        if self.kept is None:
+            return pd.DataFrame(columns=self.strata)
+        kept = self.kept
+        if max_rows is not None and len(kept) > max_rows:
+            kept = kept.nsmallest(max_rows, "_key").sort_values("_pos")
+        return kept.drop(columns=["_pos", "_key"]).reset_index(drop=True)
+
+
+def _as_key(key) -> tuple:
+    # quotas are matched on the values' text, so "2023" from the command line finds the
+    # stratum of an integer 2023; NaN != NaN, so a missing value is keyed as None
+    key = key if isinstance(key, tuple) else (key,)
+    return tuple(None if pd.isna(v) else str(v) for v in key)
+
+
+def stratified_sample(
+    path: str | Path,
+    strata: list[str] = STRATA,
+    per_stratum: int = PER_STRATUM,
+    quotas: dict[tuple, int] | None = None,
+    max_rows: int | None = MAX_ROWS,
+    seed: int = 0,
+    batch_rows: int = BATCH_ROWS,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """Stratified sample of a CSV or Parquet file/dataset in one streaming pass."""
+    if columns is not None:
+        columns = list(dict.fromkeys([*columns, *strata]))
+    reservoir = StratifiedReservoir(strata, per_stratum, quotas, seed)
+    for batch in iter_batches(path, batch_rows, columns):
+        reservoir.add(batch)
+    return reservoir.result(max_rows)
+
+
+def _parse_quota(text: str) -> tuple[tuple, int]:
+    # "East,Bikes=50": the strata values in --strata order, then the quota
+    values, _, n = text.rpartition("=")
+    return tuple(values.split(",")), int(n)
+
+
+def main(
+    in_path: str | Path = FULL,
+    out_path: str | Path = SAMPLE,
+    strata: list[str] = STRATA,
+    per_stratum: int = PER_STRATUM,
+    quotas: dict[tuple, int] | None = None,
+    max_rows: int | None = MAX_ROWS,
+    seed: int = 42,
+    batch_rows: int = BATCH_ROWS,
+) -> None:
+    sample = stratified_sample(
+        in_path, strata, per_stratum, quotas, max_rows, seed=seed, batch_rows=batch_rows
+    )
+    write_csv(sample, out_path)
+    print(f"Saved sample → {out_path} ({len(sample)} rows)")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="in_path", default=str(FULL), help="CSV, Parquet file or dataset")
+    ap.add_argument("--out", default=str(SAMPLE))
+    ap.add_argument("--strata", default=",".join(STRATA), help="comma-separated columns")
+    ap.add_argument("--per_stratum", type=int, default=PER_STRATUM)
+    ap.add_argument(
+        "--quota",
+        action="append",
+        default=[],
+        help="per-stratum quota as VALUE[,VALUE...]=N in --strata order (repeatable)",
+    )
+    ap.add_argument("--max_rows", type=int, default=MAX_ROWS, help="0 keeps every sampled row")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--batch_rows", type=int, default=BATCH_ROWS)
+    args = ap.parse_args()
+    main(
+        args.in_path,
+        args.out,
+        strata=args.strata.split(","),
+        per_stratum=args.per_stratum,
+        quotas=dict(_parse_quota(q) for q in args.quota),
+        max_rows=args.max_rows or None,
+        seed=args.seed,
+        batch_rows=args.batch_rows,
+    )
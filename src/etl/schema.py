@@ -0,0 +1,93 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+CLIENT_TYPES = ["Retail", "Wholesale"]
+
+# Columns of the raw extract (reports/data_dictionary.csv), in file order
+RAW_COLUMNS = [
+    "Sale_ID",
+    "Date",
+    "Customer_ID",
+    "Bike_Model",
+    "Price",
+    "Quantity",
+    "Store_Location",
+    "Salesperson_ID",
+    "Payment_Method",
+    "Customer_Age",
+    "Customer_Gender",
+]
+
+# Declared in-memory types of the enriched dataset. Low-cardinality strings become
+# dictionary-encoded categoricals, small counts nullable small ints. Money stays float64
+# so row values and totals keep their cents.
+ENRICHED_SCHEMA: dict[str, object] = {
+    "Bike_Model": "category",
+    "Store_Location": "category",
+    "Payment_Method": "category",
+    "Customer_Gender": "category",
+    "Product_Category": "category",
+    "Warehouse": "category",
+    "Client_Type": pd.CategoricalDtype(CLIENT_TYPES),
+    "Month": "category",
+    "Year": "Int16",
+    "Quantity": "Int16",
+    "Customer_Age": "Int16",
+    "Payment_Fee_Rate": "float32",
+}
+
+# Any other text column is kept as an Arrow-backed string
+STRING_DTYPE = pd.StringDtype("pyarrow")
+
+
+def to_int(s: pd.Series, dtype: str) -> pd.Series:
+    """
+    `s` as the nullable integer `dtype`; values that are not numbers, not whole or out of
+    the type's range become NA instead of failing the cast.
+    """
+    info = np.iinfo(pd.api.types.pandas_dtype(dtype).numpy_dtype)
+    values = pd.to_numeric(s, errors="coerce").astype("float64")
+    fits = values.between(info.min, info.max) & (values == np.floor(values))
+    return values.where(fits).astype(dtype)
+
+
+def apply_schema(df: pd.DataFrame, schema: dict[str, object] = ENRICHED_SCHEMA) -> pd.DataFrame:
+    """
+    Cast the columns of `df` (in place) to `schema`; returns `df`. Categories without a
+    declared order are sorted, so frames built batch by batch end up with the same dtype.
+    """
+    for col in df.columns:
+        dtype = schema.get(col)
+        s = df[col]
+        if dtype == "category":
+            s = s if isinstance(s.dtype, pd.CategoricalDtype) else s.astype("category")
+            cats = s.cat.categories
+            df[col] = (
+                s if cats.is_monotonic_increasing else s.cat.reorder_categories(cats.sort_values())
+            )
+        elif dtype is not None and pd.api.types.is_integer_dtype(pd.api.types.pandas_dtype(dtype)):
+            df[col] = to_int(s, dtype)
+        elif dtype is not None:
+            df[col] = s.astype(dtype)
+        elif pd.api.types.is_object_dtype(s.dtype) or pd.api.types.is_string_dtype(s.dtype):
+            if not isinstance(s.dtype, pd.CategoricalDtype):
+                df[col] = s.astype(STRING_DTYPE)
+    return df
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Deep in-memory bytes per column of two versions of a frame, plus the total."""
+    report = pd.DataFrame(
+        {
+            "dtype_before": before.dtypes.astype(str),
+            "dtype_after": after.dtypes.astype(str),
+            "bytes_before": before.memory_usage(index=False, deep=True),
+            "bytes_after": after.memory_usage(index=False, deep=True),
+        }
+    )
+    report.loc["TOTAL", ["bytes_before", "bytes_after"]] = report[
+        ["bytes_before", "bytes_after"]
+    ].sum()
+    report["ratio"] = report["bytes_before"] / report["bytes_after"]
+    return report
@@ -0,0 +1,248 @@
+from __future__ import annotations
+import argparse
+import io
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pcsv
+from pandas.tseries.api import guess_datetime_format
+
+from src.etl.enrich import SKIPPED_DATE_STRINGS
+from src.etl.schema import RAW_COLUMNS
+from src.utils.io import ParquetAppender, atomic_output
+
+SAMPLE_CSV = Path("data/sample/bike_sales_sample.csv")
+DATA_DICTIONARY = Path("reports/data_dictionary.csv")
+
+# Text columns with at most this many distinct values are drawn from their frequencies
+MAX_CATEGORIES = 50
+
+
+@dataclass(frozen=True)
+class Profile:
+    """
+    Marginal distributions of the raw columns: value frequencies of the low-cardinality
+    text columns, [min, max] of the numeric ones, the Date span and format, null rates.
+    Columns are drawn independently of each other.
+    """
+
+    columns: list[str]
+    categories: dict[str, tuple[list[str], list[float]]] = field(default_factory=dict)
+    ranges: dict[str, tuple[float, float, bool]] = field(default_factory=dict)  # min, max, int
+    dates: dict[str, tuple[str, str, str]] = field(default_factory=dict)  # first, last, format
+    null_rates: dict[str, float] = field(default_factory=dict)
+    id_column: str | None = "Sale_ID"
+
+
+def consistent_date_format(values: pd.Series) -> str:
+    """A format (month- or day-first) that parses every one of `values`; ISO if none does."""
+    first = values.dropna().astype(str).iloc[0]
+    for dayfirst in (False, True):
+        fmt = guess_datetime_format(first, dayfirst=dayfirst)
+        if fmt and pd.to_datetime(values, format=fmt, errors="coerce").notna().all():
+            return fmt
+    return "%Y-%m-%d"
+
+
+def learn_profile(sample: str | Path = SAMPLE_CSV, dictionary: str | Path | None = None) -> Profile:
+    """
+    Profile the raw columns of `sample` (raw or enriched rows). A data dictionary, which
+    describes the full extract, overrides the null rates and gives the raw Date format;
+    the sample's own dates have already been through enrichment.
+    """
+    df = pd.read_csv(sample)
+    columns = [c for c in RAW_COLUMNS if c in df.columns] or list(df.columns)
+    for col in columns:
+        if col.lower() == "date":  # placeholders such as "NaT" count as missing dates
+            df[col] = df[col].mask(df[col].astype(str).isin(SKIPPED_DATE_STRINGS))
+    formats: dict[str, str] = {}
+    null_rates = {c: float(df[c].isna().mean()) for c in columns}
+    if dictionary is not None and Path(dictionary).exists():
+        dd = pd.read_csv(dictionary).set_index("column")
+        for col in columns:
+            if col in dd.index:
+                null_rates[col] = float(dd.loc[col, "null_%"]) / 100
+                if col.lower() == "date":
+                    values = pd.Series(str(dd.loc[col, "sample_values"]).split("; "))
+                    formats[col] = consistent_date_format(values)
+
+    profile = Profile(columns=columns, null_rates=null_rates)
+    for col in columns:
+        s = df[col].dropna()
+        if col == profile.id_column or s.empty:
+            continue
+        if col.lower() == "date":
+            parsed = pd.to_datetime(s, format=consistent_date_format(s), errors="coerce").dropna()
+            fmt = formats.get(col) or consistent_date_format(s)
+            profile.dates[col] = (str(parsed.min().date()), str(parsed.max().date()), fmt)
+        elif pd.api.types.is_numeric_dtype(s):
+            is_int = bool(pd.api.types.is_integer_dtype(s) or (s == s.round()).all())
+            profile.ranges[col] = (float(s.min()), float(s.max()), is_int)
+        elif s.nunique() <= MAX_CATEGORIES:
+            freq = s.astype(str).value_counts(normalize=True).sort_index()
+            profile.categories[col] = (freq.index.tolist(), freq.tolist())
+    return profile
+
+
+def generate_table(profile: Profile, start: int, rows: int, seed: int) -> pa.Table:
+    """
+    Rows `start` .. `start + rows` of the synthetic dataset. The random stream depends only
+    on (`seed`, `start`), so the output is the same however chunks are spread over workers.
+    """
+    rng = np.random.default_rng([seed, start])
+    columns = {}
+    for col in profile.columns:
+        if col == profile.id_column:
+            arr = pa.array(np.arange(start + 1, start + rows + 1))
+        elif col in profile.categories:
+            values, probs = profile.categories[col]
+            codes = rng.choice(len(values), size=rows, p=probs).astype(np.int32)
+            arr = pa.DictionaryArray.from_arrays(codes, pa.array(values)).cast(pa.string())
+        elif col in profile.dates:
+            first, last, fmt = profile.dates[col]
+            days = pd.date_range(first, last, freq="D")
+            # format each calendar day once, then index into the labels
+            labels = pa.array(days.strftime(fmt).tolist())
+            arr = labels.take(pa.array(rng.integers(0, len(days), size=rows)))
+        elif col in profile.ranges:
+            lo, hi, is_int = profile.ranges[col]
+            if is_int:
+                arr = pa.array(rng.integers(int(lo), int(hi) + 1, size=rows))
+            else:
+                arr = pa.array(np.round(rng.uniform(lo, hi, size=rows), 2))
+        else:
+            arr = pa.nulls(rows, pa.string())
+        rate = profile.null_rates.get(col, 0.0)
+        if rate > 0 and col != profile.id_column:
+            arr = pc.if_else(rng.random(rows) < rate, pa.scalar(None, arr.type), arr)
+        columns[col] = arr
+    return pa.table(columns)
+
+
+def _csv_bytes(table: pa.Table, header: bool, quoting: str) -> bytes:
+    buf = io.BytesIO()
+    if header:  # pyarrow quotes header names whatever the quoting style
+        buf.write((",".join(table.column_names) + "\n").encode())
+    pcsv.write_csv(table, buf, pcsv.WriteOptions(include_header=False, quoting_style=quoting))
+    return buf.getvalue()
+
+
+def _quoting(profile: Profile) -> str:
+    # leave values unquoted like the raw extracts, unless some category needs quoting
+    unsafe = any(
+        any(ch in v for ch in ',"\n\r') for values, _ in profile.categories.values() for v in values
+    )
+    return "needed" if unsafe else "none"
+
+
+def _chunk(profile: Profile, start: int, rows: int, seed: int, fmt: str) -> bytes | pa.Table:
+    table = generate_table(profile, start, rows, seed)
+    if fmt == "parquet":
+        return table
+    return _csv_bytes(table, header=start == 0, quoting=_quoting(profile))
+
+
+def generate(
+    profile: Profile,
+    rows: int,
+    out_path: str | Path,
+    chunksize: int = 1_000_000,
+    workers: int | None = None,
+    seed: int = 0,
+) -> None:
+    """
+    Write `rows` synthetic rows to `out_path` (CSV, or Parquet for a `.parquet` path).
+    Chunks are generated by `workers` processes and written in order as they complete,
+    with a bounded number in flight, so memory stays at a few chunks whatever `rows` is.
+    """
+    fmt = "parquet" if Path(out_path).suffix == ".parquet" else "csv"
+    starts = range(0, rows, chunksize)
+    args = [(profile, s, min(chunksize, rows - s), seed, fmt) for s in starts]
+    workers = workers or 1
+    with atomic_output(out_path) as tmp:
+        appender = ParquetAppender(tmp) if fmt == "parquet" else None
+        out = None if appender else tmp.open("wb")
+        try:
+            if workers == 1:
+                results = (_chunk(*a) for a in args)
+            else:
+                results = _ordered(args, workers)
+            for payload in results:
+                if appender:
+                    appender.write_table(payload)
+                else:
+                    out.write(payload)
+            if not rows and out:  # header only
+                out.write(_csv_bytes(generate_table(profile, 0, 0, seed), True, "needed"))
+        finally:
+            if appender:
+                appender.close()
+            if out:
+                out.close()
+
+
+def _ordered(args: list[tuple], workers: int):
+    """Results of `_chunk(*a)` in order, with at most 2 chunks per worker in flight."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        todo = iter(args)
+        for a in todo:
+            pending.append(pool.submit(_chunk, *a))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            yield pending.popleft().result()
+            for a in todo:
+                pending.append(pool.submit(_chunk, *a))
+                break
+
+
+def main(
+    rows: int,
+    out_path: str,
+    sample: str = str(SAMPLE_CSV),
+    dictionary: str | None = str(DATA_DICTIONARY),
+    chunksize: int = 1_000_000,
+    workers: int | None = None,
+    seed: int = 0,
+    profile_out: str | None = None,
+) -> None:
+    profile = learn_profile(sample, dictionary)
+    if profile_out:
+        Path(profile_out).write_text(json.dumps(asdict(profile), indent=2) + "\n")
+    generate(profile, rows, out_path, chunksize=chunksize, workers=workers, seed=seed)
+    print(f"Saved {rows:,} synthetic rows → {out_path}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, required=True)
+    ap.add_argument("--out", dest="out_path", default="data/raw/bike_sales_synthetic.csv")
+    ap.add_argument("--sample", default=str(SAMPLE_CSV), help="rows to learn distributions from")
+    ap.add_argument(
+        "--dictionary",
+        default=str(DATA_DICTIONARY),
+        help="data dictionary for null rates and the raw Date format; empty string to skip",
+    )
+    ap.add_argument("--chunksize", type=int, default=1_000_000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--profile_out", default=None, help="also save the learned profile as JSON")
+    args = ap.parse_args()
+    main(
+        args.rows,
+        args.out_path,
+        sample=args.sample,
+        dictionary=args.dictionary or None,
+        chunksize=args.chunksize,
+        workers=args.workers,
+        seed=args.seed,
+        profile_out=args.profile_out,
+    )
@@ -0,0 +1,181 @@
+from __future__ import annotations
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterator
+
+if TYPE_CHECKING:
+    import pstats
+
+
+def rss_mb() -> float | None:
+    """
+    Current resident set size in MiB (lifetime peak where /proc is not available); None
+    where neither is (Windows).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 2**20 if sys.platform == "darwin" else 2**10
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def path_bytes(path: str | Path | None) -> int:
+    """Size of a file, or the total size of the files under a directory; 0 if missing."""
+    if not path:
+        return 0
+    path = Path(path)
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return path.stat().st_size if path.exists() else 0
+
+
+@dataclass
+class StageRecord:
+    """One run of a named stage. Stages fill in rows_out/bytes_* when they know them."""
+
+    stage: str
+    seconds: float = 0.0
+    rows_in: int | None = None
+    rows_out: int | None = None
+    bytes_read: int | None = None
+    bytes_written: int | None = None
+    rss_delta_mb: float | None = None
+    alloc_peak_mb: float | None = None
+
+
+class Instrument:
+    """
+    Records every `stage(...)` block run while it is active: wall time, rows in/out,
+    bytes read/written and RSS change. Records are appended to `jsonl` as they finish
+    and `summary()` totals them per stage. `profile_stage` runs that stage under
+    cProfile and `trace_stage` under tracemalloc (peak allocation per run). `on_record`
+    is called with each record as it finishes (live progress).
+    """
+
+    def __init__(
+        self,
+        jsonl: str | Path | None = None,
+        profile_stage: str | None = None,
+        trace_stage: str | None = None,
+        on_record: Callable[[StageRecord], None] | None = None,
+    ):
+        self.records: list[StageRecord] = []
+        self.jsonl = Path(jsonl) if jsonl else None
+        self.profile_stage = profile_stage
+        self.trace_stage = trace_stage
+        self.on_record = on_record
+        self.profile: pstats.Stats | None = None
+
+    @contextmanager
+    def stage(
+        self,
+        name: str,
+        rows_in: int | None = None,
+        bytes_read: int | None = None,
+        out_path: str | Path | None = None,
+    ) -> Iterator[StageRecord]:
+        rec = StageRecord(name, rows_in=rows_in, bytes_read=bytes_read)
+        size_before = path_bytes(out_path) if out_path else None
+        profiler = None
+        if name == self.profile_stage:
+            import cProfile
+            import pstats
+
+            profiler = cProfile.Profile()
+        tracing = name == self.trace_stage and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        rss_before = rss_mb()
+        if profiler:
+            profiler.enable()
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec.seconds = time.perf_counter() - t0
+            if profiler:
+                profiler.disable()
+                self.profile = (
+                    pstats.Stats(profiler) if self.profile is None else self.profile.add(profiler)
+                )
+            rss_after = rss_mb()
+            if rss_before is not None and rss_after is not None:
+                rec.rss_delta_mb = round(rss_after - rss_before, 1)
+            if tracing:
+                rec.alloc_peak_mb = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+                tracemalloc.stop()
+            if rec.rows_out is None:
+                rec.rows_out = rows_in
+            if size_before is not None:
+                rec.bytes_written = path_bytes(out_path) - size_before
+            self.records.append(rec)
+            if self.jsonl:
+                with self.jsonl.open("a") as f:
+                    f.write(json.dumps(asdict(rec)) + "\n")
+            if self.on_record:
+                self.on_record(rec)
+
+    def summary(self) -> str:
+        """Per-stage totals, in first-run order."""
+        totals: dict[str, dict] = {}
+        for r in self.records:
+            t = totals.setdefault(r.stage, {"calls": 0, "seconds": 0.0, "rows": 0, "bytes": 0})
+            t["calls"] += 1
+            t["seconds"] += r.seconds
+            t["rows"] += r.rows_out or 0
+            t["bytes"] += (r.bytes_read or 0) + (r.bytes_written or 0)
+        wall = sum(t["seconds"] for t in totals.values()) or 1.0
+        lines = [f"{'stage':<22}{'calls':>7}{'seconds':>10}{'share':>8}{'rows':>14}{'MiB io':>10}"]
+        for name, t in totals.items():
+            lines.append(
+                f"{name:<22}{t['calls']:>7}{t['seconds']:>10.3f}{t['seconds'] / wall:>8.1%}"
+                f"{t['rows']:>14,}{t['bytes'] / 2**20:>10.1f}"
+            )
+        return "\n".join(lines)
+
+    def profile_report(self, top: int = 25) -> str:
+        if self.profile is None:
+            return ""
+        out = io.StringIO()
+        self.profile.stream = out
+        self.profile.sort_stats("cumulative").print_stats(top)
+        return out.getvalue()
+
+
+_active: ContextVar[Instrument | None] = ContextVar("instrument", default=None)
+
+
+def stage(name: str, **kwargs):
+    """A `StageRecord` context for `name`, recorded by the active Instrument if there is one."""
+    instrument = _active.get()
+    if instrument is None:
+        return nullcontext(StageRecord(name))
+    return instrument.stage(name, **kwargs)
+
+
+@contextmanager
+def instrumented(instrument: Instrument | None) -> Iterator[Instrument | None]:
+    """Make `instrument` the active one for the block (None keeps the current one)."""
+    if instrument is None:
+        yield _active.get()
+        return
+    token = _active.set(instrument)
+    try:
+        yield instrument
+    finally:
+        _active.reset(token)
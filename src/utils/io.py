@@ -1,23 +1,538 @@
+import io
+import os
+import shutil
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+
+# pandas loads pyarrow itself; the Parquet writer is imported where Parquet is written
+if TYPE_CHECKING:
+    import pyarrow.parquet as pq
 
 
 def ensure_parent(p: Path) -> None:
     p.parent.mkdir(parents=True, exist_ok=True)
 
 
-def read_csv(path: str | Path) -> pd.DataFrame:
+CSV_ENGINES = ("pandas", "pyarrow", "duckdb")
+
+# pandas' default missing-value strings, so every engine reads the same cells as NaN
+NA_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+
+
+def _arrow_type(dtype: object) -> pa.DataType:
+    if dtype is str or dtype == "str" or isinstance(dtype, pd.StringDtype):
+        return pa.string()
+    return pa.from_numpy_dtype(np.dtype(dtype))
+
+
+def _duckdb_type(dtype: object) -> str:
+    arrow = _arrow_type(dtype)
+    if pa.types.is_string(arrow):
+        return "VARCHAR"
+    if pa.types.is_floating(arrow):
+        return "DOUBLE"
+    if pa.types.is_boolean(arrow):
+        return "BOOLEAN"
+    return "BIGINT"
+
+
+def _sql_str(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def duckdb_csv_source(path: str | Path, dtype: dict[str, object] | None = None) -> str:
+    """
+    DuckDB `read_csv(...)` call for `path` that types columns the way pandas would:
+    pandas' NA strings and no date/time detection. `dtype` pins column types.
+    """
+    options = [
+        "header = true",
+        f"nullstr = [{', '.join(_sql_str(v) for v in NA_VALUES)}]",
+        "auto_type_candidates = ['BOOLEAN', 'BIGINT', 'DOUBLE', 'VARCHAR']",
+    ]
+    if dtype:
+        types = ", ".join(f"{_sql_str(c)}: '{_duckdb_type(t)}'" for c, t in dtype.items())
+        options.append(f"types = {{{types}}}")
+    return f"read_csv({_sql_str(Path(path).as_posix())}, {', '.join(options)})"
+
+
+def read_csv(
+    path: str | Path,
+    engine: str = "pandas",
+    columns: list[str] | None = None,
+    dtype: dict[str, object] | None = None,
+) -> pd.DataFrame:
+    """
+    Read a whole CSV with one of `CSV_ENGINES`, keeping only `columns` (in file order)
+    and parsing the columns named in `dtype` as given. pyarrow and DuckDB parse on all
+    cores and hand over Arrow buffers; strings become pandas' default string dtype, which
+    is Arrow-backed from pandas 3 on. They are set up to infer what pandas infers (no date
+    detection, pandas' NA strings), so every engine returns the same frame.
+    """
+    path = Path(path)
+    if columns is not None:
+        wanted = set(columns)
+        columns = [c for c in pd.read_csv(path, nrows=0).columns if c in wanted]
+    if engine == "pandas":
+        return pd.read_csv(path, low_memory=False, usecols=columns, dtype=dtype)
+    if engine == "pyarrow":
+        import pyarrow.csv as pcsv
+
+        table = pcsv.read_csv(
+            path,
+            convert_options=pcsv.ConvertOptions(
+                include_columns=columns,
+                column_types={c: _arrow_type(t) for c, t in (dtype or {}).items()},
+                null_values=NA_VALUES,
+                strings_can_be_null=True,
+                timestamp_parsers=[],
+            ),
+        )
+        # pyarrow still infers date32/time32 from canonical ISO text; pandas keeps the text
+        for i, field in enumerate(table.schema):
+            if pa.types.is_temporal(field.type) and field.name not in (dtype or {}):
+                table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+    elif engine == "duckdb":
+        import duckdb
+
+        select = ", ".join(f'"{c}"' for c in columns) if columns is not None else "*"
+        with duckdb.connect() as con:
+            # a relation's to_arrow_table: DuckDB before 1.4 has none on query results
+            table = con.sql(
+                f"SELECT {select} FROM {duckdb_csv_source(path, dtype)}"
+            ).to_arrow_table()
+    else:
+        raise ValueError(f"Unknown CSV engine {engine!r}; expected one of {CSV_ENGINES}")
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    return df.astype({c: t for c, t in (dtype or {}).items() if c in df.columns})
+
+
+def merge_dtypes(seen: list) -> object:
+    """Dtype a whole-file read would settle on for a column seen as `seen` per chunk."""
+    if all(d == seen[0] for d in seen):
+        return seen[0]
+    if all(isinstance(d, np.dtype) and d.kind in "iuf" for d in seen):
+        return np.result_type(*seen)
+    return str
+
+
+def scan_csv_dtypes(
+    path: str | Path, chunksize: int, columns: list[str] | None = None
+) -> dict[str, object]:
+    """
+    One bounded-memory pass over `path` resolving the dtype of every column, so that
+    chunked reads parse each batch the same way `read_csv` parses the whole file.
+    """
+    seen: dict[str, list] = {}
+    for chunk in pd.read_csv(Path(path), chunksize=chunksize, usecols=columns):
+        for col, dtype in chunk.dtypes.items():
+            seen.setdefault(col, []).append(dtype)
+    return {col: merge_dtypes(dtypes) for col, dtypes in seen.items()}
+
+
+def iter_csv(
+    path: str | Path,
+    chunksize: int,
+    dtype: dict[str, object] | None = None,
+    columns: list[str] | None = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield `path` in batches of `chunksize` rows, indexed by global row position."""
+    offset = 0
+    for chunk in pd.read_csv(Path(path), chunksize=chunksize, dtype=dtype, usecols=columns):
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
+
+
+def csv_header_end(path: str | Path) -> int:
+    """Byte offset of the first data row of `path`."""
+    with Path(path).open("rb") as f:
+        f.readline()
+        return f.tell()
+
+
+def csv_byte_ranges(
+    path: str | Path, parts: int, start: int | None = None, end: int | None = None
+) -> list[tuple[int, int]]:
+    """
+    Split the data rows of `path` (or bytes [start, end), both line starts, if given)
+    into about `parts` contiguous byte ranges that start and end on line boundaries.
+    Assumes no quoted field spans a newline.
+    """
     path = Path(path)
-    return pd.read_csv(path, low_memory=False)
+    size = path.stat().st_size if end is None else end
+    with path.open("rb") as f:
+        bounds = [csv_header_end(path) if start is None else start]
+        step = max(1, (size - bounds[0]) // parts)
+        for i in range(1, parts):
+            f.seek(max(bounds[0] + i * step, bounds[-1]))
+            f.readline()  # move on to the start of the next line
+            if f.tell() >= size:
+                break
+            if f.tell() > bounds[-1]:
+                bounds.append(f.tell())
+        bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
 
+def read_csv_range(
+    path: str | Path,
+    start: int,
+    end: int,
+    dtype: dict[str, object] | None = None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """Parse the rows in bytes [start, end) of `path` (see `csv_byte_ranges`)."""
+    with Path(path).open("rb") as f:
+        header = f.readline()
+        f.seek(start)
+        body = f.read(end - start)
+    return pd.read_csv(io.BytesIO(header + body), low_memory=False, dtype=dtype, usecols=columns)
 
-def write_csv(df: pd.DataFrame, path: str | Path) -> None:
+
+def concat_files(parts: list[Path], path: str | Path) -> None:
     path = Path(path)
     ensure_parent(path)
-    df.to_csv(path, index=False)
+    with path.open("wb") as out:
+        for part in parts:
+            with part.open("rb") as f:
+                shutil.copyfileobj(f, out)
+
 
+def copy_file(src: str | Path, dst: str | Path) -> None:
+    """
+    Copy `src` to `dst` with copy_file_range where the OS has it: the kernel copies the
+    data without passing it through this process, and copy-on-write filesystems (btrfs,
+    XFS with reflink) share the extents instead of copying them.
+    """
+    try:
+        with open(src, "rb") as fin, open(dst, "wb") as fout:
+            left = os.fstat(fin.fileno()).st_size
+            while left > 0:
+                done = os.copy_file_range(fin.fileno(), fout.fileno(), left)
+                if done == 0:
+                    break
+                left -= done
+    except (AttributeError, OSError):  # no copy_file_range, or not across these files
+        shutil.copyfile(src, dst)
 
-def write_parquet(df: pd.DataFrame, path: str | Path) -> None:
+
+def concat_parquet(parts: list[Path], path: str | Path, **options) -> None:
+    import pyarrow.parquet as pq
+
+    with ParquetAppender(path, **options) as appender:
+        for part in parts:
+            appender.write_table(pq.read_table(part))
+
+
+def write_csv(df: pd.DataFrame, path: str | Path, append: bool = False) -> None:
     path = Path(path)
     ensure_parent(path)
-    df.to_parquet(path, index=False)
+    if append:
+        df.to_csv(path, mode="a", header=False, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def clear_parquet(path: str | Path) -> None:
+    """Remove a previous Parquet output: the file, or the part files of a dataset directory."""
+    path = Path(path)
+    if path.is_dir():
+        for f in path.rglob("*.parquet"):
+            f.unlink()
+    elif path.exists():
+        path.unlink()
+
+
+def remove_path(path: Path) -> None:
+    if path.is_symlink():
+        path.unlink()
+    elif path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def _versions(path: Path) -> list[Path]:
+    return list(path.parent.glob(f".{path.name}.v*"))
+
+
+def resolve_output(path: str | Path) -> Path:
+    """
+    The version a directory published by `atomic_output` points to right now. A reader
+    that resolves the path once reads every file from the same complete version, even
+    while a new one is published.
+    """
+    return Path(path).resolve()
+
+
+def _publish_dir(tmp: Path, path: Path) -> None:
+    # `path` becomes a symlink to a versioned sibling, replaced in one rename; the version
+    # it pointed to stays for readers still on it and goes with the next publish
+    version = path.with_name(f".{path.name}.v{uuid.uuid4().hex[:12]}")
+    tmp.rename(version)
+    previous = path.resolve() if path.is_symlink() else None
+    link = path.with_name(f".{path.name}.link")
+    remove_path(link)
+    try:
+        link.symlink_to(version.name, target_is_directory=True)
+    except OSError:  # no symlinks here (Windows without the privilege): swap by renames
+        link = version
+    if path.is_dir() and not path.is_symlink():
+        # a plain directory (an older layout, or no symlinks): briefly missing
+        old = path.with_name(f".{path.name}.old")
+        remove_path(old)
+        path.rename(old)
+        link.rename(path)
+        remove_path(old)
+    else:
+        link.replace(path)
+    for v in _versions(path):
+        if v not in (version, previous):
+            remove_path(v)
+
+
+@contextmanager
+def atomic_output(path: str | Path | None) -> Iterator[Path | None]:
+    """
+    Yield a temporary sibling of `path` to write to; on success it replaces `path`, so
+    readers see either the previous output or the complete new one. A file is swapped in
+    with one atomic rename. A directory is renamed to a versioned sibling and `path`, a
+    symlink, is repointed to it in one rename; readers should resolve it once per read
+    (`resolve_output`). Where symlinks are unavailable the directory is swapped with two
+    renames, between which `path` is missing.
+    """
+    if not path:
+        yield None
+        return
+    path = Path(path)
+    ensure_parent(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    remove_path(tmp)  # left over from an interrupted run
+    try:
+        yield tmp
+    except BaseException:
+        remove_path(tmp)
+        raise
+    if not tmp.exists():
+        return
+    if tmp.is_dir():
+        _publish_dir(tmp, path)
+    elif path.is_dir() and not path.is_symlink():
+        old = path.with_name(f".{path.name}.old")
+        remove_path(old)
+        path.rename(old)
+        tmp.rename(path)
+        remove_path(old)
+    else:
+        tmp.replace(path)
+        for v in _versions(path):
+            remove_path(v)
+
+
+# Schema of a partitioned dataset, partition columns included, next to its files
+DATASET_SCHEMA_FILE = "_common_metadata"
+
+# Directory value of a null partition: "NULL" is read as null by every DuckDB, while
+# pyarrow's default only by DuckDB 1.4 and later, which also writes it
+HIVE_NULL = "NULL"
+HIVE_DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def write_dataset_schema(path: Path, schema: pa.Schema) -> None:
+    """Record `schema` in the dataset at `path`; writers sharing the dataset write the same."""
+    import pyarrow.parquet as pq
+
+    path.mkdir(parents=True, exist_ok=True)
+    tmp = path / f".{DATASET_SCHEMA_FILE}.{uuid.uuid4().hex}"
+    pq.write_metadata(schema, tmp)
+    tmp.replace(path / DATASET_SCHEMA_FILE)
+
+
+def dataset_partitioning(path: str | Path):
+    """
+    Hive partitioning of the dataset at `path` for pyarrow readers: the partition types
+    recorded in its schema file (plain Int16 Year, text Month) instead of dictionaries
+    inferred from the directory names, and the null value its writer used. None for a
+    file, or a directory without partitions.
+    """
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    first = next(path.rglob("*.parquet"), None) if path.is_dir() else None
+    if first is None:
+        return None
+    names = [p.split("=", 1)[0] for p in first.relative_to(path).parts[:-1] if "=" in p]
+    if not names:
+        return None
+    null = HIVE_DEFAULT_PARTITION if any(path.rglob(f"*={HIVE_DEFAULT_PARTITION}")) else HIVE_NULL
+    schema_file = path / DATASET_SCHEMA_FILE
+    if not schema_file.exists():
+        return ds.HivePartitioning.discover(null_fallback=null)
+    schema = pq.read_schema(schema_file)
+    return ds.HivePartitioning(pa.schema([schema.field(n) for n in names]), null_fallback=null)
+
+
+def read_parquet(path: str | Path, **kwargs) -> pd.DataFrame:
+    """
+    `pd.read_parquet` of a Parquet file or dataset, a dataset's partition columns read
+    with `dataset_partitioning`, nulls included.
+    """
+    import pyarrow.parquet as pq
+
+    path = resolve_output(path)
+    schema_file = path / DATASET_SCHEMA_FILE
+    if schema_file.exists() and "schema" not in kwargs:
+        kwargs["schema"] = pq.read_schema(schema_file)
+    partitioning = dataset_partitioning(path)
+    if partitioning is not None and "partitioning" not in kwargs:
+        kwargs["partitioning"] = partitioning
+    return pd.read_parquet(path, **kwargs)
+
+
+def write_parquet(
+    df: pd.DataFrame,
+    path: str | Path,
+    partition_cols: list[str] | None = None,
+    row_group_size: int | None = None,
+    compression: str = "snappy",
+    write_statistics: bool = True,
+) -> None:
+    """
+    Write `df` to one Parquet file, or with `partition_cols` to a Hive-partitioned
+    dataset directory (`path/Year=2024/Month=2024-05/part-….parquet`) that DuckDB and
+    pyarrow readers can prune by directory and by row-group statistics.
+    """
+    clear_parquet(path)
+    with ParquetAppender(
+        path,
+        partition_cols=partition_cols,
+        row_group_size=row_group_size,
+        compression=compression,
+        write_statistics=write_statistics,
+    ) as appender:
+        appender.write(df)
+
+
+class ParquetAppender:
+    """
+    Incremental Parquet writer: the first frame fixes the schema and later frames are
+    cast to it. Without `partition_cols` every frame lands as extra row groups of one
+    file; with them, as new `{basename}-NNNNN-*.parquet` files in each partition
+    directory it touches, so several writers with distinct basenames can share a dataset.
+    `bytes_written` counts the bytes written so far (a single file's footer is only
+    written by `close`).
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        partition_cols: list[str] | None = None,
+        row_group_size: int | None = None,
+        compression: str = "snappy",
+        write_statistics: bool = True,
+        basename: str = "part",
+    ):
+        self.path = Path(path)
+        self.partition_cols = list(partition_cols or [])
+        self.row_group_size = row_group_size
+        self.options = {"compression": compression, "write_statistics": write_statistics}
+        self.basename = basename
+        self.schema: pa.Schema | None = None
+        self._writer: "pq.ParquetWriter | None" = None
+        self._sink: pa.OSFile | None = None
+        self._files = 0
+        self.bytes_written = 0
+
+    def _fix_schema(self, schema: pa.Schema) -> pa.Schema:
+        if self.schema is None:
+            # An all-null batch can't tell us the real type; strings are the safe guess
+            for i, field in enumerate(schema):
+                if pa.types.is_null(field.type):
+                    schema = schema.set(i, field.with_type(pa.string()))
+            self.schema = schema
+        return self.schema
+
+    def write(self, df: pd.DataFrame) -> None:
+        schema = self._fix_schema(pa.Schema.from_pandas(df, preserve_index=False))
+        self.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+
+    def write_table(self, table: pa.Table) -> None:
+        import pyarrow.parquet as pq
+
+        table = table.cast(self._fix_schema(table.schema))
+        if self.partition_cols:
+            import pyarrow.dataset as ds
+
+            # declared types: directory names alone read back as dictionaries, which pandas
+            # can't convert once a partition is null (rows without a date)
+            schema = self.schema
+            for c in self.partition_cols:
+                field = schema.field(c)
+                if pa.types.is_dictionary(field.type):
+                    field = field.with_type(field.type.value_type)
+                schema = schema.set(schema.get_field_index(c), field)
+            fields = [schema.field(c) for c in self.partition_cols]
+            if self._files == 0:
+                write_dataset_schema(self.path, schema)
+            extra = {"row_group_size": self.row_group_size} if self.row_group_size else {}
+            pq.write_to_dataset(
+                table,
+                self.path,
+                partitioning=ds.HivePartitioning(pa.schema(fields), null_fallback=HIVE_NULL),
+                basename_template=f"{self.basename}-{self._files:05d}-{{i}}.parquet",
+                file_visitor=self._count_file,
+                **self.options,
+                **extra,
+            )
+            self._files += 1
+            return
+        if self._writer is None:
+            ensure_parent(self.path)
+            self._sink = pa.OSFile(self.path.as_posix(), "wb")
+            self._writer = pq.ParquetWriter(self._sink, self.schema, **self.options)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        self.bytes_written = self._sink.tell()
+
+    def _count_file(self, written) -> None:
+        self.bytes_written += written.size
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self.bytes_written = self._sink.tell()
+            self._sink.close()
+            self._writer = self._sink = None
+
+    def __enter__(self) -> "ParquetAppender":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -5,8 +5,12 @@ from pathlib import Path
 import importlib
 import inspect
 import pandas as pd
+import pytest
 
-PROCESSED_PARQUET = Path("data/processed/bike_sales_100k_enriched.parquet")
+from src.etl.schema import apply_schema
+from src.utils.io import read_parquet
+
+PROCESSED_PARQUET = Path("data/processed/bike_sales_100k_enriched")  # Hive-partitioned
 SAMPLE_CSV = Path("data/sample/bike_sales_sample.csv")
 
 
@@ -72,9 +76,9 @@ def _call_enricher(enricher, raw_df: pd.DataFrame) -> pd.DataFrame:
 
 
 def _get_enriched_df() -> pd.DataFrame:
-    # Use processed parquet when present (dev machines)
+    # Use the processed dataset when present (dev machines)
     if PROCESSED_PARQUET.exists():
-        return pd.read_parquet(PROCESSED_PARQUET)
+        return read_parquet(PROCESSED_PARQUET)
 
     # CI path: build from tracked sample CSV
     assert SAMPLE_CSV.exists(), "Sample CSV is missing from the repo"
@@ -103,3 +107,301 @@ def test_net_revenue_not_null():
     df = _get_enriched_df()
     assert df["Net_Revenue"].notna().all(), "Net_Revenue contains nulls"
     assert (df["Net_Revenue"] >= 0).all(), "Net_Revenue contains negatives"
+
+
+def test_chunked_main_matches_in_memory(tmp_path):
+    from src.etl.enrich import main
+
+    raw = pd.read_csv(SAMPLE_CSV).iloc[:, :11]
+    # a late NaN turns Quantity into float64 for the whole file but not for early batches
+    raw.loc[len(raw) - 1, "Quantity"] = None
+    raw_path = tmp_path / "raw.csv"
+    raw.to_csv(raw_path, index=False)
+
+    main(str(raw_path), str(tmp_path / "full.csv"), str(tmp_path / "full.parquet"))
+    main(
+        str(raw_path),
+        str(tmp_path / "chunked.csv"),
+        str(tmp_path / "chunked.parquet"),
+        chunksize=37,
+    )
+
+    assert (tmp_path / "full.csv").read_bytes() == (tmp_path / "chunked.csv").read_bytes()
+    pd.testing.assert_frame_equal(
+        apply_schema(pd.read_parquet(tmp_path / "full.parquet")),
+        apply_schema(pd.read_parquet(tmp_path / "chunked.parquet")),
+    )
+
+
+def test_client_type_keyed_on_sale_id_survives_reordering():
+    from src.etl.enrich import compute_client_type
+
+    raw = pd.read_csv(SAMPLE_CSV)
+    shuffled = raw.sample(frac=1, random_state=0).reset_index(drop=True)
+
+    before = compute_client_type(raw, key="Sale_ID").set_axis(raw["Sale_ID"])
+    after = compute_client_type(shuffled, key="Sale_ID").set_axis(shuffled["Sale_ID"])
+    pd.testing.assert_series_equal(before.sort_index(), after.sort_index())
+
+
+def test_parallel_main_matches_serial(tmp_path):
+    from src.etl.enrich import main
+
+    raw_path = tmp_path / "raw.csv"
+    pd.read_csv(SAMPLE_CSV).iloc[:, :11].to_csv(raw_path, index=False)
+
+    main(str(raw_path), str(tmp_path / "serial.csv"), str(tmp_path / "serial.parquet"))
+    main(
+        str(raw_path),
+        str(tmp_path / "parallel.csv"),
+        str(tmp_path / "parallel.parquet"),
+        workers=3,
+    )
+
+    assert (tmp_path / "serial.csv").read_bytes() == (tmp_path / "parallel.csv").read_bytes()
+    pd.testing.assert_frame_equal(
+        apply_schema(pd.read_parquet(tmp_path / "serial.parquet")),
+        apply_schema(pd.read_parquet(tmp_path / "parallel.parquet")),
+    )
+
+
+def test_parallel_main_reads_only_the_projected_columns(tmp_path):
+    from src.etl.enrich import main
+
+    raw_path = tmp_path / "raw.csv"
+    pd.read_csv(SAMPLE_CSV).iloc[:, :11].to_csv(raw_path, index=False)
+    columns = ["Sale_ID", "Price", "Quantity"]  # no Date: no date to parse
+
+    main(str(raw_path), str(tmp_path / "serial.csv"), columns=columns)
+    main(str(raw_path), str(tmp_path / "parallel.csv"), columns=columns, workers=2)
+
+    assert (tmp_path / "serial.csv").read_bytes() == (tmp_path / "parallel.csv").read_bytes()
+
+
+def test_partitioned_parquet_same_rows_for_every_mode(tmp_path):
+    import duckdb
+
+    from src.etl.enrich import main
+
+    raw_path = tmp_path / "raw.csv"
+    pd.read_csv(SAMPLE_CSV).iloc[:, :11].to_csv(raw_path, index=False)
+
+    results = []
+    for mode in [{}, {"chunksize": 37}, {"workers": 3}]:
+        out = tmp_path / "dataset"
+        main(str(raw_path), str(tmp_path / "out.csv"), str(out), partition_by=["Year"], **mode)
+        results.append(
+            duckdb.sql(
+                f"""
+                SELECT Sale_ID, Year, Client_Type, Net_Revenue
+                FROM read_parquet('{out.as_posix()}/**/*.parquet', hive_partitioning = true)
+                ORDER BY Sale_ID
+                """
+            ).df()
+        )
+    assert len(results[0]) == len(pd.read_csv(raw_path))
+    for other in results[1:]:
+        pd.testing.assert_frame_equal(results[0], other)
+
+
+def test_enriched_frame_uses_declared_schema():
+    from src.etl.enrich import enrich_dataframe
+
+    df = enrich_dataframe(pd.read_csv(SAMPLE_CSV).iloc[:, :11])
+    assert list(df["Client_Type"].cat.categories) == ["Retail", "Wholesale"]
+    for col in ["Bike_Model", "Store_Location", "Warehouse", "Product_Category", "Month"]:
+        assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+    assert str(df["Year"].dtype) == "Int16"
+
+
+def test_schema_turns_out_of_range_integers_into_na():
+    df = pd.DataFrame(
+        {
+            "Quantity": [2, 2.5, 40000, None],
+            "Customer_Age": ["36", "abc", "-5", "70000"],
+            "Year": [2022.0, 2023.0, 1e12, float("nan")],
+        }
+    )
+    df = apply_schema(df)
+    assert df["Quantity"].tolist() == [2, pd.NA, pd.NA, pd.NA]
+    assert df["Customer_Age"].tolist() == [36, pd.NA, -5, pd.NA]
+    assert df["Year"].tolist() == [2022, 2023, pd.NA, pd.NA]
+    assert {str(df[c].dtype) for c in df} == {"Int16"}
+
+
+def test_instrument_records_each_stage(tmp_path):
+    import json
+
+    from src.etl.enrich import main
+    from src.utils.instrument import Instrument
+
+    raw_path = tmp_path / "raw.csv"
+    pd.read_csv(SAMPLE_CSV).iloc[:, :11].to_csv(raw_path, index=False)
+
+    instrument = Instrument(tmp_path / "metrics.jsonl")
+    main(str(raw_path), str(tmp_path / "out.csv"), "", out_cube="", instrument=instrument)
+
+    stages = {r.stage: r for r in instrument.records}
+    assert {"read_csv", "date_parse", "apply_schema", "write_csv"} <= stages.keys()
+    assert stages["date_parse"].rows_in == 200
+    assert stages["write_csv"].bytes_written == (tmp_path / "out.csv").stat().st_size
+    logged = [json.loads(line) for line in (tmp_path / "metrics.jsonl").read_text().splitlines()]
+    assert [r["stage"] for r in logged] == [r.stage for r in instrument.records]
+
+
+def test_instrument_without_rss_source(monkeypatch, tmp_path):
+    import builtins
+    import sys
+
+    from src.utils import instrument as inst
+
+    real_open = builtins.open
+
+    def no_proc(path, *args, **kwargs):
+        if str(path).startswith("/proc/"):
+            raise OSError(path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", no_proc)
+    monkeypatch.setitem(sys.modules, "resource", None)  # as on Windows
+    assert inst.rss_mb() is None
+    instrument = inst.Instrument()
+    with instrument.stage("write", out_path=tmp_path / "out.csv"):
+        (tmp_path / "out.csv").write_text("a\n1\n")
+    assert instrument.records[0].rss_delta_mb is None
+    assert instrument.records[0].bytes_written == 4
+
+
+def test_enrich_import_leaves_heavy_modules_unloaded():
+    import subprocess
+    import sys
+
+    lazy = ["duckdb", "pyarrow.parquet", "pyarrow.dataset", "plotly", "cProfile"]
+    code = f"import sys, src.etl.enrich; print(*(m for m in {lazy!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.split() == []
+
+
+def test_day_first_dates_detected_past_an_ambiguous_first_row():
+    from src.etl.enrich import enrich_frame, guess_date_format
+
+    raw = pd.read_csv(SAMPLE_CSV).iloc[:6, :11]
+    raw["Date"] = ["11-07-2022", "28-09-2022", "03-05-2024", "01-09-2022", "25-01-2021", None]
+    assert guess_date_format(raw["Date"]) == "%d-%m-%Y"
+
+    df = enrich_frame(raw)
+    assert df["Date"].isna().tolist() == [False] * 5 + [True]
+    assert df["Month"].astype(str).tolist()[:2] == ["2022-07", "2022-09"]
+
+
+@pytest.mark.parametrize("mode", [{"chunksize": 37}, {"workers": 3}])
+def test_batched_runs_guess_dates_from_the_whole_file(tmp_path, mode):
+    from src.etl.enrich import main
+
+    raw = pd.read_csv(SAMPLE_CSV).iloc[:, :11]
+    # day-first dates; the first batch and the first range only hold days of 12 or less
+    days = [1 + i % 12 if i < 80 else 13 + i % 16 for i in range(len(raw))]
+    raw["Date"] = [f"{d:02d}-{1 + i % 12:02d}-2022" for i, d in enumerate(days)]
+    raw_path = tmp_path / "raw.csv"
+    raw.to_csv(raw_path, index=False)
+
+    main(str(raw_path), str(tmp_path / "full.csv"))
+    main(str(raw_path), str(tmp_path / "batched.csv"), **mode)
+
+    assert (tmp_path / "full.csv").read_bytes() == (tmp_path / "batched.csv").read_bytes()
+    assert pd.read_csv(tmp_path / "batched.csv")["Date"].notna().all()
+
+
+def test_date_format_tolerates_a_few_bad_values():
+    from src.etl.enrich import guess_date_format, parse_dates
+
+    values = pd.Series(["11-07-2022", "garbage", "28-09-2022", "03-05-2024", "25-01-2021"])
+    assert guess_date_format(values) == "%d-%m-%Y"
+    dates = parse_dates(values, guess_date_format(values))["Date"]
+    assert dates.isna().tolist() == [False, True, False, False, False]
+    assert dates[0] == pd.Timestamp("2022-07-11")
+
+    # no one format fits: each value is parsed alone, in the day order most of them have
+    mixed = pd.Series(["11-07-2022", "28-09-2022", "25-01-2021", "03.05.2024 10:00", "13/02/21"])
+    assert guess_date_format(mixed) == "mixed-dayfirst"
+    assert parse_dates(mixed, "mixed-dayfirst")["Date"][0] == pd.Timestamp("2022-07-11")
+
+
+def test_parse_dates_matches_row_by_row_parse():
+    from src.etl.enrich import parse_dates
+
+    values = pd.Series(["05-03-2022", None, "31-12-2021", "05-03-2022", "NaT", "garbage", ""] * 3)
+    got = parse_dates(values, "%d-%m-%Y")
+
+    dates = pd.to_datetime(values, format="%d-%m-%Y", errors="coerce").dt.as_unit("us")
+    pd.testing.assert_series_equal(got["Date"], dates, check_names=False)
+    assert got["Month"].astype(str).tolist() == dates.dt.to_period("M").astype(str).tolist()
+    assert got["Month_Start"].tolist() == dates.dt.to_period("M").dt.to_timestamp().tolist()
+    assert got["Year"].dropna().tolist() == [2022, 2021, 2022] * 3
+
+
+def test_duckdb_engine_parses_dates_like_pandas(tmp_path):
+    from src.etl.enrich import main
+
+    raw = pd.read_csv(SAMPLE_CSV).iloc[:, :11]
+    raw["Date"] = [f"{1 + i % 12:02d}/{1 + i % 28:02d}/2022" for i in range(len(raw))]
+    raw.loc[5, "Date"] = "garbage"
+    raw_path = tmp_path / "raw.csv"
+    raw.to_csv(raw_path, index=False)
+    for engine in ["pandas", "duckdb"]:
+        main(str(raw_path), str(tmp_path / f"{engine}.csv"), engine=engine)
+    assert (tmp_path / "pandas.csv").read_bytes() == (tmp_path / "duckdb.csv").read_bytes()
+    assert pd.read_csv(tmp_path / "duckdb.csv")["Date"].isna().sum() == 1
+
+    # no single format: pandas parses value by value, which DuckDB cannot match
+    raw["Date"] = ["11-07-2022", "28/09/2022", "2022.05.03", "25-01-2021 10:00"] * 50
+    raw.to_csv(raw_path, index=False)
+    with pytest.raises(ValueError, match="one format"):
+        main(str(raw_path), str(tmp_path / "duckdb.csv"), engine="duckdb")
+
+
+@pytest.mark.parametrize("client_key", [None, "Sale_ID"])
+def test_duckdb_engine_matches_pandas(tmp_path, client_key):
+    import duckdb
+
+    from src.etl.enrich import main
+
+    raw = pd.read_csv(SAMPLE_CSV).iloc[:, :11]
+    raw.loc[len(raw) - 1, "Quantity"] = None
+    raw_path = tmp_path / "raw.csv"
+    raw.to_csv(raw_path, index=False)
+
+    for engine in ["pandas", "duckdb"]:
+        for name, partition_by in [("file.parquet", None), ("dataset", ["Year", "Month"])]:
+            main(
+                str(raw_path),
+                str(tmp_path / f"{engine}.csv"),
+                str(tmp_path / engine / name),
+                client_key=client_key,
+                partition_by=partition_by,
+                engine=engine,
+            )
+
+    assert (tmp_path / "pandas.csv").read_bytes() == (tmp_path / "duckdb.csv").read_bytes()
+    pd.testing.assert_frame_equal(
+        apply_schema(pd.read_parquet(tmp_path / "pandas" / "file.parquet")),
+        apply_schema(pd.read_parquet(tmp_path / "duckdb" / "file.parquet")),
+    )
+    datasets = [
+        duckdb.sql(
+            f"""
+            SELECT * FROM read_parquet('{(tmp_path / engine / "dataset").as_posix()}/**/*.parquet',
+                                       hive_partitioning = true, union_by_name = true)
+            ORDER BY Sale_ID
+            """
+        ).df()
+        for engine in ["pandas", "duckdb"]
+    ]
+    pd.testing.assert_frame_equal(*datasets, check_dtype=False)
+    # pandas reads either engine's null partition (rows without a date) back as NA
+    years = [
+        read_parquet(tmp_path / engine / "dataset").sort_values("Sale_ID")["Year"]
+        for engine in ["pandas", "duckdb"]
+    ]
+    assert years[0].isna().sum() > 0
+    assert years[0].isna().tolist() == years[1].isna().tolist()
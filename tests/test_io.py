@@ -0,0 +1,82 @@
+# tests/test_io.py
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from src.utils.io import (
+    CSV_ENGINES,
+    atomic_output,
+    read_csv,
+    read_parquet,
+    resolve_output,
+    write_parquet,
+)
+
+SAMPLE_CSV = "data/sample/bike_sales_sample.csv"
+
+
+def test_atomic_output_swaps_complete_outputs_only(tmp_path):
+    dataset = tmp_path / "enriched"
+    with atomic_output(dataset) as tmp:
+        (tmp / "Year=2024").mkdir(parents=True)
+        (tmp / "Year=2024" / "part-0.parquet").write_text("old")
+    assert (dataset / "Year=2024" / "part-0.parquet").read_text() == "old"
+
+    # a failed rewrite leaves the previous output in place and no temp files behind
+    with pytest.raises(RuntimeError), atomic_output(dataset) as tmp:
+        (tmp / "Year=2025").mkdir(parents=True)
+        raise RuntimeError("interrupted")
+    assert not tmp.exists()
+    assert (dataset / "Year=2024" / "part-0.parquet").read_text() == "old"
+
+    # a reader that resolved the path keeps its version through the next publish
+    held = resolve_output(dataset)
+    with atomic_output(dataset) as tmp:
+        (tmp / "Year=2025").mkdir(parents=True)
+    assert [p.name for p in dataset.iterdir()] == ["Year=2025"]
+    assert (held / "Year=2024" / "part-0.parquet").read_text() == "old"
+
+    with atomic_output(dataset) as tmp:
+        (tmp / "Year=2026").mkdir(parents=True)
+    assert not held.exists()
+    assert [p.name for p in dataset.iterdir()] == ["Year=2026"]
+    # the path itself, the current version and the one before it
+    assert len(list(tmp_path.iterdir())) == 3
+
+
+@pytest.mark.parametrize("engine", CSV_ENGINES)
+def test_read_csv_engines_match_pandas(tmp_path, engine):
+    raw = pd.read_csv(SAMPLE_CSV).iloc[:, :11]
+    raw.loc[3, "Quantity"] = None  # int column with a gap reads as float64
+    raw.loc[4, "Bike_Model"] = "NA"
+    path = tmp_path / "raw.csv"
+    raw.to_csv(path, index=False)
+
+    for kwargs in [
+        {},
+        {"columns": ["Price", "Date", "Sale_ID"]},  # kept in file order
+        {"dtype": {"Customer_ID": str, "Customer_Age": "float64"}},
+    ]:
+        expected = read_csv(path, **kwargs)
+        pd.testing.assert_frame_equal(read_csv(path, engine=engine, **kwargs), expected)
+    assert list(read_csv(path, engine=engine, columns=["Price", "Date"]).columns) == [
+        "Date",
+        "Price",
+    ]
+
+
+def test_partitioned_parquet_round_trips_a_null_year(tmp_path):
+    df = pd.DataFrame(
+        {
+            "Sale_ID": [1, 2, 3],
+            "Year": pd.array([2022, None, 2023], dtype="Int16"),
+            "Month": pd.Categorical(["2022-07", None, "2023-01"]),
+        }
+    )
+    write_parquet(df, tmp_path / "ds", partition_cols=["Year", "Month"])
+
+    got = read_parquet(tmp_path / "ds").sort_values("Sale_ID").reset_index(drop=True)
+    assert str(got["Year"].dtype) == "Int16"
+    assert got["Year"].tolist() == [2022, pd.NA, 2023]
+    assert got["Month"].isna().tolist() == [False, True, False]
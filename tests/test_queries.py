@@ -0,0 +1,141 @@
+# tests/test_queries.py
+from __future__ import annotations
+import random
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+import pytest
+
+from src.dashboard.bitmap_index import IndexedQueries, indexed
+from src.dashboard.queries import (
+    EXPORT_FORMATS,
+    Filters,
+    SalesQueries,
+    open_source,
+    source_fingerprint,
+)
+from src.etl.cube import relation_for, write_cube
+from src.etl.enrich import main
+
+SAMPLE_CSV = "data/sample/bike_sales_sample.csv"
+
+
+def test_pushed_down_filters_match_pandas(tmp_path):
+    q = open_source(tmp_path / "none.duckdb", tmp_path / "none", Path(SAMPLE_CSV))
+    dims = q.dimensions()
+
+    df = pd.read_csv(SAMPLE_CSV)
+    df["_MonthDT"] = pd.to_datetime(
+        df["Month"].astype(str) + "-01", format="%Y-%m-%d", errors="coerce"
+    )
+    month_to = pd.Timestamp("2023-06-01")
+    f = df[
+        df["_MonthDT"].between(dims["month_min"], month_to)
+        & df["Warehouse"].isin(["East"])
+        & df["Bike_Model"].isin(["Road Bike", "BMX", "Cruiser"])
+    ]
+    filters = Filters(
+        month_from=dims["month_min"],
+        month_to=month_to.to_pydatetime(),
+        warehouses=("East",),
+        models=("Road Bike", "BMX", "Cruiser"),
+    )
+
+    k = q.kpis(filters)
+    assert k["orders"] == len(f)
+    assert abs(k["Net_Revenue"] - f["Net_Revenue"].sum()) < 1e-6
+
+    expected = f.groupby("Bike_Model")["Net_Revenue"].sum().sort_values(ascending=False)
+    got = q.by_model(filters)
+    assert got["Bike_Model"].tolist() == expected.index.tolist()
+    assert got["Net_Revenue"].round(6).tolist() == expected.round(6).tolist()
+    for fmt in EXPORT_FORMATS:
+        path = q.export(filters, tmp_path / f"export.{EXPORT_FORMATS[fmt][0]}", fmt)
+        exported = (
+            pd.read_parquet(path) if fmt == "Parquet" else pd.read_csv(path, dtype={"Month": str})
+        )
+        assert exported["Sale_ID"].tolist() == f["Sale_ID"].tolist(), fmt
+    # no selection on a column means no filter on it
+    assert q.kpis(Filters())["orders"] == len(df)
+
+
+def test_cube_answers_match_row_level(tmp_path):
+    raw = tmp_path / "raw.csv"
+    pd.read_csv(SAMPLE_CSV).iloc[:, :11].to_csv(raw, index=False)
+    dataset, cube = tmp_path / "enriched", tmp_path / "cube.parquet"
+    main(
+        str(raw), str(tmp_path / "out.csv"), str(dataset), partition_by=["Year"], out_cube=str(cube)
+    )
+
+    rows = SalesQueries(duckdb.connect(), relation_for(dataset), "rows")
+    q = open_source(tmp_path / "none.duckdb", dataset, Path(SAMPLE_CSV), cube_path=cube)
+    assert q.orders != rows.orders  # answered from the cube
+    dims = rows.dimensions()
+    for filters in [
+        Filters(),
+        Filters(dims["month_min"], dims["month_max"], stores=("Chicago", "Phoenix")),
+    ]:
+        got, expected = q.kpis(filters), rows.kpis(filters)
+        assert [got.pop(k) for k in ("month_min", "month_max")] == [
+            expected.pop(k) for k in ("month_min", "month_max")
+        ]
+        assert got == pytest.approx(expected)
+        for name in ["monthly", "by_model", "by_payment_and_client"]:
+            pd.testing.assert_frame_equal(
+                getattr(q, name)(filters), getattr(rows, name)(filters), check_dtype=False
+            )
+    assert q.dimensions() == rows.dimensions()
+
+
+def test_source_fingerprint_changes_with_the_files(tmp_path):
+    dataset, db = tmp_path / "enriched", tmp_path / "sales.duckdb"
+    dataset.mkdir()
+    (dataset / "part-0.parquet").write_bytes(b"a")
+    before = source_fingerprint([db, dataset])
+    assert source_fingerprint([db, dataset]) == before
+
+    (dataset / "part-1.parquet").write_bytes(b"b")
+    after_append = source_fingerprint([db, dataset])
+    db.write_bytes(b"db")
+    assert len({before, after_append, source_fingerprint([db, dataset])}) == 3
+
+
+def test_bitmap_index_matches_duckdb(tmp_path):
+    cube = tmp_path / "cube.parquet"
+    write_cube(SAMPLE_CSV, cube)
+    for q in [
+        open_source(tmp_path / "none.duckdb", tmp_path / "none", Path(SAMPLE_CSV)),
+        SalesQueries(duckdb.connect(), relation_for(SAMPLE_CSV), "rows", relation_for(cube)),
+    ]:
+        iq = indexed(q)
+        assert isinstance(iq, IndexedQueries)
+        dims = q.dimensions()
+        values = dims["values"]
+        months = pd.date_range(dims["month_min"], dims["month_max"], freq="MS")
+        rng = random.Random(0)
+        for _ in range(20):
+            pick = {c: tuple(rng.sample(v, rng.randint(0, len(v)))) for c, v in values.items()}
+            lo, hi = sorted(rng.sample(list(months.to_pydatetime()), 2))
+            filters = Filters(
+                lo,
+                hi,
+                pick["Warehouse"],
+                pick["Client_Type"],
+                pick["Store_Location"],
+                pick["Bike_Model"],
+            )
+            got, expected = iq.kpis(filters), q.kpis(filters)
+            assert got["orders"] == expected["orders"]
+            assert got["Net_Revenue"] == pytest.approx(expected["Net_Revenue"])
+            for name, args in [
+                ("monthly", ()),
+                ("by_model", ()),
+                ("net_revenue_by", ("Store_Location",)),
+                ("by_payment_and_client", ()),
+            ]:
+                pd.testing.assert_frame_equal(
+                    getattr(iq, name)(*args, filters),
+                    getattr(q, name)(*args, filters),
+                    check_dtype=False,
+                )
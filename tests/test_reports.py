@@ -0,0 +1,35 @@
+# tests/test_reports.py
+from __future__ import annotations
+
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from src.etl.cube import CUBE_PATH, write_cube
+from src.etl.reports import run_reports
+
+SAMPLE_CSV = Path("data/sample/bike_sales_sample.csv")
+
+
+def test_reports_match_sql_files_and_are_cached(tmp_path):
+    cube = tmp_path / "cube.parquet"
+    write_cube(SAMPLE_CSV, cube)
+    out = tmp_path / "reports"
+
+    # row-level input is rolled up to the same cube the reports read
+    for source in [cube, SAMPLE_CSV]:
+        status = run_reports(source, out, workers=3, force=True)
+        assert status and all(status.values())
+        for name in status:
+            sql = Path(f"sql/{name}.sql").read_text()
+            expected = duckdb.sql(sql.replace(CUBE_PATH.as_posix(), cube.as_posix())).df()
+            got = pd.read_parquet(out / f"{name}.parquet")
+            pd.testing.assert_frame_equal(got, expected)
+            pd.testing.assert_frame_equal(pd.read_csv(out / f"{name}.csv"), expected)
+
+    assert not any(run_reports(SAMPLE_CSV, out).values())
+    (out / "client_type.csv").unlink()
+    status = run_reports(SAMPLE_CSV, out)
+    assert [name for name, ran in status.items() if ran] == ["client_type"]
+    assert all(run_reports(cube, out).values())  # a different input reruns everything
@@ -0,0 +1,35 @@
+# tests/test_rules.py
+from __future__ import annotations
+
+import pandas as pd
+
+from src.etl.rules import (
+    categorize_product,
+    categorize_products,
+    fee_rate_for,
+    fee_rates,
+    warehouse_region,
+    warehouse_regions,
+)
+
+SAMPLE_CSV = "data/sample/bike_sales_sample.csv"
+
+
+def test_vectorized_rules_match_scalar_reference():
+    df = pd.read_csv(SAMPLE_CSV)
+    extra = pd.Series(["Brake Pads", "Seattle, WA", "bank transfer", "", "Austin TX"])
+    for col, scalar, vectorized in [
+        ("Bike_Model", categorize_product, categorize_products),
+        ("Store_Location", warehouse_region, warehouse_regions),
+        ("Payment_Method", fee_rate_for, fee_rates),
+    ]:
+        s = pd.concat([df[col], extra], ignore_index=True)
+        expected = [scalar(v) for v in s.astype(str)]
+        assert vectorized(s).tolist() == expected, col
+
+
+def test_vectorized_rules_treat_missing_as_none():
+    s = pd.Series(["Credit Card", None, float("nan")])
+    assert fee_rates(s).tolist() == [0.025, 0.0, 0.0]
+    assert categorize_products(s).tolist()[1:] == ["Bikes", "Bikes"]
+    assert warehouse_regions(s).tolist()[1:] == ["East", "East"]
@@ -0,0 +1,30 @@
+# tests/test_synth.py
+from __future__ import annotations
+
+import pandas as pd
+
+from src.etl.enrich import enrich_dataframe
+from src.etl.schema import RAW_COLUMNS
+from src.etl.synth import DATA_DICTIONARY, generate, learn_profile
+
+SAMPLE_CSV = "data/sample/bike_sales_sample.csv"
+
+
+def test_generated_rows_follow_the_profile_and_ignore_worker_count(tmp_path):
+    profile = learn_profile(SAMPLE_CSV, DATA_DICTIONARY)
+    serial, parallel = tmp_path / "serial.csv", tmp_path / "parallel.csv"
+    generate(profile, 2_500, serial, chunksize=1_000, workers=1, seed=7)
+    generate(profile, 2_500, parallel, chunksize=1_000, workers=2, seed=7)
+    assert serial.read_bytes() == parallel.read_bytes()
+
+    df = pd.read_csv(serial)
+    sample = pd.read_csv(SAMPLE_CSV)
+    assert df.columns.tolist() == RAW_COLUMNS
+    assert df["Sale_ID"].tolist() == list(range(1, 2_501))
+    for col in ["Bike_Model", "Store_Location", "Payment_Method"]:
+        assert set(df[col]) <= set(sample[col])
+    assert df["Price"].between(sample["Price"].min(), sample["Price"].max()).all()
+    first, last, fmt = profile.dates["Date"]
+    assert fmt == "%d-%m-%Y"  # the raw extract's format, from the data dictionary
+    assert pd.to_datetime(df["Date"], format=fmt).between(first, last).all()
+    assert len(enrich_dataframe(df)) == len(df)